@@ -1,10 +1,56 @@
 import os
-from dotenv import load_dotenv
+from pathlib import Path
 
-load_dotenv()
+BASE_DIR = Path(__file__).resolve().parent.parent
+ENV_PATH = BASE_DIR / ".env"
+
+# O .env é lido uma única vez, aqui: o resto do código só importa as constantes abaixo
+if ENV_PATH.exists():
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=ENV_PATH)
 
 # Configurações do Banco
 DB_TYPE = os.getenv("DB_TYPE", "sqlite") # sqlite ou oracle
 ORACLE_USER = os.getenv("ORACLE_USER", "")
 ORACLE_PASS = os.getenv("ORACLE_PASS", "")
 ORACLE_DSN = os.getenv("ORACLE_DSN", "")
+
+# Pool de Conexões (sessões Oracle; SQLite usa uma conexão por thread)
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "4"))
+DB_POOL_INCREMENT = int(os.getenv("DB_POOL_INCREMENT", "1"))
+
+# Perfil de Armazenamento SQLite (aplicado em cada conexão do pool)
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL") # NORMAL é seguro com WAL
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "65536"))
+SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", "256"))
+SQLITE_SHARDS = int(os.getenv("SQLITE_SHARDS", "1")) # >1 = um arquivo por grupo de totens (src/database/shards.py)
+
+# Ingestão em Lote (executemany)
+SEEDER_BATCH_SIZE = int(os.getenv("SEEDER_BATCH_SIZE", "500"))
+SEEDER_INTERVALO_S = float(os.getenv("SEEDER_INTERVALO_S", "1.0")) # espaço entre os timestamps gerados (histórico termina "agora")
+SIMULADOR_BATCH_SIZE = int(os.getenv("SIMULADOR_BATCH_SIZE", "1"))
+
+# Serviço de Ingestão Assíncrono (src/sensors/ingestao.py)
+INGESTAO_FILA_MAX = int(os.getenv("INGESTAO_FILA_MAX", "10000"))
+INGESTAO_LOTE = int(os.getenv("INGESTAO_LOTE", "500"))
+INGESTAO_FLUSH_S = float(os.getenv("INGESTAO_FLUSH_S", "0.5"))
+
+# Instrumentação de Desempenho (src/core/instrumentacao.py)
+INSTRUMENTACAO = os.getenv("INSTRUMENTACAO", "1") == "1" # 0 = decorators viram a própria função
+
+# Rollups (src/database/rollups.py)
+ROLLUP_ATRASO_ORACLE_S = float(os.getenv("ROLLUP_ATRASO_ORACLE_S", "30")) # > duração de qualquer transação de escrita no Oracle
+
+# Arquivo Parquet (src/database/arquivo.py)
+ARQUIVO_HORIZONTE_DIAS = int(os.getenv("ARQUIVO_HORIZONTE_DIAS", "30")) # dias mantidos na tabela quente
+
+# Orçamento de Importação (src/utils/orcamento_importacao.py)
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "100")) # import a frio dos pontos de entrada de ingestão
+
+# Aviso de Linhas Novas para o Dashboard (src/database/notificacao.py)
+NOTIFICACAO_PORTA = int(os.getenv("NOTIFICACAO_PORTA", "47321")) # UDP em 127.0.0.1; 0 = só o arquivo de sequência
+NOTIFICACAO_DEBOUNCE_S = float(os.getenv("NOTIFICACAO_DEBOUNCE_S", "0.3")) # silêncio que encerra uma rajada
+NOTIFICACAO_ATRASO_MAX_S = float(os.getenv("NOTIFICACAO_ATRASO_MAX_S", "1.0")) # rajada contínua: refresh no máximo a cada 1s
+NOTIFICACAO_CONFERENCIA_S = float(os.getenv("NOTIFICACAO_CONFERENCIA_S", "1.0")) # releitura do .seq (aviso perdido)
+PAINEL_REFRESH_MAX_S = float(os.getenv("PAINEL_REFRESH_MAX_S", "30")) # sem aviso nenhum, confere o banco mesmo assim
@@ -0,0 +1,63 @@
+# Arquivo: src/core/chaves.py
+"""
+Identidade e tempo do registro, sem dependências além da biblioteca padrão.
+O caminho de escrita (DBConnector, migrações, arquivo) importa daqui, e não de
+src/core/schemas.py, para não carregar pydantic e NumPy na partida da ingestão.
+"""
+import hashlib
+import uuid
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+
+# --- IDENTIDADE DO REGISTRO (Deduplicação na escrita) ---
+# Chave = conteúdo (todas as colunas exceto o id) + id_evento da origem, quando vier.
+# Só o conteúdo não basta: o timestamp tem resolução de segundo e uma sessão
+# "Ociosa" tem poucos valores possíveis, então sessões diferentes colidem.
+# Sem id_evento (registros antigos, clientes que não mandam) a chave é só o
+# conteúdo, com o mesmo hash de antes. O banco guarda o hash com índice UNIQUE.
+
+CAMPOS_CHAVE = ['timestamp', 'id_sensor', 'tempo_permanencia', 'tempo_interacao',
+                'acao_usuario', 'tempo_resposta_ms', 'status_sistema', 'tipo_interacao']
+_CAMPOS_CHAVE_NUMERO = {CAMPOS_CHAVE.index(c) for c in ('tempo_permanencia', 'tempo_interacao', 'tempo_resposta_ms')}
+
+def _normalizar_chave(indice, valor):
+    if valor is None:
+        return '\x00'
+    if indice in _CAMPOS_CHAVE_NUMERO:
+        # 120, 120.0 e np.int64(120) precisam gerar a mesma chave
+        try:
+            return repr(float(valor))
+        except (TypeError, ValueError):
+            pass
+    return str(valor)
+
+def hash_conteudo(*valores, id_evento=None):
+    """
+    Hash (hex, 32 chars) dos valores na ordem de CAMPOS_CHAVE (+ id_evento, se houver).
+    Também registrado como função SQL (só conteúdo, para o backfill da migração v3).
+    """
+    texto = '\x1f'.join(_normalizar_chave(i, v) for i, v in enumerate(valores))
+    if id_evento is not None:
+        texto += '\x1e' + str(id_evento)
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=16).hexdigest()
+
+def novo_id_evento():
+    """Id de sessão para quem gera um registro por vez (uuid4, 32 hex)."""
+    return uuid.uuid4().hex
+
+
+# --- TEMPO DO EVENTO (Epoch) ---
+# O contrato continua recebendo o texto 'YYYY-MM-DD HH:MM:SS'; o banco guarda
+# também o instante como inteiro (segundos desde 1970 no relógio do totem, sem
+# fuso), que é o que os filtros comparam e o que a leitura devolve como datetime.
+
+_EPOCH = datetime(1970, 1, 1)
+_SEGUNDO = timedelta(seconds=1)
+
+@lru_cache(maxsize=65536)
+def epoch_de_timestamp(valor):
+    """Texto ISO ou datetime -> segundos desde 1970 (mesma conta do strftime('%s') do SQLite)."""
+    # Cache: numa rajada de ingestão muitos registros caem no mesmo segundo
+    momento = valor if isinstance(valor, datetime) else datetime.fromisoformat(valor)
+    return (momento.replace(tzinfo=None) - _EPOCH) // _SEGUNDO
@@ -0,0 +1,226 @@
+# Arquivo: src/core/instrumentacao.py
+"""
+Instrumentação leve: contagem de chamadas e histograma de latência por operação.
+
+    @medido("DBConnector.ler_novos")      # decorator
+    with trecho("charts.pd.to_datetime"):  # bloco de código
+    with rodada() as r:                    # tudo que for medido dentro vira r.operacoes
+
+Com INSTRUMENTACAO=0 no .env os decorators devolvem a própria função e
+trecho() devolve um objeto vazio reaproveitado: custo praticamente zero.
+"""
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from config.settings import INSTRUMENTACAO
+
+# Limites dos buckets (segundos), no estilo dos histogramas do Prometheus
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_ativo = INSTRUMENTACAO
+_rodada_atual = ContextVar("rodada_atual", default=None)
+
+
+class Histograma:
+    """Contagem, soma e buckets cumulativos de uma operação."""
+
+    __slots__ = ("contagem", "soma", "maximo", "buckets")
+
+    def __init__(self):
+        self.contagem = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)  # último = +Inf
+
+    def observar(self, segundos):
+        self.contagem += 1
+        self.soma += segundos
+        if segundos > self.maximo:
+            self.maximo = segundos
+        self.buckets[bisect.bisect_left(BUCKETS, segundos)] += 1
+
+    def percentil(self, p):
+        """Estimativa pelo limite superior do bucket (como histogram_quantile)."""
+        if not self.contagem:
+            return 0.0
+        alvo = p / 100 * self.contagem
+        acumulado = 0
+        for limite, n in zip(BUCKETS + (self.maximo,), self.buckets):
+            acumulado += n
+            if acumulado >= alvo:
+                return min(limite, self.maximo)
+        return self.maximo
+
+
+class Registro:
+    """Histogramas de todas as operações do processo (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histogramas = {}
+
+    def observar(self, nome, segundos):
+        with self._lock:
+            hist = self._histogramas.get(nome)
+            if hist is None:
+                hist = self._histogramas[nome] = Histograma()
+            hist.observar(segundos)
+
+    def limpar(self):
+        with self._lock:
+            self._histogramas.clear()
+
+    def resumo(self):
+        """[{operacao, chamadas, total_ms, media_ms, p95_ms, max_ms}], mais custosas primeiro."""
+        with self._lock:
+            linhas = [{
+                "operacao": nome,
+                "chamadas": h.contagem,
+                "total_ms": h.soma * 1000,
+                "media_ms": h.soma / h.contagem * 1000 if h.contagem else 0.0,
+                "p95_ms": h.percentil(95) * 1000,
+                "max_ms": h.maximo * 1000,
+            } for nome, h in self._histogramas.items()]
+        return sorted(linhas, key=lambda l: -l["total_ms"])
+
+    def exportar_prometheus(self, metrica="flexmedia_duracao_segundos"):
+        """Texto no formato de exposição do Prometheus (histograma por operação)."""
+        saida = [
+            f"# HELP {metrica} Latência das operações instrumentadas.",
+            f"# TYPE {metrica} histogram",
+        ]
+        with self._lock:
+            itens = sorted(self._histogramas.items())
+            for nome, h in itens:
+                acumulado = 0
+                for limite, n in zip(BUCKETS, h.buckets):
+                    acumulado += n
+                    saida.append(f'{metrica}_bucket{{operacao="{nome}",le="{limite}"}} {acumulado}')
+                saida.append(f'{metrica}_bucket{{operacao="{nome}",le="+Inf"}} {h.contagem}')
+                saida.append(f'{metrica}_sum{{operacao="{nome}"}} {h.soma:.6f}')
+                saida.append(f'{metrica}_count{{operacao="{nome}"}} {h.contagem}')
+        return "\n".join(saida) + "\n"
+
+
+REGISTRO = Registro()
+
+
+class Rodada:
+    """Operações medidas dentro de um `with rodada()` (ex.: um refresh do dashboard)."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.duracao_ms = 0.0
+        self.operacoes = {}  # nome -> [chamadas, segundos]
+        self._token = None
+
+    def _somar(self, nome, segundos):
+        acumulado = self.operacoes.get(nome)
+        if acumulado is None:
+            self.operacoes[nome] = [1, segundos]
+        else:
+            acumulado[0] += 1
+            acumulado[1] += segundos
+
+    def resumo(self):
+        """[{operacao, chamadas, total_ms}], mais custosas primeiro."""
+        linhas = [{"operacao": nome, "chamadas": n, "total_ms": s * 1000}
+                  for nome, (n, s) in self.operacoes.items()]
+        return sorted(linhas, key=lambda l: -l["total_ms"])
+
+
+def _registrar(nome, segundos):
+    REGISTRO.observar(nome, segundos)
+    rodada_atual = _rodada_atual.get()
+    if rodada_atual is not None:
+        rodada_atual._somar(nome, segundos)
+
+
+def ativar(ligado=True):
+    """Liga/desliga a coleta em tempo de execução (funções já decoradas respeitam)."""
+    global _ativo
+    _ativo = ligado
+
+
+def ativo():
+    return _ativo
+
+
+def medido(nome):
+    """Decorator: registra cada chamada da função sob `nome`."""
+    def decorar(fn):
+        if not INSTRUMENTACAO:
+            return fn
+
+        @functools.wraps(fn)
+        def medir(*args, **kwargs):
+            if not _ativo:
+                return fn(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _registrar(nome, time.perf_counter() - inicio)
+        return medir
+    return decorar
+
+
+class _Trecho:
+    __slots__ = ("nome", "inicio")
+
+    def __init__(self, nome):
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _registrar(self.nome, time.perf_counter() - self.inicio)
+        return False
+
+
+class _Vazio:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_VAZIO = _Vazio()
+
+
+def trecho(nome):
+    """Context manager: mede o bloco `with` sob `nome`."""
+    return _Trecho(nome) if _ativo else _VAZIO
+
+
+def iniciar_rodada():
+    """Passa a acumular as medições desta thread/contexto numa nova Rodada."""
+    nova = Rodada()
+    nova._token = _rodada_atual.set(nova)
+    return nova
+
+
+def encerrar_rodada(atual):
+    """Fecha a rodada (fixa a duração) e para de acumular nela."""
+    atual.duracao_ms = (time.perf_counter() - atual.inicio) * 1000
+    _rodada_atual.reset(atual._token)
+    return atual
+
+
+@contextmanager
+def rodada():
+    """Agrupa as medições feitas dentro do bloco `with`."""
+    atual = iniciar_rodada()
+    try:
+        yield atual
+    finally:
+        encerrar_rodada(atual)
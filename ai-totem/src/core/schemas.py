@@ -1,8 +1,15 @@
 # Arquivo: src/core/schemas.py
-from pydantic import BaseModel, Field, field_validator, model_validator
-from datetime import datetime
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
+from collections.abc import Mapping
+from operator import itemgetter
 from typing import Optional
 
+# Chave de deduplicação e tempo do evento moram em src/core/chaves.py (sem dependências);
+# reexportados aqui para quem já importava do contrato
+from src.core.chaves import CAMPOS_CHAVE, hash_conteudo, novo_id_evento, epoch_de_timestamp
+
+# NumPy é importado dentro da validação em lote: o contrato registro a registro não precisa dele
+
 class InteracaoSchema(BaseModel):
     """
     O Contrato de Dados Oficial da FlexMedia.
@@ -23,6 +30,10 @@ class InteracaoSchema(BaseModel):
     tempo_resposta_ms: int = Field(default=0, ge=0)
     status_sistema: str = Field(default="N/A")
 
+    # Identidade da sessão, gerada na origem (totem/simulador): é ela que separa duas
+    # sessões com o mesmo conteúdo no mesmo segundo; um reenvio repete o mesmo id
+    id_evento: Optional[str] = Field(default=None, description="Id da sessão (chave de deduplicação)")
+
     # --- 1. PADRONIZAÇÃO (Standardization) ---
     @field_validator('id_sensor', 'tipo_interacao', 'status_sistema')
     @classmethod
@@ -50,6 +61,200 @@ class InteracaoSchema(BaseModel):
             
         return self
 
+    @property
+    def ts_epoch(self) -> int:
+        """Instante do evento em segundos (coluna ts_epoch do banco)."""
+        return epoch_de_timestamp(self.timestamp)
+
     class Config:
         # Permite converter automaticamente objetos ORM se precisarmos no futuro
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# --- 3. VALIDAÇÃO EM LOTE (Bulk Validation) ---
+# Mesmas regras do InteracaoSchema, aplicadas por coluna com NumPy.
+# Linhas com tipos fora do caminho comum (bool, texto numérico, campo obrigatório
+# ausente, None...) caem no InteracaoSchema, então o resultado é sempre idêntico.
+
+CAMPOS = list(InteracaoSchema.model_fields)
+CAMPOS_TEXTO = ['timestamp', 'id_sensor', 'tipo_interacao', 'acao_usuario', 'status_sistema']
+CAMPOS_NUMERO = ['tempo_permanencia', 'tempo_interacao', 'tempo_resposta_ms']
+_AUSENTE = object()
+_DEFAULTS = {nome: campo.default for nome, campo in InteracaoSchema.model_fields.items() if not campo.is_required()}
+_TIPOS_TEXTO = {str}
+_TIPOS_NUMERO = {int, float}
+_TIPOS_ID = {str, type(None)}
+_PEGAR_CAMPOS = itemgetter(*CAMPOS)
+
+def _colunas(dados, n):
+    """Transpõe a entrada em {campo: lista/array} (default ou _AUSENTE se faltar)."""
+    if isinstance(dados, Mapping) or hasattr(dados, 'columns'):
+        colunas = {}
+        for campo in CAMPOS:
+            if campo in dados:
+                valores = dados[campo]
+                colunas[campo] = valores.to_numpy() if hasattr(valores, 'to_numpy') else valores
+            else:
+                colunas[campo] = [_DEFAULTS.get(campo, _AUSENTE)] * n
+        return colunas
+    try:
+        # Caminho comum (todos os campos presentes): transposição em C
+        return dict(zip(CAMPOS, zip(*map(_PEGAR_CAMPOS, dados))))
+    except KeyError:
+        return {campo: [r.get(campo, _DEFAULTS.get(campo, _AUSENTE)) for r in dados] for campo in CAMPOS}
+
+def _mascara_tipo(valores, tipos, n):
+    """True onde o valor é exatamente de um dos `tipos` (bool não conta como int)."""
+    import numpy as np
+    if isinstance(valores, np.ndarray) and valores.dtype.kind in 'iuf':
+        return np.full(n, tipos is _TIPOS_NUMERO)
+    if set(map(type, valores)) <= tipos:
+        return np.ones(n, dtype=bool)
+    return np.fromiter((type(v) in tipos for v in valores), dtype=bool, count=n)
+
+def _numeros(valores, simples):
+    import numpy as np
+    if isinstance(valores, np.ndarray) and valores.dtype.kind in 'iuf':
+        return valores.astype(float)
+    if simples.all():
+        return np.array(valores, dtype=float)
+    return np.array([v if ok else 0.0 for v, ok in zip(valores, simples)], dtype=float)
+
+def _arredondar(valores):
+    """round(v, 2) do Python, vetorizado."""
+    import numpy as np
+    r = np.round(valores, 2)
+    # np.round escala por 100 e pode divergir do round() do Python perto de x.xx5
+    # (ou em valores enormes); só esses casos passam pelo round() nativo
+    with np.errstate(invalid='ignore', over='ignore'):
+        escala = valores * 100
+        suspeitos = np.isfinite(valores) & (
+            ~np.isfinite(escala) | (np.abs(valores) > 1e12) | (np.abs(np.abs(escala - np.trunc(escala)) - 0.5) < 1e-6)
+        )
+    if suspeitos.any():
+        r[suspeitos] = [round(float(v), 2) for v in valores[suspeitos]]
+    return r
+
+def validar_lote(dados, como_colunas=False):
+    """
+    Valida vários registros em uma chamada, com as regras do InteracaoSchema.
+    Aceita lista de dicts, dict de colunas (listas/arrays) ou DataFrame.
+    Retorna (validos, rejeitados):
+      - validos: lista de dicts iguais ao model_dump() do caminho registro a registro
+        (ou {campo: lista} com como_colunas=True)
+      - rejeitados: [{"indice": i, "erros": [{"campo": str, "motivo": str}, ...]}]
+    """
+    import numpy as np
+    colunar = isinstance(dados, Mapping) or hasattr(dados, 'columns')
+    if colunar:
+        n = len(dados[next(iter(dados))]) if len(dados) else 0
+    else:
+        dados = list(dados)
+        n = len(dados)
+    if n == 0:
+        return ({campo: [] for campo in CAMPOS} if como_colunas else []), []
+
+    rejeitados = {}
+    nao_dict = np.zeros(n, dtype=bool)
+    if not colunar and not set(map(type, dados)) <= {dict}:
+        nao_dict = np.fromiter((not isinstance(r, Mapping) for r in dados), dtype=bool, count=n)
+        for i in np.flatnonzero(nao_dict):
+            rejeitados[i] = [{"campo": "registro", "motivo": "Registro não é um dicionário"}]
+        dados = [r if isinstance(r, Mapping) else {} for r in dados]
+
+    col = _colunas(dados, n)
+
+    # Caminho vetorizado só para linhas com tipos "comuns"; o resto vai para o Pydantic
+    simples = ~nao_dict
+    for campo in CAMPOS_TEXTO:
+        simples &= _mascara_tipo(col[campo], _TIPOS_TEXTO, n)
+    for campo in CAMPOS_NUMERO:
+        simples &= _mascara_tipo(col[campo], _TIPOS_NUMERO, n)
+    simples &= _mascara_tipo(col['id_evento'], _TIPOS_ID, n)
+
+    permanencia = _numeros(col['tempo_permanencia'], simples)
+    interacao = _numeros(col['tempo_interacao'], simples)
+    latencia = _numeros(col['tempo_resposta_ms'], simples)
+    # Fora do int64 o Pydantic tem mensagens próprias: deixa com ele
+    simples &= ~(np.abs(latencia) >= 2.0 ** 63)
+    if simples.all():
+        tam_sensor = np.fromiter(map(len, col['id_sensor']), dtype=np.int64, count=n)
+    else:
+        tam_sensor = np.fromiter((len(v) if ok else 0 for v, ok in zip(col['id_sensor'], simples)), dtype=np.int64, count=n)
+
+    # Regras de intervalo (antes do arredondamento, como no Pydantic; NaN reprova)
+    latencia_finita = np.isfinite(latencia)
+    latencia_inteira = latencia_finita & (latencia == np.trunc(latencia))
+    regras = [
+        ('id_sensor', tam_sensor < 3, "String should have at least 3 characters"),
+        ('tempo_permanencia', ~(permanencia >= 0), "Input should be greater than or equal to 0"),
+        ('tempo_interacao', ~(interacao >= 0), "Input should be greater than or equal to 0"),
+        ('tempo_resposta_ms', ~latencia_finita, "Input should be a finite number"),
+        ('tempo_resposta_ms', latencia_finita & ~latencia_inteira, "Input should be a valid integer, got a number with a fractional part"),
+        ('tempo_resposta_ms', latencia_inteira & (latencia < 0), "Input should be greater than or equal to 0"),
+    ]
+    falhou = np.zeros(n, dtype=bool)
+    for campo, mascara, motivo in regras:
+        mascara = mascara & simples
+        falhou |= mascara
+        for i in np.flatnonzero(mascara):
+            rejeitados.setdefault(i, []).append({"campo": campo, "motivo": motivo})
+
+    # Padronização + regra cruzada (só roda se os campos passaram, como o model_validator)
+    permanencia = _arredondar(permanencia)
+    interacao = _arredondar(interacao)
+    inconsistente = simples & ~falhou & (interacao > permanencia)
+    for i in np.flatnonzero(inconsistente):
+        rejeitados[i] = [{"campo": "registro", "motivo": f"Value error, Inconsistência: Interação ({float(interacao[i])}s) maior que Permanência ({float(permanencia[i])}s)"}]
+
+    aceitos = np.flatnonzero(simples & ~falhou & ~inconsistente)
+
+    def pegar(campo, strip=False):
+        """Valores das linhas aceitas, na ordem original."""
+        valores = col[campo]
+        if len(aceitos) == n:
+            selecionados = list(valores)
+        elif len(aceitos) == 1:
+            selecionados = [valores[aceitos[0]]]
+        else:
+            selecionados = list(itemgetter(*aceitos)(valores)) if len(aceitos) else []
+        return [v.strip() for v in selecionados] if strip else selecionados
+
+    tipos = pegar('tipo_interacao', strip=True)
+    interacao_ok = interacao[aceitos]
+    for j in np.flatnonzero((interacao_ok > 0) & np.array([t == "N/A" for t in tipos], dtype=bool)):
+        tipos[j] = "Desconhecido"
+    aprovados = {
+        "timestamp": pegar('timestamp'),
+        "id_sensor": pegar('id_sensor', strip=True),
+        "tempo_permanencia": permanencia[aceitos].tolist(),
+        "tempo_interacao": interacao_ok.tolist(),
+        "tipo_interacao": tipos,
+        "acao_usuario": pegar('acao_usuario'),
+        "tempo_resposta_ms": [int(v) for v in pegar('tempo_resposta_ms')],
+        "status_sistema": pegar('status_sistema', strip=True),
+        "id_evento": pegar('id_evento'),
+    }
+
+    # Fallback: registro a registro pelo próprio InteracaoSchema
+    extras = {}
+    for i in np.flatnonzero(~simples & ~nao_dict):
+        bruto = {campo: col[campo][i] for campo in CAMPOS if col[campo][i] is not _AUSENTE}
+        try:
+            extras[i] = InteracaoSchema(**bruto).model_dump()
+        except ValidationError as e:
+            rejeitados[i] = [{"campo": ".".join(str(p) for p in erro['loc']) or "registro", "motivo": erro['msg']} for erro in e.errors()]
+
+    lista_rejeitados = [{"indice": int(i), "erros": rejeitados[i]} for i in sorted(rejeitados)]
+    if como_colunas and not extras:
+        return aprovados, lista_rejeitados
+
+    validos = [dict(zip(CAMPOS, linha)) for linha in zip(*(aprovados[campo] for campo in CAMPOS))]
+    if extras:
+        # Reintercala os registros do fallback na posição original
+        posicoes = list(aceitos) + list(extras)
+        linhas = validos + list(extras.values())
+        validos = [linhas[k] for k in np.argsort(posicoes, kind='stable')]
+    if como_colunas:
+        return {campo: [v[campo] for v in validos] for campo in CAMPOS}, lista_rejeitados
+    return validos, lista_rejeitados
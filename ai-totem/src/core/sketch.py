@@ -0,0 +1,86 @@
+# Arquivo: src/core/sketch.py
+"""
+Sketch de quantis da latência (estilo DDSketch): histograma em faixas logarítmicas.
+
+A faixa k cobre (GAMA^(k-1), GAMA^k] ms. Devolvendo o ponto "do meio" da faixa,
+qualquer quantil sai com erro relativo de no máximo ALFA (2%: p99 de 2500ms
+aparece entre 2450 e 2550ms), seja qual for o volume.
+Juntar dois sketches é somar as contagens faixa a faixa: por isso eles se
+combinam entre totens e baldes de tempo (no banco, um SUM ... GROUP BY faixa),
+e o custo de um percentil depende do número de faixas, não de linhas brutas.
+"""
+import math
+
+ALFA = 0.02
+GAMA = (1 + ALFA) / (1 - ALFA)
+LN_GAMA = math.log(GAMA)
+
+QUANTIS_PADRAO = (0.5, 0.95, 0.99)
+
+
+def faixa(valor_ms):
+    """Faixa de uma latência > 0 (mesma conta do SQL dos rollups: CEIL(LN(x) / LN_GAMA))."""
+    return math.ceil(math.log(valor_ms) / LN_GAMA)
+
+
+def valor_da_faixa(k):
+    # Ponto da faixa com o mesmo erro relativo para as duas bordas
+    return 2 * GAMA ** k / (GAMA + 1)
+
+
+class SketchLatencia:
+    """Contagens por faixa + quantas das sessões medidas terminaram em timeout."""
+
+    def __init__(self, contagens=None, timeouts=0):
+        self.contagens = dict(contagens or {})
+        self.timeouts = int(timeouts)
+
+    @classmethod
+    def de_linhas(cls, linhas):
+        """A partir de [(faixa, contagem, timeouts), ...] (como sai do banco)."""
+        sketch = cls()
+        for k, contagem, timeouts in linhas:
+            sketch.contagens[int(k)] = sketch.contagens.get(int(k), 0) + int(contagem)
+            sketch.timeouts += int(timeouts or 0)
+        return sketch
+
+    def adicionar(self, valor_ms, timeout=False):
+        if valor_ms > 0:
+            k = faixa(valor_ms)
+            self.contagens[k] = self.contagens.get(k, 0) + 1
+            self.timeouts += bool(timeout)
+
+    def combinar(self, outro):
+        """Soma `outro` neste sketch (e o retorna, para encadear)."""
+        for k, contagem in outro.contagens.items():
+            self.contagens[k] = self.contagens.get(k, 0) + contagem
+        self.timeouts += outro.timeouts
+        return self
+
+    @property
+    def total(self):
+        return sum(self.contagens.values())
+
+    def quantis(self, qs=QUANTIS_PADRAO):
+        """{q: latência em ms}; None se não há medidas. Um passe pelas faixas para todos os q."""
+        total = self.total
+        if not total:
+            return {q: None for q in qs}
+        resultado = {}
+        alvos = sorted(qs)
+        acumulado, i = 0, 0
+        for k in sorted(self.contagens):
+            acumulado += self.contagens[k]
+            # Posição do quantil q (mesmo critério de "menor valor com acumulado > q*(n-1)")
+            while i < len(alvos) and acumulado > alvos[i] * (total - 1):
+                resultado[alvos[i]] = valor_da_faixa(k)
+                i += 1
+        return resultado
+
+    def resumo(self, qs=QUANTIS_PADRAO):
+        """p50/p95/p99 (ms), sessões medidas e taxa de timeout (%)."""
+        total = self.total
+        resumo = {f"p{round(q * 100)}": v for q, v in self.quantis(qs).items()}
+        resumo["medidas"] = total
+        resumo["taxa_timeout"] = self.timeouts / total * 100 if total else 0.0
+        return resumo
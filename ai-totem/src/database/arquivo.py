@@ -0,0 +1,313 @@
+# Arquivo: src/database/arquivo.py
+"""
+Camada de arquivo (Parquet): linhas mais antigas que o horizonte saem da tabela
+quente e vão para arquivos colunares comprimidos, particionados por dia e totem:
+
+    data/processed/arquivo/data=2024-05-01/id_sensor=totem_praca/part-000000000001-000000020000.parquet
+
+O nome de cada arquivo traz a faixa de ids que ele contém: a leitura "mais
+recentes primeiro" abre só os arquivos necessários, e um arquivamento
+interrompido e refeito regrava os mesmos arquivos em vez de duplicar linhas.
+O hash de cada linha arquivada fica em TABELA_ARQUIVADOS (só a chave): a
+escrita descarta um registro que já está no Parquet, como se estivesse na
+tabela quente.
+
+    python src/database/arquivo.py --horizonte 30 --vacuum
+"""
+import argparse
+import datetime
+import glob
+import os
+import re
+import sys
+from urllib.parse import quote
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from config.settings import ARQUIVO_HORIZONTE_DIAS
+from src.database.connector import (DBConnector, TABLE_NAME, TABELA_ARQUIVADOS, COLUNAS, BASE_DIR,
+                                    shard_de, tipar_tempo)
+from src.core.chaves import CAMPOS_CHAVE, hash_conteudo
+from src.core.instrumentacao import medido
+from src.database import rollups
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+ARQUIVO_DIR = BASE_DIR / "data" / "processed" / "arquivo"
+
+_PADRAO_ARQUIVO = re.compile(r"part-(\d+)-(\d+)\.parquet$")
+
+
+def _exigir_parquet():
+    if not PARQUET_AVAILABLE:
+        raise Exception("Biblioteca 'pyarrow' necessária para o arquivo Parquet.")
+
+
+def _caminho_particao(dia, sensor):
+    # quote: o id do totem vira nome de pasta com segurança
+    return ARQUIVO_DIR / f"data={dia}" / f"id_sensor={quote(str(sensor), safe='')}"
+
+
+def _dia(timestamp):
+    """datetime ou texto 'YYYY-MM-DD HH:MM:SS' -> 'YYYY-MM-DD'."""
+    if isinstance(timestamp, (datetime.date, pd.Timestamp)):
+        return timestamp.strftime("%Y-%m-%d")
+    return str(timestamp)[:10]
+
+
+# --- ESCRITA (JOB DE ARQUIVAMENTO) ---
+
+def _gravar_bloco(df):
+    """Grava um bloco (ordenado por id, já tipado) em um arquivo por partição dia/totem."""
+    # timestamp vai como coluna timestamp do Parquet: a leitura devolve datetime64 direto
+    df = df.assign(_dia=df['timestamp'].dt.strftime("%Y-%m-%d"))
+    arquivos = 0
+    for (dia, sensor), parte in df.groupby(['_dia', 'id_sensor'], sort=False):
+        parte = parte.drop(columns='_dia')
+        pasta = _caminho_particao(dia, sensor)
+        os.makedirs(pasta, exist_ok=True)
+        destino = pasta / f"part-{int(parte['id'].min()):012d}-{int(parte['id'].max()):012d}.parquet"
+        tabela = pa.Table.from_pandas(parte[COLUNAS], preserve_index=False)
+        # Estatísticas por coluna (min/max por row group) permitem pular blocos na leitura
+        tmp = str(destino) + ".tmp"
+        pq.write_table(tabela, tmp, compression="zstd", write_statistics=True, row_group_size=64_000)
+        os.replace(tmp, destino)
+        arquivos += 1
+    return arquivos
+
+
+@medido("arquivo.arquivar")
+def arquivar(db=None, horizonte_dias=ARQUIVO_HORIZONTE_DIAS, tamanho_bloco=50_000, vacuum=False):
+    """
+    Move para o Parquet as linhas com timestamp anterior a (agora - horizonte).
+    Cada bloco é gravado (troca atômica do arquivo) antes de ser apagado da
+    tabela quente. Só sai linha que os rollups já somaram (id até a marca
+    d'água do controle): no Oracle o catch-up fica atrás do MAX(id), e o
+    resto sai num arquivamento seguinte. Retorna {"arquivadas", "arquivos"}.
+    """
+    _exigir_parquet()
+    db = db or DBConnector()
+    # Rollups primeiro: linha que sai da tabela quente sem ter sido somada ficaria fora deles
+    db.atualizar_rollups()
+    limite = datetime.datetime.now() - datetime.timedelta(days=horizonte_dias)
+    _registrar_arquivados_antigos(db)
+    resultado = {"arquivadas": 0, "arquivos": 0}
+    # Modo shardado: cada arquivo SQLite é arquivado por vez (ids são globais, o Parquet é um só)
+    for banco in db.shards():
+        parcial = _arquivar_banco(banco, limite, tamanho_bloco, vacuum)
+        resultado["arquivadas"] += parcial["arquivadas"]
+        resultado["arquivos"] += parcial["arquivos"]
+    return resultado
+
+
+def _arquivar_banco(db, limite, tamanho_bloco, vacuum):
+    corte = db._valor_tempo(limite)
+    tempo = db._coluna_tempo()
+    # Marca d'água dos rollups deste arquivo: o que está acima dela ainda não foi somado
+    with db.conexao() as conn:
+        somado = rollups.ultimo_somado(conn)
+    if db.driver == "sqlite":
+        selecao = f"""
+            SELECT {db._selecao()} FROM {TABLE_NAME}
+            WHERE id > :desde AND id <= :somado AND {tempo} < :corte
+            ORDER BY id LIMIT :n
+        """
+    else:
+        selecao = f"""
+            SELECT {db._selecao()} FROM {TABLE_NAME}
+            WHERE id > :desde AND id <= :somado AND {tempo} < :corte
+            ORDER BY id FETCH FIRST :n ROWS ONLY
+        """
+    # Mesmo predicado da leitura: apaga exatamente as linhas que foram gravadas,
+    # guardando antes (mesma transação) os hashes que a escrita deve seguir recusando
+    faixa = f"id > :desde AND id <= :ate AND id <= :somado AND {tempo} < :corte"
+    registro = f"""
+        INSERT INTO {TABELA_ARQUIVADOS} (hash_conteudo)
+        SELECT hash_conteudo FROM {TABLE_NAME} t
+        WHERE {faixa} AND hash_conteudo IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM {TABELA_ARQUIVADOS} a WHERE a.hash_conteudo = t.hash_conteudo)
+    """
+    remocao = f"DELETE FROM {TABLE_NAME} WHERE {faixa}"
+
+    resultado = {"arquivadas": 0, "arquivos": 0}
+    desde = 0
+    while True:
+        with db.conexao() as conn:
+            df = db._tipar(pd.read_sql(selecao, conn, params={"desde": desde, "somado": somado,
+                                                                "corte": corte, "n": tamanho_bloco}))
+        if df.empty:
+            break
+        ate = int(df['id'].iloc[-1])
+        resultado["arquivos"] += _gravar_bloco(df)
+        with db.conexao() as conn:
+            cursor = conn.cursor()
+            faixa_bloco = {"desde": desde, "ate": ate, "somado": somado, "corte": corte}
+            cursor.execute(registro, faixa_bloco)
+            cursor.execute(remocao, faixa_bloco)
+            conn.commit()
+        resultado["arquivadas"] += len(df)
+        desde = ate
+        sys.stdout.write(f"\rArquivadas: {resultado['arquivadas']}")
+        sys.stdout.flush()
+
+    if vacuum and db.driver == "sqlite" and resultado["arquivadas"]:
+        # DELETE só marca páginas livres; o VACUUM devolve o espaço ao disco
+        with db.conexao() as conn:
+            conn.execute("VACUUM")
+    return resultado
+
+
+def _registrar_arquivados_antigos(db):
+    """
+    Arquivo gravado antes de TABELA_ARQUIVADOS existir: recalcula o hash de
+    conteúdo de cada linha do Parquet e registra no banco do totem. O Parquet
+    não guarda id_evento, então vale para as linhas gravadas sem ele (a chave
+    da época). Roda só enquanto nenhum banco tem hash registrado.
+    """
+    if not ARQUIVO_DIR.exists():
+        return
+    bancos = {banco.shard: banco for banco in db.shards()}
+    for banco in bancos.values():
+        with banco.conexao() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM (SELECT 1 FROM {TABELA_ARQUIVADOS} WHERE ROWNUM = 1)"
+                           if banco.driver == "oracle" else f"SELECT EXISTS (SELECT 1 FROM {TABELA_ARQUIVADOS})")
+            if cursor.fetchone()[0]:
+                return
+
+    registrados = 0
+    unico = next(iter(bancos))
+    for bloco in ler_em_blocos(50_000, colunas=CAMPOS_CHAVE):
+        # O hash foi calculado sobre o texto 'YYYY-MM-DD HH:MM:SS' que chegou na escrita
+        bloco['timestamp'] = bloco['timestamp'].dt.strftime("%Y-%m-%d %H:%M:%S")
+        por_banco = {}
+        for linha in zip(*(bloco[c].tolist() for c in CAMPOS_CHAVE)):
+            k = unico if len(bancos) == 1 else shard_de(linha[1], len(bancos))
+            por_banco.setdefault(k, []).append((hash_conteudo(*linha),))
+        for k, hashes in por_banco.items():
+            _gravar_hashes(bancos[k], hashes)
+            registrados += len(hashes)
+    if registrados:
+        print(f"🗄️ {registrados} hashes de linhas já arquivadas registrados (deduplicação contra o Parquet).")
+
+
+def _gravar_hashes(db, hashes):
+    with db.conexao() as conn:
+        cursor = conn.cursor()
+        if db.driver == "sqlite":
+            cursor.executemany(f"INSERT OR IGNORE INTO {TABELA_ARQUIVADOS} (hash_conteudo) VALUES (?)", hashes)
+        else:
+            # ORA-00001 = hash já registrado: ignorado, como o OR IGNORE
+            cursor.executemany(f"INSERT INTO {TABELA_ARQUIVADOS} (hash_conteudo) VALUES (:1)", hashes, batcherrors=True)
+        conn.commit()
+
+
+# --- LEITURA ---
+
+def _arquivos(id_sensor=None, inicio=None, fim=None):
+    """[(id_min, id_max, caminho)] das partições que podem conter linhas do filtro."""
+    dia_inicio = _dia(inicio) if inicio is not None else None
+    dia_fim = _dia(fim) if fim is not None else None
+    sensor = quote(str(id_sensor), safe='') if id_sensor else "*"
+    encontrados = []
+    for caminho in glob.glob(str(ARQUIVO_DIR / "data=*" / f"id_sensor={sensor}" / "part-*.parquet")):
+        dia = os.path.basename(os.path.dirname(os.path.dirname(caminho)))[len("data="):]
+        # Poda por partição: dias fora do recorte nem são abertos
+        if (dia_inicio and dia < dia_inicio) or (dia_fim and dia > dia_fim):
+            continue
+        faixa = _PADRAO_ARQUIVO.search(caminho)
+        encontrados.append((int(faixa.group(1)), int(faixa.group(2)), caminho))
+    return encontrados
+
+
+def _filtro_arrow(antes_de_id=None, inicio=None, fim=None, tipo_interacao=None, id_sensor=None):
+    """Filtro em linha (DNF do pyarrow): usa as estatísticas para pular row groups.
+    O totem já foi resolvido pela partição."""
+    filtro = []
+    if antes_de_id is not None:
+        filtro.append(("id", "<", int(antes_de_id)))
+    if inicio is not None:
+        filtro.append(("timestamp", ">=", pd.Timestamp(inicio).to_pydatetime()))
+    if fim is not None:
+        filtro.append(("timestamp", "<", pd.Timestamp(fim).to_pydatetime()))
+    if tipo_interacao:
+        tipos = [tipo_interacao] if isinstance(tipo_interacao, str) else list(tipo_interacao)
+        filtro.append(("tipo_interacao", "in", tipos))
+    return filtro or None
+
+
+@medido("arquivo.ler")
+def ler(limit=50, antes_de_id=None, colunas=None, **filtros):
+    """As `limit` linhas arquivadas mais recentes (maior id) que passam nos filtros."""
+    if not PARQUET_AVAILABLE or not ARQUIVO_DIR.exists():
+        return tipar_tempo(pd.DataFrame(columns=colunas or COLUNAS))
+    colunas = list(colunas or COLUNAS)
+    lidas = colunas if "id" in colunas else ["id"] + colunas
+    filtro = _filtro_arrow(antes_de_id, **filtros)
+
+    candidatos = [a for a in _arquivos(filtros.get("id_sensor"), filtros.get("inicio"), filtros.get("fim"))
+                  if antes_de_id is None or a[0] < antes_de_id]
+    partes, corte_id = [], None
+    # Do arquivo de ids mais altos para o mais baixo; para quando nenhum
+    # arquivo restante pode ter um id acima do N-ésimo já encontrado
+    for id_min, id_max, caminho in sorted(candidatos, key=lambda a: -a[1]):
+        if corte_id is not None and id_max < corte_id:
+            break
+        parte = pq.read_table(caminho, columns=lidas, filters=filtro).to_pandas()
+        if parte.empty:
+            continue
+        partes.append(parte)
+        ids = pd.concat([p['id'] for p in partes])
+        if len(ids) >= limit:
+            corte_id = ids.nlargest(limit).iloc[-1]
+    if not partes:
+        return tipar_tempo(pd.DataFrame(columns=colunas))
+    df = pd.concat(partes, ignore_index=True).nlargest(limit, 'id')
+    # O Parquet devolve datetime64[ms]: mesma unidade da tabela quente
+    return tipar_tempo(df[colunas].reset_index(drop=True))
+
+
+def ler_em_blocos(tamanho_bloco=10000, colunas=None):
+    """Percorre o arquivo inteiro em ordem de id, um DataFrame por bloco (um row group por vez)."""
+    if not PARQUET_AVAILABLE or not ARQUIVO_DIR.exists():
+        return
+    colunas = list(colunas or COLUNAS)
+    for _, _, caminho in sorted(_arquivos()):
+        arquivo = pq.ParquetFile(caminho)
+        for lote in arquivo.iter_batches(batch_size=tamanho_bloco, columns=colunas):
+            yield tipar_tempo(lote.to_pandas())
+
+
+def estatisticas():
+    """Arquivos, linhas e bytes em disco do arquivo Parquet."""
+    arquivos = _arquivos()
+    linhas = sum(pq.ParquetFile(c).metadata.num_rows for _, _, c in arquivos) if PARQUET_AVAILABLE else 0
+    return {
+        "arquivos": len(arquivos),
+        "linhas": linhas,
+        "bytes": sum(os.path.getsize(c) for _, _, c in arquivos),
+        "particoes_dia": len({os.path.dirname(os.path.dirname(c)) for _, _, c in arquivos}),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arquiva linhas antigas da tabela quente em Parquet")
+    parser.add_argument("--horizonte", type=int, default=ARQUIVO_HORIZONTE_DIAS, help="dias mantidos na tabela quente")
+    parser.add_argument("--bloco", type=int, default=50_000)
+    parser.add_argument("--vacuum", action="store_true", help="SQLite: devolve o espaço liberado ao disco")
+    args = parser.parse_args()
+
+    print(f"🗄️ Arquivando linhas com mais de {args.horizonte} dias em {ARQUIVO_DIR} ...")
+    try:
+        resultado = arquivar(horizonte_dias=args.horizonte, tamanho_bloco=args.bloco, vacuum=args.vacuum)
+        print(f"\n✅ {resultado['arquivadas']} linhas arquivadas em {resultado['arquivos']} arquivos.")
+        print(f"📦 Arquivo: {estatisticas()}")
+    except Exception as e:
+        print(f"[ERRO AO ARQUIVAR] {e}")
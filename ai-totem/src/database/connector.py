@@ -1,163 +1,849 @@
 # Arquivo: src/database/connector.py
 import sqlite3
-import pandas as pd
 import os
+import datetime
+import threading
+import time
+import zlib
+from collections.abc import Mapping
+from contextlib import contextmanager
 from pathlib import Path
-from dotenv import load_dotenv
+
+# pandas (leituras) e oracledb (driver Oracle) são importados só quando usados:
+# o caminho de ingestão SQLite (simulador, seeder) não paga por eles na partida.
+from config import settings
+from src.database.pool import SQLitePool, OraclePool
+from src.database.migrations import migrar_sqlite, tabela_arquivados
+from src.database import rollups, notificacao
+from src.core.instrumentacao import medido, trecho
+from src.core.chaves import CAMPOS_CHAVE, hash_conteudo, epoch_de_timestamp
+from src.core.sketch import SketchLatencia
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
-ENV_PATH = BASE_DIR / ".env"
-load_dotenv(dotenv_path=ENV_PATH)
 
 # --- VERSÃO 3: Adicionando Comandos e Latência ---
 TABLE_NAME = "FLEXMEDIA_LIVE_V3"
+COLUNAS = ["id", "timestamp", "id_sensor", "tempo_permanencia", "tempo_interacao",
+           "acao_usuario", "tempo_resposta_ms", "status_sistema", "tipo_interacao"]
+
+# Tipos declarados das colunas lidas: o DataFrame sai pronto para os gráficos,
+# sem to_numeric/to_datetime a cada refresh (timestamp vira datetime64 em _tipar)
+DTYPES = {"id": "int64", "tempo_permanencia": "float64", "tempo_interacao": "float64", "tempo_resposta_ms": "int64"}
 
-db_type = os.getenv("DB_TYPE", "sqlite")
-print(f"--- [CONFIG] Banco definido como: {db_type.upper()} ---")
+# Unidade única do timestamp em todo DataFrame lido (SQLite, Oracle e Parquet, que
+# só guarda ms): o evento tem resolução de segundos, e concat/filtros não misturam unidades
+TIPO_TEMPO = "datetime64[s]"
 
-try:
-    import oracledb
-    ORACLE_AVAILABLE = True
-except ImportError:
-    ORACLE_AVAILABLE = False
+
+def tipar_tempo(df):
+    """Converte a coluna timestamp (se houver) para TIPO_TEMPO."""
+    if "timestamp" in df.columns and df["timestamp"].dtype != TIPO_TEMPO:
+        df["timestamp"] = df["timestamp"].astype(TIPO_TEMPO)
+    return df
 
 DB_SQLITE_PATH = BASE_DIR / "data" / "processed" / "flexmedia.db"
 
+ROLLUP_HORA = rollups.GRANULARIDADES["hora"][0]
+
+# Hashes do que já foi para o Parquet: a escrita também descarta essas linhas
+TABELA_ARQUIVADOS = tabela_arquivados(TABLE_NAME)
+
+# strftime('%w') do SQLite: 0 = domingo
+DIAS_SEMANA = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+# --- SHARDS (SQLITE_SHARDS > 1, ver src/database/shards.py) ---
+# Ids de shard são globais: instante da gravação (µs) * MAX_SHARDS + índice do shard.
+# Únicos entre arquivos, crescentes dentro de cada um e ordenáveis entre eles.
+MAX_SHARDS = 64
+
+def shard_de(id_sensor, total):
+    """Shard de um totem (crc32: estável entre processos, ao contrário de hash())."""
+    return zlib.crc32(str(id_sensor).encode("utf-8")) % total if id_sensor else 0
+
+def caminho_shard(base, shard, total):
+    # O total entra no nome: mudar SQLITE_SHARDS não mistura roteamentos diferentes
+    return base.with_name(f"{base.stem}-shard{shard:02d}de{total:02d}{base.suffix}")
+
+def _balde_hora(valor):
+    """Balde 'YYYY-MM-DD HH' do sketch de latência (aceita datetime ou texto ISO)."""
+    if isinstance(valor, str):
+        valor = datetime.datetime.fromisoformat(valor)
+    return valor.strftime("%Y-%m-%d %H")
+
+# Pools compartilhados pelo processo (um por driver/arquivo): o Streamlit recria o
+# DBConnector a cada rerun, mas as conexões sobrevivem entre execuções.
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+def _importar_oracledb():
+    try:
+        import oracledb
+    except ImportError:
+        raise Exception("Biblioteca 'oracledb' necessária.")
+    return oracledb
+
+def _obter_pool(driver, caminho=None):
+    with _POOLS_LOCK:
+        pool = _POOLS.get((driver, caminho))
+        if pool is None:
+            if driver == "sqlite":
+                pool = SQLitePool(caminho, pragmas={
+                    "synchronous": settings.SQLITE_SYNCHRONOUS,
+                    "cache_size": -settings.SQLITE_CACHE_KB,
+                    "mmap_size": settings.SQLITE_MMAP_MB * 1024 * 1024,
+                    "temp_store": "MEMORY",
+                })
+            elif driver == "oracle":
+                pool = OraclePool(
+                    _importar_oracledb(),
+                    user=settings.ORACLE_USER,
+                    password=settings.ORACLE_PASS,
+                    dsn=settings.ORACLE_DSN,
+                    minimo=settings.DB_POOL_MIN,
+                    maximo=settings.DB_POOL_MAX,
+                    incremento=settings.DB_POOL_INCREMENT,
+                )
+            else:
+                raise Exception(f"Driver desconhecido: {driver}")
+            _POOLS[(driver, caminho)] = pool
+        return pool
+
+def _registros_de_colunas(colunas):
+    """{campo: array/lista} -> registros (dicts) gerados sob demanda."""
+    campos = list(colunas)
+    valores = [v.tolist() if hasattr(v, 'tolist') else v for v in colunas.values()]
+    return (dict(zip(campos, linha)) for linha in zip(*valores))
+
 class DBConnector:
-    def __init__(self, driver=None):
+    def __new__(cls, driver=None, shard=None):
+        # SQLite com SQLITE_SHARDS > 1: mesma API, servida por ConectorShards
+        if cls is DBConnector and shard is None and settings.SQLITE_SHARDS > 1 \
+                and (driver or settings.DB_TYPE).lower() == "sqlite":
+            from src.database.shards import ConectorShards
+            cls = ConectorShards
+        return super().__new__(cls)
+
+    def __init__(self, driver=None, shard=None):
         if driver:
             self.driver = driver
         else:
-            self.driver = os.getenv("DB_TYPE", "sqlite").lower()
+            self.driver = settings.DB_TYPE.lower()
+        # Índice do arquivo de shard (None = banco único)
+        self.shard = shard
+
+    def _caminho_sqlite(self):
+        if self.shard is None:
+            return DB_SQLITE_PATH
+        return caminho_shard(DB_SQLITE_PATH, self.shard, settings.SQLITE_SHARDS)
+
+    def _pool(self):
+        return _obter_pool(self.driver, str(self._caminho_sqlite()) if self.driver == "sqlite" else None)
+
+    def shards(self):
+        """Conectores de cada arquivo físico (o próprio, fora do modo shardado)."""
+        return [self]
     
+    @contextmanager
+    def conexao(self):
+        """Empresta uma conexão do pool e a devolve ao final do bloco `with`."""
+        pool = self._pool()
+        conn = pool.acquire()
+        try:
+            yield conn
+        finally:
+            pool.release(conn)
+
+    def estatisticas_pool(self):
+        """Checkouts, esperas e conexões criadas pelo pool do driver ativo."""
+        return self._pool().estatisticas()
+
     def get_connection(self):
+        """Conexão avulsa, fora do pool (quem chama é responsável por fechar)."""
         if self.driver == "sqlite":
-            os.makedirs(os.path.dirname(DB_SQLITE_PATH), exist_ok=True)
-            return sqlite3.connect(str(DB_SQLITE_PATH))
+            caminho = self._caminho_sqlite()
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            return sqlite3.connect(str(caminho))
         elif self.driver == "oracle":
-            if not ORACLE_AVAILABLE: raise Exception("Biblioteca 'oracledb' necessária.")
-            user = os.getenv("ORACLE_USER")
-            password = os.getenv("ORACLE_PASS")
-            dsn = os.getenv("ORACLE_DSN")
-            return oracledb.connect(user=user, password=password, dsn=dsn)
+            oracledb = _importar_oracledb()
+            return oracledb.connect(user=settings.ORACLE_USER, password=settings.ORACLE_PASS, dsn=settings.ORACLE_DSN)
         
+    @medido("DBConnector.init_db")
     def init_db(self):
-        conn = self.get_connection()
+        with self.conexao() as conn:
+            if self.driver == "sqlite":
+                # Schema V3 + WAL + índices, aplicados de forma versionada
+                migrar_sqlite(conn, TABLE_NAME)
+            
+            elif self.driver == "oracle":
+                cursor = conn.cursor()
+                try:
+                    # Criação segura no Oracle
+                    sql_create = f"""
+                        CREATE TABLE {TABLE_NAME} (
+                            id NUMBER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+                            timestamp DATE DEFAULT SYSDATE,
+                            id_sensor VARCHAR2(50),
+                            tempo_permanencia NUMBER(10,2),
+                            tempo_interacao NUMBER(10,2),
+                            acao_usuario VARCHAR2(50),
+                            tempo_resposta_ms NUMBER(10),
+                            status_sistema VARCHAR2(20),
+                            tipo_interacao VARCHAR2(50),
+                            hash_conteudo VARCHAR2(32)
+                        )
+                    """
+                    cursor.execute(sql_create)
+                    print(f"✅ Tabela {TABLE_NAME} criada no Oracle.")
+                except Exception:
+                    pass
+                rollups.criar_tabelas_oracle(cursor)
+                rollups.criar_acoes_oracle(conn, TABLE_NAME)
+                try:
+                    cursor.execute(f"CREATE TABLE {TABELA_ARQUIVADOS} (hash_conteudo VARCHAR2(32) PRIMARY KEY) ORGANIZATION INDEX")
+                except Exception:
+                    pass  # Já existe
+                # Mesmos índices da migração v2 do SQLite (filtro por totem, recorte de tempo)
+                for indice, colunas in ((f"IDX_{TABLE_NAME}_SENSOR", "id_sensor, id"), (f"IDX_{TABLE_NAME}_TS", "timestamp")):
+                    try:
+                        cursor.execute(f"CREATE INDEX {indice} ON {TABLE_NAME} ({colunas})")
+                    except Exception:
+                        pass  # Já existe
+                conn.commit()
+                self._migrar_oracle_dedup(conn)
+
+    def _migrar_oracle_dedup(self, conn):
+        """
+        Equivalente Oracle da migração v3 do SQLite: coluna hash_conteudo,
+        backfill das linhas antigas, remoção das duplicatas e índice UNIQUE.
+        Roda uma vez (o índice existente indica que já foi feita).
+        """
+        indice = f"UQ_{TABLE_NAME}_HASH"
         cursor = conn.cursor()
-        
-        # Schema V3: Adicionado acao, latencia e status
-        if self.driver == "sqlite":
-            cursor.execute(f'''
-                CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT,
-                    id_sensor TEXT,
-                    tempo_permanencia REAL,
-                    tempo_interacao REAL,
-                    acao_usuario TEXT,
-                    tempo_resposta_ms INTEGER,
-                    status_sistema TEXT,
-                    tipo_interacao TEXT
-                )
-            ''')
-        
-        elif self.driver == "oracle":
-            try:
-                # Criação segura no Oracle
-                sql_create = f"""
-                    CREATE TABLE {TABLE_NAME} (
-                        id NUMBER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
-                        timestamp DATE DEFAULT SYSDATE,
-                        id_sensor VARCHAR2(50),
-                        tempo_permanencia NUMBER(10,2),
-                        tempo_interacao NUMBER(10,2),
-                        acao_usuario VARCHAR2(50),
-                        tempo_resposta_ms NUMBER(10),
-                        status_sistema VARCHAR2(20),
-                        tipo_interacao VARCHAR2(50)
-                    )
-                """
-                cursor.execute(sql_create)
-                print(f"✅ Tabela {TABLE_NAME} criada no Oracle.")
-            except Exception:
-                pass
+        cursor.execute("SELECT COUNT(*) FROM user_indexes WHERE index_name = :nome", nome=indice)
+        if cursor.fetchone()[0]:
+            return
+        try:
+            cursor.execute(f"ALTER TABLE {TABLE_NAME} ADD (hash_conteudo VARCHAR2(32))")
+        except Exception:
+            pass  # Coluna já existe (tabela criada com o schema novo)
 
+        # Backfill com a mesma função do INSERT, em blocos
+        cursor.execute(f"SELECT id, {', '.join(CAMPOS_CHAVE)} FROM {TABLE_NAME} WHERE hash_conteudo IS NULL")
+        atualizador = conn.cursor()
+        while True:
+            linhas = cursor.fetchmany(10000)
+            if not linhas:
+                break
+            atualizador.executemany(
+                f"UPDATE {TABLE_NAME} SET hash_conteudo = :1 WHERE id = :2",
+                [(hash_conteudo(*linha[1:]), linha[0]) for linha in linhas],
+            )
+        cursor.execute(f"""
+            DELETE FROM {TABLE_NAME}
+            WHERE id NOT IN (SELECT MIN(id) FROM {TABLE_NAME} GROUP BY hash_conteudo)
+        """)
+        removidas = cursor.rowcount
+        cursor.execute(f"CREATE UNIQUE INDEX {indice} ON {TABLE_NAME} (hash_conteudo)")
         conn.commit()
-        conn.close()
+        if removidas:
+            print(f"🧹 Backfill: {removidas} registros duplicados removidos.")
     
+    @medido("DBConnector.contar_total")
     def contar_total(self):
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}")
-            total = cursor.fetchone()[0]
-            conn.close()
+            with self.conexao() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}")
+                total = cursor.fetchone()[0]
             return total
         except Exception:
             return 0
 
-    def salvar_interacao(self, dados):
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Preparando dados (Fallback para None se não houver ação)
-            acao = dados.get('acao_usuario', 'Nenhuma')
-            latencia = dados.get('tempo_resposta_ms', 0)
-            status = dados.get('status_sistema', 'N/A')
+    def _sql_insert(self):
+        """
+        SQL de INSERT do driver ativo (placeholders posicionais).
+        Registro repetido (mesmo hash_conteudo: mesmo id_evento e conteúdo) é ignorado:
+        INSERT OR IGNORE no SQLite, MERGE ... WHEN NOT MATCHED no Oracle.
+        Hash que já foi arquivado também (trigger da migração v7 / NOT EXISTS no MERGE).
+        """
+        if self.driver == "sqlite":
+            # Shard: id explícito (global), vindo de _com_ids
+            coluna_id, marcador_id = ("id, ", "?, ") if self.shard is not None else ("", "")
+            return f'''
+                INSERT OR IGNORE INTO {TABLE_NAME} 
+                ({coluna_id}timestamp, id_sensor, tempo_permanencia, tempo_interacao, acao_usuario, tempo_resposta_ms, status_sistema, tipo_interacao, hash_conteudo, ts_epoch)
+                VALUES ({marcador_id}?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            '''
+        return f"""
+                MERGE INTO {TABLE_NAME} t
+                USING (
+                    SELECT * FROM (
+                        SELECT :1 AS timestamp, :2 AS id_sensor, :3 AS tempo_permanencia, :4 AS tempo_interacao, :5 AS acao_usuario,
+                               :6 AS tempo_resposta_ms, :7 AS status_sistema, :8 AS tipo_interacao, :9 AS hash_conteudo
+                        FROM dual
+                    ) x
+                    WHERE NOT EXISTS (SELECT 1 FROM {TABELA_ARQUIVADOS} a WHERE a.hash_conteudo = x.hash_conteudo)
+                ) s
+                ON (t.hash_conteudo = s.hash_conteudo)
+                WHEN NOT MATCHED THEN INSERT
+                    (timestamp, id_sensor, tempo_permanencia, tempo_interacao, acao_usuario, tempo_resposta_ms, status_sistema, tipo_interacao, hash_conteudo)
+                VALUES
+                    (s.timestamp, s.id_sensor, s.tempo_permanencia, s.tempo_interacao, s.acao_usuario, s.tempo_resposta_ms, s.status_sistema, s.tipo_interacao, s.hash_conteudo)
+            """
 
-            if self.driver == "sqlite":
-                cursor.execute(f'''
-                    INSERT INTO {TABLE_NAME} 
-                    (timestamp, id_sensor, tempo_permanencia, tempo_interacao, acao_usuario, tempo_resposta_ms, status_sistema, tipo_interacao)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (dados['timestamp'], dados['id_sensor'], dados['tempo_permanencia'], dados['tempo_interacao'], acao, latencia, status, dados['tipo_interacao']))
-            
-            elif self.driver == "oracle":
-                sql = f"""
-                    INSERT INTO {TABLE_NAME} 
-                    (id_sensor, tempo_permanencia, tempo_interacao, acao_usuario, tempo_resposta_ms, status_sistema, tipo_interacao)
-                    VALUES (:1, :2, :3, :4, :5, :6, :7) 
-                """
-                cursor.execute(sql, (dados['id_sensor'], dados['tempo_permanencia'], dados['tempo_interacao'], acao, latencia, status, dados['tipo_interacao']))
+    def _preparar_linha(self, dados):
+        """Converte o dicionário validado na tupla de parâmetros do INSERT."""
+        # Preparando dados (Fallback para None se não houver ação)
+        acao = dados.get('acao_usuario', 'Nenhuma')
+        latencia = dados.get('tempo_resposta_ms', 0)
+        status = dados.get('status_sistema', 'N/A')
 
-            conn.commit()
-            conn.close()
+        # Mesma ordem de CAMPOS_CHAVE: a tupla do SQLite é a própria chave
+        linha = (dados['timestamp'], dados['id_sensor'], dados['tempo_permanencia'], dados['tempo_interacao'], acao, latencia, status, dados['tipo_interacao'])
+        chave = hash_conteudo(*linha, id_evento=dados.get('id_evento'))
+        if self.driver == "sqlite":
+            return linha + (chave, epoch_de_timestamp(dados['timestamp']))
+        # Oracle grava o instante do evento (DATE), não o SYSDATE da chegada
+        return (datetime.datetime.fromisoformat(dados['timestamp']),) + linha[1:] + (chave,)
+
+    @medido("DBConnector.salvar_interacao")
+    def salvar_interacao(self, dados):
+        if self.shard is not None:
+            # O id global do shard é atribuído em _gravar_lote
+            for rejeitado in self.salvar_lote([dados], tamanho_lote=1)["rejeitados"]:
+                print(f"[ERRO AO SALVAR] {rejeitado['erro']}")
+            return
+        try:
+            with self.conexao() as conn:
+                cursor = conn.cursor()
+                cursor.execute(self._sql_insert(), self._preparar_linha(dados))
+                conn.commit()
+            self._avisar_gravacao(cursor.rowcount)
         except Exception as e:
             print(f"[ERRO AO SALVAR] {e}")
 
-    def ler_dados(self, limit=50):
+    @medido("DBConnector.salvar_lote")
+    def salvar_lote(self, registros, tamanho_lote=500):
+        """
+        Ingestão em massa: grava os registros em blocos de `tamanho_lote`,
+        um único executemany + commit por bloco (aceita lista, iterador
+        ou colunas {campo: array}, como as de gerar_lote).
+        Registros com problema são reportados um a um, sem derrubar o lote;
+        registros repetidos (mesmo id_evento + conteúdo; sem id_evento, mesmo conteúdo)
+        são contados em "duplicados".
+        Retorna {"inseridos": int, "duplicados": int, "rejeitados": [{"indice": i, "erro": str}]}.
+        """
+        resultado = {"inseridos": 0, "duplicados": 0, "rejeitados": []}
+        tamanho_lote = max(1, int(tamanho_lote))
+        if isinstance(registros, Mapping):
+            registros = _registros_de_colunas(registros)
+        try:
+            with self.conexao() as conn:
+                lote = []
+                for indice, dados in enumerate(registros):
+                    lote.append((indice, dados))
+                    if len(lote) >= tamanho_lote:
+                        self._gravar_lote(conn, lote, resultado)
+                        lote = []
+                if lote:
+                    self._gravar_lote(conn, lote, resultado)
+        except Exception as e:
+            print(f"[ERRO AO SALVAR LOTE] {e}")
+        return resultado
+
+    def _gravar_lote(self, conn, lote, resultado):
+        """Grava um bloco [(indice, dados), ...] em uma transação."""
+        indices, linhas = [], []
+        for indice, dados in lote:
             try:
-                conn = self.get_connection()
-                if self.driver == "sqlite":
-                    query = f"SELECT * FROM {TABLE_NAME} ORDER BY id DESC LIMIT {limit}"
+                linhas.append(self._preparar_linha(dados))
+                indices.append(indice)
+            except (KeyError, TypeError, AttributeError) as e:
+                resultado["rejeitados"].append({"indice": indice, "erro": f"Registro incompleto: {e}"})
+            except ValueError as e:
+                resultado["rejeitados"].append({"indice": indice, "erro": f"Timestamp inválido: {e}"})
+        if not linhas:
+            return
+
+        cursor = conn.cursor()
+        sql = self._sql_insert()
+
+        if self.driver == "sqlite":
+            try:
+                cursor.executemany(sql, self._com_ids(conn, linhas))
+                conn.commit()
+                # rowcount soma só as linhas gravadas (o OR IGNORE não conta)
+                resultado["inseridos"] += cursor.rowcount
+                resultado["duplicados"] += len(linhas) - cursor.rowcount
+                self._avisar_gravacao(cursor.rowcount)
+            except sqlite3.Error:
+                # Um registro ruim não pode derrubar o bloco: refaz linha a linha
+                conn.rollback()
+                inseridos = 0
+                for indice, linha in zip(indices, self._com_ids(conn, linhas)):
+                    try:
+                        cursor.execute(sql, linha)
+                        inseridos += cursor.rowcount
+                        resultado["inseridos" if cursor.rowcount else "duplicados"] += 1
+                    except sqlite3.Error as e:
+                        resultado["rejeitados"].append({"indice": indice, "erro": str(e)})
+                conn.commit()
+                self._avisar_gravacao(inseridos)
+
+        elif self.driver == "oracle":
+            # Array binding: um round-trip por bloco, erros reportados por offset
+            cursor.executemany(sql, linhas, batcherrors=True)
+            erros = cursor.getbatcherrors()
+            for erro in erros:
+                if erro.code == 1:
+                    # ORA-00001: outro processo gravou o mesmo registro entre o MERGE e o INSERT
+                    resultado["duplicados"] += 1
                 else:
-                    query = f"""
-                        SELECT id, timestamp, id_sensor, 
-                            tempo_permanencia, 
-                            tempo_interacao,
-                            acao_usuario,
-                            tempo_resposta_ms,
-                            status_sistema,
-                            tipo_interacao 
-                        FROM {TABLE_NAME} 
-                        ORDER BY id DESC 
-                        FETCH FIRST {limit} ROWS ONLY
-                    """
-                df = pd.read_sql(query, conn)
-                df.columns = df.columns.str.lower()
-                conn.close()
-
-                # --- LIMPEZA DE DADOS (DATA CLEANING) ---
-                if not df.empty:
-                    # 1. Remove duplicatas exatas (caso o sensor tenha enviado 2x)
-                    # Ignoramos a coluna 'id' pois ela é sempre única no banco
-                    subset_cols = [c for c in df.columns if c != 'id']
-                    duplicadas = df.duplicated(subset=subset_cols).sum()
-                    if duplicadas > 0:
-                        df = df.drop_duplicates(subset=subset_cols)
-                        # print(f"🧹 Limpeza: {duplicadas} registros duplicados removidos.")
-
-                return df
-            except Exception:
-                return pd.DataFrame()
\ No newline at end of file
+                    resultado["rejeitados"].append({"indice": indices[erro.offset], "erro": erro.message})
+            conn.commit()
+            # rowcount do MERGE = linhas inseridas (as que já existiam não contam)
+            resultado["inseridos"] += cursor.rowcount
+            resultado["duplicados"] += len(linhas) - len(erros) - cursor.rowcount
+
+    def _avisar_gravacao(self, inseridos):
+        """Acorda o dashboard depois de um commit que gravou algo (só SQLite: o aviso é local)."""
+        if inseridos > 0 and self.driver == "sqlite":
+            # Com shards, o aviso vai para o banco base: o dashboard vigia um arquivo só.
+            # Porta lida a cada aviso: benchmark e testes a zeram (só o arquivo de sequência)
+            notificacao.avisar(DB_SQLITE_PATH, porta=settings.NOTIFICACAO_PORTA)
+
+    def _com_ids(self, conn, linhas):
+        """Shard: prefixa cada linha com o id global. Fora do modo shardado o AUTOINCREMENT decide."""
+        if self.shard is None:
+            return linhas
+        # Trava de escrita antes do MAX(id): mesmo com dois processos no shard, nenhum id se repete
+        conn.execute("BEGIN IMMEDIATE")
+        maximo = conn.execute(f"SELECT MAX(id) FROM {TABLE_NAME}").fetchone()[0] or 0
+        primeiro = max(maximo + MAX_SHARDS, time.time_ns() // 1000 * MAX_SHARDS + self.shard)
+        return [(primeiro + i * MAX_SHARDS,) + linha for i, linha in enumerate(linhas)]
+
+    def _filtros(self, id_sensor=None, inicio=None, fim=None, tipo_interacao=None):
+        """
+        Condições + binds nomeados dos filtros de leitura (nada é interpolado na SQL).
+        `inicio`/`fim` aceitam datetime ou texto 'YYYY-MM-DD HH:MM:SS' (fim exclusivo);
+        `tipo_interacao` aceita um valor ou uma lista.
+        """
+        condicoes, params = [], {}
+        if id_sensor:
+            condicoes.append("id_sensor = :id_sensor")
+            params["id_sensor"] = id_sensor
+        for nome, operador, valor in (("inicio", ">=", inicio), ("fim", "<", fim)):
+            if valor is not None:
+                condicoes.append(f"{self._coluna_tempo()} {operador} :{nome}")
+                params[nome] = self._valor_tempo(valor)
+        if tipo_interacao:
+            tipos = [tipo_interacao] if isinstance(tipo_interacao, str) else list(tipo_interacao)
+            binds = [f":tipo_{i}" for i in range(len(tipos))]
+            condicoes.append(f"tipo_interacao IN ({', '.join(binds)})")
+            params.update({b[1:]: t for b, t in zip(binds, tipos)})
+        return condicoes, params
+
+    def _coluna_tempo(self):
+        # SQLite: inteiro indexado (ts_epoch); Oracle: a própria coluna DATE
+        return "ts_epoch" if self.driver == "sqlite" else "timestamp"
+
+    def _valor_tempo(self, valor):
+        """Bind de tempo comparável com _coluna_tempo() (aceita datetime ou texto ISO)."""
+        if self.driver == "sqlite":
+            return epoch_de_timestamp(valor)
+        if isinstance(valor, str):
+            return datetime.datetime.fromisoformat(valor)
+        return valor
+
+    def _selecao(self, colunas=None):
+        """Lista do SELECT: mesmos nomes de COLUNAS, já no formato de _tipar."""
+        expressoes = []
+        for c in colunas or COLUNAS:
+            if c == "timestamp" and self.driver == "sqlite":
+                expressoes.append("ts_epoch AS timestamp")
+            elif c in DTYPES and c != "id":
+                # NULL viraria NaN e impediria o int64 declarado
+                expressoes.append(f"COALESCE({c}, 0) AS {c}")
+            else:
+                expressoes.append(c)
+        return ", ".join(expressoes)
+
+    def _tipar(self, df):
+        """Aplica os tipos declarados (DTYPES + timestamp em TIPO_TEMPO) ao resultado do read_sql."""
+        import pandas as pd
+        df.columns = df.columns.str.lower()
+        if "timestamp" in df.columns:
+            if self.driver == "sqlite":
+                df["timestamp"] = pd.to_datetime(df["timestamp"], unit="s")
+            elif not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
+                df["timestamp"] = pd.to_datetime(df["timestamp"])
+            tipar_tempo(df)
+        return df.astype({c: t for c, t in DTYPES.items() if c in df.columns})
+
+    def _ler(self, condicoes, params, limit):
+        """SELECT das colunas de COLUNAS, mais recentes primeiro, com limite como bind."""
+        import pandas as pd
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        if self.driver == "sqlite":
+            query = f"SELECT {self._selecao()} FROM {TABLE_NAME} {where} ORDER BY id DESC LIMIT :limite"
+        else:
+            query = f"""
+                SELECT {self._selecao()}
+                FROM {TABLE_NAME} {where}
+                ORDER BY id DESC
+                FETCH FIRST :limite ROWS ONLY
+            """
+        params = {**params, "limite": int(limit)}
+        with self.conexao() as conn, trecho("DBConnector.read_sql"):
+            df = pd.read_sql(query, conn, params=params)
+        # Sem drop_duplicates: a deduplicação acontece na escrita (hash_conteudo UNIQUE)
+        return self._tipar(df)
+
+    @medido("DBConnector.ler_dados")
+    def ler_dados(self, limit=50, antes_de_id=None, incluir_arquivo=False, **filtros):
+        """
+        As `limit` linhas mais recentes que passam nos filtros (id_sensor, inicio,
+        fim, tipo_interacao). Paginação por keyset: passe em `antes_de_id` o menor
+        id da página anterior (id < antes_de_id usa o índice, sem OFFSET).
+        Com `incluir_arquivo`, tabela quente e arquivo Parquet são lidos como um só conjunto.
+        """
+        import pandas as pd
+        try:
+            condicoes, params = self._filtros(**filtros)
+            if antes_de_id is not None:
+                condicoes.append("id < :antes_de_id")
+                params["antes_de_id"] = int(antes_de_id)
+            df = self._ler(condicoes, params, limit)
+            if incluir_arquivo:
+                df = self._juntar_arquivo(df, limit, antes_de_id, filtros)
+            return df
+        except Exception:
+            return pd.DataFrame()
+
+    def _juntar_arquivo(self, df, limit, antes_de_id, filtros):
+        """Mescla as `limit` linhas mais recentes da tabela quente e do arquivo Parquet."""
+        import pandas as pd
+        from src.database import arquivo
+        arquivadas = arquivo.ler(limit, antes_de_id, **filtros)
+        if arquivadas.empty:
+            return df
+        partes = [p for p in (df, arquivadas) if not p.empty]
+        return pd.concat(partes, ignore_index=True).nlargest(limit, 'id').reset_index(drop=True)
+
+    def ler_paginas(self, tamanho_pagina=1000, **filtros):
+        """Percorre do mais recente para o mais antigo, uma página (DataFrame) por vez."""
+        antes_de_id = None
+        while True:
+            pagina = self.ler_dados(tamanho_pagina, antes_de_id, **filtros)
+            if pagina.empty:
+                return
+            yield pagina
+            if len(pagina) < tamanho_pagina:
+                return
+            antes_de_id = int(pagina['id'].iloc[-1])
+
+    @medido("DBConnector.ler_novos")
+    def ler_novos(self, desde_id=0, limit=1000, **filtros):
+        """
+        Leitura incremental (tail): só as linhas com id > desde_id,
+        mais recentes primeiro, no máximo `limit` (aceita os filtros de ler_dados).
+        Com desde_id=0 devolve a janela inicial (as `limit` mais recentes).
+        """
+        import pandas as pd
+        try:
+            condicoes, params = self._filtros(**filtros)
+            condicoes.append("id > :desde_id")
+            params["desde_id"] = int(desde_id)
+            return self._ler(condicoes, params, limit)
+        except Exception:
+            return pd.DataFrame()
+
+    def avancar_marca(self, marca, df):
+        """Marca d'água para o próximo ler_novos, depois de receber `df`."""
+        return max(int(marca or 0), int(df['id'].max()))
+
+    @medido("DBConnector.max_id")
+    def max_id(self, **filtros):
+        """
+        Maior id do recorte (a "marca d'água" que diz se algo mudou).
+        Sem filtro ou só com totem, é uma busca no fim do índice.
+        """
+        condicoes, params = self._filtros(**filtros)
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        try:
+            return self._consultar(f"SELECT MAX(id) FROM {TABLE_NAME} {where}", params)[0][0] or 0
+        except Exception:
+            return 0
+
+    @medido("DBConnector.listar_sensores")
+    def listar_sensores(self):
+        """
+        Totens distintos, em ordem. Em vez de DISTINCT (que varre o índice inteiro),
+        salta de um id_sensor para o próximo pelo índice (id_sensor, id):
+        uma busca por totem, não importa quantas linhas cada um tem.
+        """
+        recursivo = "RECURSIVE " if self.driver == "sqlite" else ""
+        query = f"""
+            WITH {recursivo}sensores (sensor) AS (
+                SELECT MIN(id_sensor) FROM {TABLE_NAME}
+                UNION ALL
+                SELECT (SELECT MIN(t.id_sensor) FROM {TABLE_NAME} t WHERE t.id_sensor > s.sensor)
+                FROM sensores s
+                WHERE s.sensor IS NOT NULL
+            )
+            SELECT sensor FROM sensores WHERE sensor IS NOT NULL
+        """
+        try:
+            return [linha[0] for linha in self._consultar(query, {})]
+        except Exception:
+            return []
+
+    def ler_em_blocos(self, tamanho_bloco=10000, colunas=None, desde_id=0, incluir_arquivo=False):
+        """
+        Percorre a tabela inteira em ordem de id, um DataFrame por bloco.
+        Keyset pagination (id > último visto), sem OFFSET: cada página custa o
+        mesmo, e só um bloco fica em memória por vez.
+        Com `incluir_arquivo`, os blocos do arquivo Parquet (mais antigos) vêm antes.
+        """
+        import pandas as pd
+        if incluir_arquivo:
+            from src.database import arquivo
+            yield from arquivo.ler_em_blocos(tamanho_bloco, colunas)
+
+        selecionadas = self._selecao(["id"] + [c for c in (colunas or COLUNAS) if c != "id"])
+        if self.driver == "sqlite":
+            query = f"SELECT {selecionadas} FROM {TABLE_NAME} WHERE id > :ultimo_id ORDER BY id LIMIT :n"
+        else:
+            query = f"""
+                SELECT {selecionadas} FROM {TABLE_NAME}
+                WHERE id > :ultimo_id
+                ORDER BY id
+                FETCH FIRST :n ROWS ONLY
+            """
+        ultimo_id = int(desde_id)
+        while True:
+            with self.conexao() as conn:
+                df = pd.read_sql(query, conn, params={"ultimo_id": ultimo_id, "n": int(tamanho_bloco)})
+            df = self._tipar(df)
+            if df.empty:
+                return
+            ultimo_id = int(df['id'].iloc[-1])
+            yield df
+            if len(df) < tamanho_bloco:
+                return
+
+    # --- CAMADA DE AGREGAÇÃO (o banco calcula, o Python só recebe o resultado) ---
+    def _where(self, id_sensor=None, *condicoes):
+        """Monta o WHERE com filtro opcional de totem (bind nomeado, vale nos dois drivers)."""
+        condicoes = list(condicoes)
+        params = {}
+        if id_sensor:
+            condicoes.append("id_sensor = :id_sensor")
+            params["id_sensor"] = id_sensor
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        return where, params
+
+    def _consultar(self, query, params):
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    def _contagem(self, expressao, id_sensor=None, *condicoes, tabela=TABLE_NAME, medida="COUNT(*)", inicio=None):
+        """Equivalente a value_counts() de `expressao`, feito com GROUP BY (na tabela bruta ou num rollup)."""
+        import pandas as pd
+        periodo, params_periodo = self._periodo_rollup(inicio)
+        where, params = self._where(id_sensor, *condicoes, *periodo)
+        params.update(params_periodo)
+        query = f"""
+            SELECT {expressao} AS chave, {medida} AS total
+            FROM {tabela} {where}
+            GROUP BY {expressao}
+            ORDER BY total DESC
+        """
+        try:
+            linhas = self._consultar(query, params)
+        except Exception:
+            linhas = []
+        return pd.Series({chave: int(total) for chave, total in linhas if chave is not None}, name="count", dtype="int64")
+
+    # --- ROLLUPS (KPIs, perfis, tendências e ranking leem os baldes pré-agregados) ---
+    @medido("DBConnector.atualizar_rollups")
+    def atualizar_rollups(self):
+        """Catch-up incremental dos rollups (só as linhas com id acima do último processado)."""
+        try:
+            with self.conexao() as conn:
+                return rollups.atualizar(conn, self.driver, TABLE_NAME)
+        except Exception as e:
+            print(f"[ERRO AO ATUALIZAR ROLLUPS] {e}")
+            return 0
+
+    @staticmethod
+    def _periodo_rollup(inicio):
+        """Condição + bind do período nos baldes de hora dos rollups (resolução de uma hora)."""
+        if inicio is None:
+            return [], {}
+        return ["balde >= :inicio"], {"inicio": _balde_hora(inicio)}
+
+    @medido("DBConnector.kpis")
+    def kpis(self, id_sensor=None, inicio=None):
+        """Total de sessões, taxa de engajamento (%), permanência média (s) e latência média (ms)."""
+        return self._kpis(*self._somas_kpis(id_sensor, inicio))
+
+    def _somas_kpis(self, id_sensor=None, inicio=None):
+        """(sessões, engajados, soma permanência, soma latência, erros): somas, então mescláveis entre shards."""
+        periodo, params_periodo = self._periodo_rollup(inicio)
+        where, params = self._where(id_sensor, *periodo)
+        params.update(params_periodo)
+        query = f"""
+            SELECT SUM(sessoes),
+                SUM(CASE WHEN tipo_interacao = 'Engajado' THEN sessoes ELSE 0 END),
+                SUM(soma_permanencia),
+                SUM(soma_latencia),
+                SUM(erros)
+            FROM {ROLLUP_HORA} {where}
+        """
+        try:
+            return tuple(v or 0 for v in self._consultar(query, params)[0])
+        except Exception:
+            return 0, 0, 0, 0, 0
+
+    @staticmethod
+    def _kpis(total, engajados, soma_perm, soma_latencia, erros):
+        total = int(total or 0)
+        return {
+            "total": total,
+            "taxa_engajamento": (engajados or 0) / total * 100 if total else 0.0,
+            "media_permanencia": float(soma_perm or 0) / total if total else 0.0,
+            "media_latencia": float(soma_latencia or 0) / total if total else 0.0,
+            "taxa_erros": (erros or 0) / total * 100 if total else 0.0,
+        }
+
+    @medido("DBConnector.percentis_latencia")
+    def percentis_latencia(self, id_sensor=None, inicio=None, fim=None):
+        """
+        p50/p95/p99 da latência (ms), sessões medidas e taxa de timeout (%),
+        do sketch de latência: custo pelo número de faixas, não de linhas.
+        Sem recorte lê o acumulado por totem; `inicio`/`fim` (datetime ou texto
+        ISO, fim exclusivo) somam os baldes de hora, com resolução de uma hora.
+        """
+        return self._sketch_latencia(id_sensor, inicio, fim).resumo()
+
+    def _sketch_latencia(self, id_sensor=None, inicio=None, fim=None):
+        """Sketch combinado do recorte (mesclável entre shards)."""
+        condicoes, params = [], {}
+        for nome, operador, valor in (("inicio", ">=", inicio), ("fim", "<", fim)):
+            if valor is not None:
+                condicoes.append(f"balde {operador} :{nome}")
+                params[nome] = _balde_hora(valor)
+        tabela = rollups.SKETCHES["hora" if condicoes else "total"][0]
+        where, filtro = self._where(id_sensor, *condicoes)
+        query = f"""
+            SELECT faixa, SUM(contagem), SUM(timeouts)
+            FROM {tabela} {where}
+            GROUP BY faixa
+        """
+        try:
+            return SketchLatencia.de_linhas(self._consultar(query, {**params, **filtro}))
+        except Exception:
+            return SketchLatencia()
+
+    @medido("DBConnector.media_por_perfil")
+    def media_por_perfil(self, id_sensor=None, inicio=None):
+        """Média de permanência e interação por tipo_interacao."""
+        return self._medias_por_perfil(self._somas_por_perfil(id_sensor, inicio))
+
+    def _somas_por_perfil(self, id_sensor=None, inicio=None):
+        import pandas as pd
+        periodo, params_periodo = self._periodo_rollup(inicio)
+        where, params = self._where(id_sensor, *periodo)
+        params.update(params_periodo)
+        query = f"""
+            SELECT tipo_interacao, SUM(soma_permanencia), SUM(soma_interacao), SUM(sessoes)
+            FROM {ROLLUP_HORA} {where}
+            GROUP BY tipo_interacao
+            ORDER BY tipo_interacao
+        """
+        try:
+            linhas = self._consultar(query, params)
+        except Exception:
+            linhas = []
+        df = pd.DataFrame(linhas, columns=['tipo_interacao', 'tempo_permanencia', 'tempo_interacao', 'sessoes'])
+        return df.set_index('tipo_interacao')
+
+    @staticmethod
+    def _medias_por_perfil(somas):
+        medias = somas[['tempo_permanencia', 'tempo_interacao']].div(somas['sessoes'], axis=0)
+        return medias.astype("float64")
+
+    @medido("DBConnector.engajados_por_dia_semana")
+    def engajados_por_dia_semana(self, id_sensor=None, inicio=None):
+        """Sessões 'Engajado' por dia da semana (nomes em inglês, como dt.day_name())."""
+        condicao = "tipo_interacao = 'Engajado'"
+        if self.driver == "sqlite":
+            contagem = self._contagem("strftime('%w', balde || ':00')", id_sensor, condicao,
+                                      tabela=ROLLUP_HORA, medida="SUM(sessoes)", inicio=inicio)
+            contagem.index = [DIAS_SEMANA[int(d)] for d in contagem.index]
+            return contagem
+        return self._contagem("TO_CHAR(TO_DATE(balde, 'YYYY-MM-DD HH24'), 'fmDay', 'NLS_DATE_LANGUAGE=ENGLISH')",
+                              id_sensor, condicao, tabela=ROLLUP_HORA, medida="SUM(sessoes)", inicio=inicio)
+
+    @medido("DBConnector.engajados_por_sensor")
+    def engajados_por_sensor(self, id_sensor=None, inicio=None):
+        """Ranking de totens por sessões 'Engajado'."""
+        return self._contagem("id_sensor", id_sensor, "tipo_interacao = 'Engajado'",
+                              tabela=ROLLUP_HORA, medida="SUM(sessoes)", inicio=inicio)
+
+    @medido("DBConnector.serie_temporal")
+    def serie_temporal(self, granularidade="hora", desde=None, id_sensor=None):
+        """
+        Sessões por balde de tempo e tipo_interacao (DataFrame: índice = balde, colunas = tipos).
+        `desde` é um prefixo comparável de timestamp (ex.: '2024-05-01 08').
+        """
+        import pandas as pd
+        tabela = rollups.GRANULARIDADES[granularidade][0]
+        condicoes = ["balde >= :desde"] if desde else []
+        where, params = self._where(id_sensor, *condicoes)
+        if desde:
+            params["desde"] = desde
+        query = f"""
+            SELECT balde, tipo_interacao, SUM(sessoes)
+            FROM {tabela} {where}
+            GROUP BY balde, tipo_interacao
+            ORDER BY balde
+        """
+        try:
+            linhas = self._consultar(query, params)
+        except Exception:
+            linhas = []
+        if not linhas:
+            return pd.DataFrame()
+        df = pd.DataFrame(linhas, columns=['balde', 'tipo_interacao', 'sessoes'])
+        return df.pivot(index='balde', columns='tipo_interacao', values='sessoes').fillna(0)
+
+    @medido("DBConnector.contagem_acoes")
+    def contagem_acoes(self, id_sensor=None, inicio=None):
+        """Frequência de cada comando (ignora sessões sem ação)."""
+        return self._contagem("acao_usuario", id_sensor, "acao_usuario <> 'Nenhuma'",
+                              tabela=rollups.TABELA_ACOES, medida="SUM(sessoes)", inicio=inicio)
+
+    @medido("DBConnector.agregados_painel")
+    def agregados_painel(self, id_sensor=None, inicio=None):
+        """
+        Tudo que os gráficos agregados do dashboard precisam. Com `inicio` (período
+        do painel) todos somam só os baldes de hora a partir dele; sem, o histórico inteiro.
+        """
+        # Tendência horária dos últimos 7 dias (168 baldes, qualquer que seja o volume bruto),
+        # ou do período, se for mais curto
+        desde = (datetime.datetime.now() - datetime.timedelta(days=7)).strftime("%Y-%m-%d %H")
+        if inicio is not None:
+            desde = max(desde, _balde_hora(inicio))
+        return {
+            "kpis": self.kpis(id_sensor, inicio),
+            "media_por_perfil": self.media_por_perfil(id_sensor, inicio),
+            "engajados_por_dia": self.engajados_por_dia_semana(id_sensor, inicio),
+            "engajados_por_sensor": self.engajados_por_sensor(id_sensor, inicio),
+            "serie_horaria": self.serie_temporal("hora", desde, id_sensor),
+            "acoes": self.contagem_acoes(id_sensor, inicio),
+            "latencia": self.percentis_latencia(id_sensor, inicio),
+        }
\ No newline at end of file
@@ -0,0 +1,144 @@
+# Arquivo: src/database/migrations.py
+"""
+Migrações versionadas do SQLite.
+A versão do schema fica em PRAGMA user_version (0 = banco V3 sem controle),
+então bancos antigos são atualizados no lugar, sem recriar a tabela.
+"""
+from src.core.chaves import CAMPOS_CHAVE, hash_conteudo
+from src.database import rollups
+
+
+def tabela_arquivados(tabela):
+    """Hashes das linhas que saíram para o Parquet (src/database/arquivo.py)."""
+    return f"{tabela}_ARQUIVADOS"
+
+
+def _v1_tabela_base(conn, tabela):
+    # Schema V3: Adicionado acao, latencia e status
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {tabela} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            id_sensor TEXT,
+            tempo_permanencia REAL,
+            tempo_interacao REAL,
+            acao_usuario TEXT,
+            tempo_resposta_ms INTEGER,
+            status_sistema TEXT,
+            tipo_interacao TEXT
+        )
+    ''')
+
+
+def _v2_indices(conn, tabela):
+    # Filtro por totem (mais recentes primeiro) e recortes de tempo sem full scan
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabela.lower()}_sensor_id ON {tabela} (id_sensor, id)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabela.lower()}_timestamp ON {tabela} (timestamp)")
+
+
+def _v3_dedup_escrita(conn, tabela):
+    # Deduplicação passa a ser feita na escrita: coluna com o hash do conteúdo + UNIQUE.
+    # Backfill: calcula o hash das linhas existentes com a mesma função do INSERT
+    # (registrada como função SQL) e remove as duplicatas, mantendo a mais antiga.
+    conn.execute(f"ALTER TABLE {tabela} ADD COLUMN hash_conteudo TEXT")
+    conn.create_function("hash_conteudo", len(CAMPOS_CHAVE), hash_conteudo, deterministic=True)
+    conn.execute(f"UPDATE {tabela} SET hash_conteudo = hash_conteudo({', '.join(CAMPOS_CHAVE)})")
+    removidas = conn.execute(f"""
+        DELETE FROM {tabela}
+        WHERE id NOT IN (SELECT MIN(id) FROM {tabela} GROUP BY hash_conteudo)
+    """).rowcount
+    conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{tabela.lower()}_hash ON {tabela} (hash_conteudo)")
+    if removidas:
+        print(f"🧹 Backfill: {removidas} registros duplicados removidos.")
+
+
+def _v4_rollups(conn, tabela):
+    # Tabelas pré-agregadas por minuto/hora; o histórico é somado no primeiro catch-up
+    rollups.criar_tabelas_sqlite(conn)
+
+
+def _v5_tempo_epoch(conn, tabela):
+    # Instante do evento como INTEGER (segundos): filtros comparam inteiros e a leitura
+    # devolve datetime sem parsear texto. O strftime('%s') do SQLite faz a mesma conta
+    # de epoch_de_timestamp (texto sem fuso); o índice de tempo passa para a coluna nova.
+    conn.execute(f"ALTER TABLE {tabela} ADD COLUMN ts_epoch INTEGER")
+    conn.execute(f"UPDATE {tabela} SET ts_epoch = CAST(strftime('%s', timestamp) AS INTEGER)")
+    conn.execute(f"DROP INDEX IF EXISTS idx_{tabela.lower()}_timestamp")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabela.lower()}_ts_epoch ON {tabela} (ts_epoch)")
+
+
+def _v6_sketch_latencia(conn, tabela):
+    # Sketch de latência (por hora/totem e acumulado). O histórico já somado nos rollups entra
+    # agora (até o ultimo_id do controle); o resto chega com o próximo catch-up, como os rollups.
+    rollups.criar_sketch_sqlite(conn)
+    controle = conn.execute(f"SELECT ultimo_id FROM {rollups.TABELA_CONTROLE} WHERE nome = 'rollups'").fetchone()
+    if controle and controle[0]:
+        for nivel in rollups.SKETCHES:
+            conn.execute(rollups.sql_upsert_sketch("sqlite", tabela, nivel), {"desde": 0, "ate": controle[0]})
+
+
+def _v7_hashes_arquivados(conn, tabela):
+    # O UNIQUE do hash só enxerga a tabela quente: sem isto, regravar uma linha já
+    # arquivada passaria, seria arquivada de novo e somada duas vezes nos rollups.
+    # RAISE(IGNORE) descarta a linha como o OR IGNORE (conta como duplicado).
+    arquivados = tabela_arquivados(tabela)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {arquivados} (hash_conteudo TEXT PRIMARY KEY) WITHOUT ROWID")
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{tabela.lower()}_arquivados
+        BEFORE INSERT ON {tabela}
+        WHEN EXISTS (SELECT 1 FROM {arquivados} WHERE hash_conteudo = NEW.hash_conteudo)
+        BEGIN SELECT RAISE(IGNORE); END
+    """)
+
+
+def _v8_rollup_acoes(conn, tabela):
+    # Comandos por hora e totem: o gráfico de ações deixa de varrer a tabela bruta.
+    # Backfill como o da v6: o que o controle já cobre entra agora, o resto no catch-up.
+    # (Linhas já arquivadas não estão na tabela quente; também não entravam na contagem antiga.)
+    rollups.criar_acoes_sqlite(conn)
+    ultimo = rollups.ultimo_somado(conn)
+    if ultimo:
+        conn.execute(rollups.sql_upsert_acoes("sqlite", tabela), {"desde": 0, "ate": ultimo})
+
+
+# (versão, descrição, função) — sempre em ordem crescente, nunca editar uma já publicada
+MIGRACOES = [
+    (1, "Tabela base V3", _v1_tabela_base),
+    (2, "Índices (id_sensor, id) e timestamp", _v2_indices),
+    (3, "Hash do conteúdo com UNIQUE (deduplicação na escrita)", _v3_dedup_escrita),
+    (4, "Rollups por minuto e por hora", _v4_rollups),
+    (5, "Coluna ts_epoch (instante do evento em segundos)", _v5_tempo_epoch),
+    (6, "Sketch de latência por hora e totem (percentis)", _v6_sketch_latencia),
+    (7, "Hashes das linhas arquivadas (deduplicação contra o Parquet)", _v7_hashes_arquivados),
+    (8, "Rollup de comandos (acao_usuario) por hora e totem", _v8_rollup_acoes),
+]
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+
+def versao_schema(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrar_sqlite(conn, tabela):
+    """Aplica as migrações pendentes e retorna a versão final do schema."""
+    if versao_schema(conn) >= VERSAO_ATUAL:
+        return VERSAO_ATUAL
+
+    # WAL: leitores (dashboard) não bloqueiam o escritor (simulador).
+    # O modo fica gravado no arquivo e não pode ser trocado dentro de transação.
+    conn.execute("PRAGMA journal_mode=WAL")
+
+    # BEGIN IMMEDIATE serializa processos que sobem ao mesmo tempo
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        versao = versao_schema(conn)
+        for numero, descricao, aplicar in MIGRACOES:
+            if numero > versao:
+                aplicar(conn, tabela)
+                print(f"🛠️ Migração v{numero} aplicada: {descricao}")
+        conn.execute(f"PRAGMA user_version = {VERSAO_ATUAL}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return VERSAO_ATUAL
@@ -0,0 +1,147 @@
+# Arquivo: src/database/notificacao.py
+"""
+Aviso de "chegaram linhas" entre quem grava e o dashboard, sem broker.
+
+Quem grava (DBConnector, inclusive os escritores de shard) chama avisar()
+depois de cada commit que inseriu algo:
+  1. grava um número de sequência em <banco>.seq — a fonte da verdade,
+     visível para qualquer processo da máquina;
+  2. manda um datagrama UDP para 127.0.0.1:NOTIFICACAO_PORTA — o empurrão
+     que acorda o dashboard na hora.
+O Ouvinte (um por processo do dashboard) dorme no socket e confere o arquivo
+a cada acordada: datagrama perdido, porta ocupada por outro dashboard ou
+escritor que não alcança a porta só atrasam o aviso até a próxima conferência.
+"""
+import os
+import socket
+import struct
+import threading
+import time
+
+from config.settings import (NOTIFICACAO_PORTA, NOTIFICACAO_DEBOUNCE_S,
+                             NOTIFICACAO_ATRASO_MAX_S, NOTIFICACAO_CONFERENCIA_S)
+
+_FORMATO = "<Q"
+_ENVIO = None
+_ENVIO_LOCK = threading.Lock()
+
+
+def caminho_sequencia(caminho_banco):
+    # Um arquivo por banco lógico (com shards, o da base: o dashboard vigia um só)
+    return caminho_banco.with_name(caminho_banco.name + ".seq")
+
+
+def ler_sequencia(caminho):
+    """Última sequência gravada (0 se o arquivo ainda não existe ou está vazio)."""
+    try:
+        with open(caminho, "rb") as f:
+            dados = f.read(struct.calcsize(_FORMATO))
+    except FileNotFoundError:
+        return 0
+    return struct.unpack(_FORMATO, dados)[0] if len(dados) == struct.calcsize(_FORMATO) else 0
+
+
+def _socket_envio():
+    global _ENVIO
+    with _ENVIO_LOCK:
+        if _ENVIO is None:
+            _ENVIO = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            _ENVIO.setblocking(False)
+        return _ENVIO
+
+
+def avisar(caminho_banco, porta=NOTIFICACAO_PORTA):
+    """Marca que o banco mudou. Nunca falha a gravação: aviso perdido só atrasa o refresh."""
+    caminho = caminho_sequencia(caminho_banco)
+    sequencia = time.time_ns()
+    try:
+        # pwrite sem truncar: o leitor nunca vê o arquivo vazio no meio da troca
+        fd = os.open(caminho, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.pwrite(fd, struct.pack(_FORMATO, sequencia), 0)
+        finally:
+            os.close(fd)
+    except OSError as e:
+        print(f"[ERRO NOTIFICAÇÃO] {e}")
+        return
+    if porta:
+        try:
+            _socket_envio().sendto(struct.pack(_FORMATO, sequencia), ("127.0.0.1", porta))
+        except OSError:
+            pass  # ninguém ouvindo (ou buffer cheio): o arquivo já registrou
+
+
+class Ouvinte:
+    """
+    Espera por linhas novas do lado do dashboard.
+    Uma thread por processo escuta a porta (se estiver livre) e confere o
+    arquivo de sequência; as sessões esperam em esperar().
+    """
+
+    def __init__(self, caminho_banco, porta=NOTIFICACAO_PORTA):
+        self.caminho = caminho_sequencia(caminho_banco)
+        self.sequencia = ler_sequencia(self.caminho)
+        self.acordadas = 0
+        self._cond = threading.Condition()
+        self._socket = self._abrir(porta)
+        threading.Thread(target=self._escutar, daemon=True, name="ouvinte-notificacao").start()
+
+    @staticmethod
+    def _abrir(porta):
+        if not porta:
+            return None
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.bind(("127.0.0.1", porta))
+        except OSError:
+            # Outro dashboard já tem a porta: este fica só com o arquivo
+            sock.close()
+            print(f"⚠️ Porta {porta} ocupada: avisos pelo arquivo de sequência (a cada {NOTIFICACAO_CONFERENCIA_S}s)")
+            return None
+        sock.settimeout(NOTIFICACAO_CONFERENCIA_S)
+        return sock
+
+    @property
+    def empurrado(self):
+        """True se recebe os datagramas (False = só conferência do arquivo)."""
+        return self._socket is not None
+
+    def _escutar(self):
+        while True:
+            if self._socket is not None:
+                try:
+                    # Esvazia a rajada que já chegou: um datagrama ou cem, uma conferência
+                    self._socket.recv(64)
+                    self._socket.setblocking(False)
+                    while True:
+                        self._socket.recv(64)
+                except (BlockingIOError, socket.timeout):
+                    pass
+                finally:
+                    self._socket.settimeout(NOTIFICACAO_CONFERENCIA_S)
+            else:
+                time.sleep(NOTIFICACAO_CONFERENCIA_S)
+
+            sequencia = ler_sequencia(self.caminho)
+            if sequencia != self.sequencia:
+                with self._cond:
+                    self.sequencia = sequencia
+                    self.acordadas += 1
+                    self._cond.notify_all()
+
+    def esperar(self, vista, timeout=None):
+        """
+        Bloqueia até a sequência passar de `vista` (ou `timeout` segundos).
+        Depois do primeiro aviso espera NOTIFICACAO_DEBOUNCE_S de silêncio
+        (no máximo NOTIFICACAO_ATRASO_MAX_S): uma rajada vira um refresh só.
+        Retorna a sequência atual (igual a `vista` se deu timeout).
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.sequencia != vista, timeout):
+                return self.sequencia
+            limite = time.monotonic() + NOTIFICACAO_ATRASO_MAX_S
+            while True:
+                atual = self.sequencia
+                restante = min(NOTIFICACAO_DEBOUNCE_S, limite - time.monotonic())
+                if restante <= 0 or not self._cond.wait_for(lambda: self.sequencia != atual, restante):
+                    return self.sequencia
@@ -0,0 +1,128 @@
+# Arquivo: src/database/pool.py
+import math
+import os
+import sqlite3
+import threading
+import time
+
+
+class PoolStats:
+    """Contadores de uso do pool (thread-safe) para medir saturação."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.creates = 0
+        self.tempo_espera_s = 0.0
+
+    def registrar(self, checkouts=0, waits=0, creates=0, tempo_espera_s=0.0):
+        with self._lock:
+            self.checkouts += checkouts
+            self.waits += waits
+            self.creates += creates
+            self.tempo_espera_s += tempo_espera_s
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "creates": self.creates,
+                "tempo_espera_s": round(self.tempo_espera_s, 4),
+            }
+
+
+def _garantir_ln(conn):
+    # LN() do sketch de latência: builds do SQLite sem as funções matemáticas usam o do Python
+    try:
+        conn.execute("SELECT ln(1), ceil(1)")
+    except sqlite3.OperationalError:
+        conn.create_function("ln", 1, math.log, deterministic=True)
+        conn.create_function("ceil", 1, math.ceil, deterministic=True)
+
+
+class SQLitePool:
+    """
+    Uma conexão SQLite reaproveitável por thread.
+    O SQLite é um arquivo local: o custo é abrir o arquivo, não a rede,
+    então basta não fechar a conexão entre chamadas da mesma thread.
+    """
+
+    def __init__(self, path, pragmas=None):
+        self.path = str(path)
+        self.pragmas = pragmas or {}
+        self._local = threading.local()
+        self.stats = PoolStats()
+
+    def acquire(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path)
+            # Pragmas de desempenho valem por conexão, não ficam no arquivo
+            for nome, valor in self.pragmas.items():
+                conn.execute(f"PRAGMA {nome}={valor}")
+            _garantir_ln(conn)
+            self._local.conn = conn
+            self.stats.registrar(creates=1)
+        self.stats.registrar(checkouts=1)
+        return conn
+
+    def release(self, conn):
+        # Nada que não foi commitado pode vazar para o próximo uso da conexão
+        if conn.in_transaction:
+            conn.rollback()
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def estatisticas(self):
+        return {"driver": "sqlite", **self.stats.snapshot()}
+
+
+class OraclePool:
+    """Session pool do oracledb: evita o handshake de rede a cada consulta."""
+
+    def __init__(self, oracledb, user, password, dsn, minimo=1, maximo=4, incremento=1):
+        self._pool = oracledb.create_pool(
+            user=user, password=password, dsn=dsn,
+            min=minimo, max=maximo, increment=incremento,
+            getmode=oracledb.POOLGETMODE_WAIT,
+        )
+        self.stats = PoolStats()
+        self.stats.registrar(creates=self._pool.opened)
+
+    def acquire(self):
+        abertas_antes = self._pool.opened
+        # Pool saturado: o acquire vai bloquear até alguém devolver uma sessão
+        saturado = self._pool.busy >= self._pool.max
+        inicio = time.perf_counter()
+        conn = self._pool.acquire()
+        espera = time.perf_counter() - inicio if saturado else 0.0
+        self.stats.registrar(
+            checkouts=1,
+            waits=1 if saturado else 0,
+            creates=max(0, self._pool.opened - abertas_antes),
+            tempo_espera_s=espera,
+        )
+        return conn
+
+    def release(self, conn):
+        # O oracledb desfaz transações pendentes ao devolver a sessão ao pool
+        self._pool.release(conn)
+
+    def close(self):
+        self._pool.close(force=True)
+
+    def estatisticas(self):
+        return {
+            "driver": "oracle",
+            **self.stats.snapshot(),
+            "abertas": self._pool.opened,
+            "ocupadas": self._pool.busy,
+            "max": self._pool.max,
+        }
@@ -0,0 +1,297 @@
+# Arquivo: src/database/shards.py
+"""
+SQLite particionado por totem (SQLITE_SHARDS > 1).
+
+Cada totem mora sempre no mesmo arquivo (crc32 do id_sensor), então a
+deduplicação por hash e os rollups continuam valendo dentro de cada shard:
+
+    data/processed/flexmedia-shard00de04.db ... flexmedia-shard03de04.db
+
+Escrita: cada shard tem o seu processo escritor (um ProcessPoolExecutor de um
+worker só); salvar_lote divide o lote por shard e grava tudo em paralelo,
+cada processo com a trava de escrita do próprio arquivo.
+Leitura: as consultas rodam em todos os shards ao mesmo tempo (threads; o
+sqlite3 solta o GIL durante a consulta) e os resultados são mesclados:
+linhas por id (ids de shard são globais, ver connector.MAX_SHARDS),
+contagens e somas dos rollups somadas antes de virar médias e taxas.
+
+O DBConnector() devolve um ConectorShards sozinho quando SQLITE_SHARDS > 1.
+"""
+import multiprocessing
+import os
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from config import settings
+from src.database import connector
+from src.database.connector import DBConnector, MAX_SHARDS, shard_de, _registros_de_colunas
+from src.core.instrumentacao import medido
+from src.core.sketch import SketchLatencia
+
+_LOCK = threading.Lock()
+_LEITURA = None
+# (banco base, shard, total) -> executor de um processo só
+_ESCRITORES = {}
+
+
+def _leitura():
+    global _LEITURA
+    with _LOCK:
+        if _LEITURA is None:
+            _LEITURA = ThreadPoolExecutor(max_workers=max(settings.SQLITE_SHARDS, os.cpu_count() or 1),
+                                          thread_name_prefix="shard-leitura")
+        return _LEITURA
+
+
+# --- PROCESSOS ESCRITORES ---
+
+_CONECTOR_ESCRITOR = None
+
+
+def _iniciar_escritor(caminho_base, shard, total):
+    # spawn: o processo filho não herda o estado do pai, então recebe o banco e o total
+    global _CONECTOR_ESCRITOR
+    connector.DB_SQLITE_PATH = Path(caminho_base)
+    settings.SQLITE_SHARDS = total
+    _CONECTOR_ESCRITOR = DBConnector(driver="sqlite", shard=shard)
+
+
+def _gravar_no_shard(registros, tamanho_lote):
+    return _CONECTOR_ESCRITOR.salvar_lote(registros, tamanho_lote)
+
+
+def _escritor(shard, total):
+    chave = (str(connector.DB_SQLITE_PATH), shard, total)
+    with _LOCK:
+        executor = _ESCRITORES.get(chave)
+        if executor is None:
+            # spawn e não fork: o pai pode ter threads e conexões SQLite abertas
+            executor = _ESCRITORES[chave] = ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_iniciar_escritor, initargs=chave,
+            )
+        return executor
+
+
+def encerrar_escritores():
+    """Finaliza os processos escritores (são recriados no próximo salvar_lote)."""
+    with _LOCK:
+        executores = list(_ESCRITORES.values())
+        _ESCRITORES.clear()
+    for executor in executores:
+        executor.shutdown(wait=True)
+
+
+def _juntar(partes, limit=None):
+    """Concatena os DataFrames dos shards, mais recentes (maior id) primeiro."""
+    import pandas as pd
+    cheias = [p for p in partes if not p.empty]
+    if not cheias:
+        return partes[0] if partes else pd.DataFrame()
+    df = pd.concat(cheias, ignore_index=True).sort_values('id', ascending=False, ignore_index=True)
+    return df.head(limit) if limit is not None else df
+
+
+def _somar_series(series):
+    """Soma contagens (value_counts) de vários shards, maior primeiro."""
+    import pandas as pd
+    cheias = [s for s in series if not s.empty]
+    if not cheias:
+        return series[0]
+    return pd.concat(cheias).groupby(level=0).sum().sort_values(ascending=False).astype("int64").rename("count")
+
+
+class ConectorShards(DBConnector):
+    """Mesma API do DBConnector, espalhada por SQLITE_SHARDS arquivos SQLite."""
+
+    def __init__(self, driver=None, shard=None):
+        super().__init__(driver="sqlite")
+        self.total = settings.SQLITE_SHARDS
+        self._shards = [DBConnector(driver="sqlite", shard=k) for k in range(self.total)]
+
+    def shards(self):
+        return list(self._shards)
+
+    def _alvos(self, id_sensor=None):
+        # Filtro por totem: só o shard dele é consultado
+        return [self._shards[shard_de(id_sensor, self.total)]] if id_sensor else self._shards
+
+    def _em_paralelo(self, funcao, alvos=None):
+        alvos = self._shards if alvos is None else alvos
+        if len(alvos) == 1:
+            return [funcao(alvos[0])]
+        return list(_leitura().map(funcao, alvos))
+
+    def _marca(self, marca):
+        """Marca d'água por shard: tupla (um maior id por arquivo); 0/int vale para todos."""
+        if isinstance(marca, (tuple, list)):
+            return list(marca)
+        return [int(marca or 0)] * self.total
+
+    # --- INFRA ---
+    def conexao(self):
+        raise Exception("Modo shardado não tem conexão única: use shards().")
+
+    def get_connection(self):
+        raise Exception("Modo shardado não tem conexão única: use shards().")
+
+    def estatisticas_pool(self):
+        """Soma das estatísticas dos pools de todos os shards."""
+        somadas = {"driver": "sqlite", "shards": self.total}
+        for estatisticas in self._em_paralelo(lambda s: s.estatisticas_pool()):
+            for chave, valor in estatisticas.items():
+                if isinstance(valor, (int, float)):
+                    somadas[chave] = somadas.get(chave, 0) + valor
+        return somadas
+
+    @medido("ConectorShards.init_db")
+    def init_db(self):
+        self._em_paralelo(lambda s: s.init_db())
+
+    @medido("ConectorShards.contar_total")
+    def contar_total(self):
+        return sum(self._em_paralelo(lambda s: s.contar_total()))
+
+    # --- ESCRITA ---
+    @medido("ConectorShards.salvar_interacao")
+    def salvar_interacao(self, dados):
+        # Um registro: gravado direto daqui, sem a ida e volta ao processo escritor
+        self._alvos(dados.get('id_sensor'))[0].salvar_interacao(dados)
+
+    def _particionar(self, registros):
+        """(shard, parte, índices originais) de cada shard com registros no lote."""
+        if isinstance(registros, Mapping) and "id_sensor" in registros:
+            # Colunas (gerar_lote): um crc32 por totem distinto, não por linha
+            colunas = {campo: np.asarray(valores) for campo, valores in registros.items()}
+            unicos, inverso = np.unique(colunas["id_sensor"].astype(str), return_inverse=True)
+            destino = np.array([shard_de(u, self.total) for u in unicos])[inverso.reshape(-1)]
+            for k in range(self.total):
+                indices = np.flatnonzero(destino == k)
+                if len(indices):
+                    yield k, {campo: valores[indices] for campo, valores in colunas.items()}, indices
+            return
+
+        if isinstance(registros, Mapping):
+            registros = _registros_de_colunas(registros)
+        partes = {}
+        for indice, dados in enumerate(registros):
+            sensor = dados.get('id_sensor') if isinstance(dados, Mapping) else None
+            linhas, indices = partes.setdefault(shard_de(sensor, self.total), ([], []))
+            linhas.append(dados)
+            indices.append(indice)
+        for k, (linhas, indices) in sorted(partes.items()):
+            yield k, linhas, indices
+
+    @medido("ConectorShards.salvar_lote")
+    def salvar_lote(self, registros, tamanho_lote=500):
+        """
+        Divide o lote por shard e grava as partes em paralelo, cada uma no
+        processo escritor do seu shard. Mesmo retorno do DBConnector.salvar_lote
+        (índices dos rejeitados referentes ao lote original).
+        """
+        resultado = {"inseridos": 0, "duplicados": 0, "rejeitados": []}
+        try:
+            pendentes = [(indices, _escritor(k, self.total).submit(_gravar_no_shard, parte, tamanho_lote))
+                         for k, parte, indices in self._particionar(registros)]
+            for indices, futuro in pendentes:
+                parcial = futuro.result()
+                resultado["inseridos"] += parcial["inseridos"]
+                resultado["duplicados"] += parcial["duplicados"]
+                resultado["rejeitados"].extend(
+                    {"indice": int(indices[r["indice"]]), "erro": r["erro"]} for r in parcial["rejeitados"])
+        except Exception as e:
+            print(f"[ERRO AO SALVAR LOTE] {e}")
+        resultado["rejeitados"].sort(key=lambda r: r["indice"])
+        return resultado
+
+    # --- LEITURA (fan-out + merge por id) ---
+    @medido("ConectorShards.ler_dados")
+    def ler_dados(self, limit=50, antes_de_id=None, incluir_arquivo=False, **filtros):
+        partes = self._em_paralelo(lambda s: s.ler_dados(limit, antes_de_id, **filtros),
+                                   self._alvos(filtros.get("id_sensor")))
+        df = _juntar(partes, limit)
+        if incluir_arquivo:
+            df = self._juntar_arquivo(df, limit, antes_de_id, filtros)
+        return df
+
+    @medido("ConectorShards.ler_novos")
+    def ler_novos(self, desde_id=0, limit=1000, **filtros):
+        """
+        Como DBConnector.ler_novos, com `desde_id` por shard (tupla de avancar_marca):
+        um shard que grava um pouco atrás dos outros não tem linhas puladas.
+        Até `limit` linhas por shard.
+        """
+        marca = self._marca(desde_id)
+        partes = self._em_paralelo(lambda s: s.ler_novos(marca[s.shard], limit, **filtros),
+                                   self._alvos(filtros.get("id_sensor")))
+        return _juntar(partes)
+
+    def avancar_marca(self, marca, df):
+        marca = self._marca(marca)
+        maximos = df['id'].groupby(df['id'] % MAX_SHARDS).max()
+        for k, maximo in maximos.items():
+            marca[int(k)] = max(marca[int(k)], int(maximo))
+        return tuple(marca)
+
+    @medido("ConectorShards.max_id")
+    def max_id(self, **filtros):
+        """Tupla com o maior id de cada shard (a versão muda se qualquer shard mudar)."""
+        return tuple(self._em_paralelo(lambda s: s.max_id(**filtros)))
+
+    @medido("ConectorShards.listar_sensores")
+    def listar_sensores(self):
+        return sorted(set().union(*self._em_paralelo(lambda s: s.listar_sensores())))
+
+    def ler_em_blocos(self, tamanho_bloco=10000, colunas=None, desde_id=0, incluir_arquivo=False):
+        """Blocos do arquivo Parquet (se pedido) e depois de cada shard, um shard por vez."""
+        if incluir_arquivo:
+            from src.database import arquivo
+            yield from arquivo.ler_em_blocos(tamanho_bloco, colunas)
+        for s in self._shards:
+            yield from s.ler_em_blocos(tamanho_bloco, colunas, desde_id)
+
+    # --- AGREGAÇÃO (somas por shard, razões depois do merge) ---
+    @medido("ConectorShards.atualizar_rollups")
+    def atualizar_rollups(self):
+        return sum(self._em_paralelo(lambda s: s.atualizar_rollups()))
+
+    def _somas_kpis(self, id_sensor=None, inicio=None):
+        somas = self._em_paralelo(lambda s: s._somas_kpis(id_sensor, inicio), self._alvos(id_sensor))
+        return tuple(sum(float(v) for v in coluna) for coluna in zip(*somas))
+
+    def _sketch_latencia(self, id_sensor=None, inicio=None, fim=None):
+        sketch = SketchLatencia()
+        for parte in self._em_paralelo(lambda s: s._sketch_latencia(id_sensor, inicio, fim), self._alvos(id_sensor)):
+            sketch.combinar(parte)
+        return sketch
+
+    def _somas_por_perfil(self, id_sensor=None, inicio=None):
+        import pandas as pd
+        partes = self._em_paralelo(lambda s: s._somas_por_perfil(id_sensor, inicio), self._alvos(id_sensor))
+        cheias = [p for p in partes if not p.empty]
+        return pd.concat(cheias).groupby(level=0).sum().sort_index() if cheias else partes[0]
+
+    @medido("ConectorShards.engajados_por_dia_semana")
+    def engajados_por_dia_semana(self, id_sensor=None, inicio=None):
+        return _somar_series(self._em_paralelo(lambda s: s.engajados_por_dia_semana(id_sensor, inicio), self._alvos(id_sensor)))
+
+    @medido("ConectorShards.engajados_por_sensor")
+    def engajados_por_sensor(self, id_sensor=None, inicio=None):
+        return _somar_series(self._em_paralelo(lambda s: s.engajados_por_sensor(id_sensor, inicio), self._alvos(id_sensor)))
+
+    @medido("ConectorShards.contagem_acoes")
+    def contagem_acoes(self, id_sensor=None, inicio=None):
+        return _somar_series(self._em_paralelo(lambda s: s.contagem_acoes(id_sensor, inicio), self._alvos(id_sensor)))
+
+    @medido("ConectorShards.serie_temporal")
+    def serie_temporal(self, granularidade="hora", desde=None, id_sensor=None):
+        import pandas as pd
+        partes = self._em_paralelo(lambda s: s.serie_temporal(granularidade, desde, id_sensor), self._alvos(id_sensor))
+        cheias = [p for p in partes if not p.empty]
+        if not cheias:
+            return pd.DataFrame()
+        return pd.concat(cheias).groupby(level=0).sum().sort_index().fillna(0)
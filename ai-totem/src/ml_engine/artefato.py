@@ -0,0 +1,78 @@
+# Arquivo: src/ml_engine/artefato.py
+"""
+Formato do artefato do modelo.
+O classificador é gravado com joblib em um arquivo versionado, e um sidecar
+JSON aponta para a versão vigente:
+
+    data/models/interaction_classifier.json          <- metadados (trocado atomicamente)
+    data/models/interaction_classifier-v7.joblib     <- modelo da versão 7
+
+Como cada versão tem o seu arquivo, um processo que ainda está carregando a
+versão anterior nunca tem o arquivo substituído por baixo dele.
+"""
+import json
+import os
+import glob
+import datetime
+
+MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/models'))
+META_PATH = os.path.join(MODELS_DIR, 'interaction_classifier.json')
+LEGACY_PKL_PATH = os.path.join(MODELS_DIR, 'interaction_classifier.pkl')
+
+
+def ler_metadados():
+    """Conteúdo do sidecar JSON, ou None se ainda não houver modelo publicado."""
+    try:
+        with open(META_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def carregar_modelo(meta):
+    """Carrega o modelo apontado pelos metadados."""
+    # Sem mmap_mode: as árvores do RandomForest copiam os arrays no unpickle
+    # (Tree.__setstate__), então o mapeamento não economizaria memória
+    import joblib  # só quem carrega ou publica modelo paga pelo import
+    return joblib.load(os.path.join(MODELS_DIR, meta['arquivo']))
+
+
+def salvar_artefato(modelo, features, n_linhas, extras=None):
+    """Publica uma nova versão do modelo e retorna os metadados gravados."""
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    anterior = ler_metadados()
+    versao = (anterior['versao'] + 1) if anterior else 1
+    arquivo = f"interaction_classifier-v{versao}.joblib"
+
+    # 1. Modelo primeiro: quando o JSON apontar para ele, o arquivo já está completo
+    import joblib
+    joblib.dump(modelo, os.path.join(MODELS_DIR, arquivo))
+
+    meta = {
+        "versao": versao,
+        "arquivo": arquivo,
+        "features": list(features),
+        "n_linhas_treino": int(n_linhas),
+        "classes": [str(c) for c in getattr(modelo, 'classes_', [])],
+        "treinado_em": datetime.datetime.now().isoformat(timespec='seconds'),
+        **(extras or {}),
+    }
+
+    # 2. Troca atômica do sidecar (os.replace é atômico no mesmo filesystem)
+    tmp_path = META_PATH + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, META_PATH)
+
+    _limpar_versoes_antigas(manter=(arquivo, anterior['arquivo'] if anterior else None))
+    return meta
+
+
+def _limpar_versoes_antigas(manter):
+    # Mantém a versão nova e a anterior (que pode estar sendo carregada por outro processo)
+    for caminho in glob.glob(os.path.join(MODELS_DIR, 'interaction_classifier-v*.joblib')):
+        if os.path.basename(caminho) not in manter:
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass  # No Windows um arquivo aberto não pode ser removido; fica para a próxima
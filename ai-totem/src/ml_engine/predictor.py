@@ -1,34 +1,203 @@
 # Arquivo: src/ml_engine/predictor.py
 import pickle
 import os
-import pandas as pd
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+from src.ml_engine import artefato
+from src.core.instrumentacao import medido, trecho
+
+# Ordem das colunas usada no treino (trainer.py)
+FEATURES = ['tempo_permanencia', 'tempo_interacao']
+
+# Mesma precisão do InteracaoSchema (2 casas): o espaço de entradas distintas é pequeno
+CASAS_DECIMAIS = 2
+
+class CachePredicoes:
+    """LRU limitado e thread-safe: (versão, features arredondadas) -> (classe, confiança)."""
+
+    def __init__(self, capacidade=4096):
+        self.capacidade = capacidade
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def obter(self, chave):
+        with self._lock:
+            valor = self._dados.get(chave)
+            if valor is None:
+                self.misses += 1
+                return None
+            self._dados.move_to_end(chave)
+            self.hits += 1
+            return valor
+
+    def guardar(self, chave, valor):
+        with self._lock:
+            self._dados[chave] = valor
+            self._dados.move_to_end(chave)
+            if len(self._dados) > self.capacidade:
+                self._dados.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": self.hits / total if total else 0.0,
+                "tamanho": len(self._dados),
+                "capacidade": self.capacidade,
+            }
 
 class FlexPredictor:
-    def __init__(self):
-        self.model_path = os.path.join(os.path.dirname(__file__), '../../data/models/interaction_classifier.pkl')
+    # Intervalo mínimo entre checagens do sidecar (cada checagem é um os.stat)
+    INTERVALO_VERIFICACAO_S = 2.0
+
+    def __init__(self, tamanho_cache=4096):
+        self.cache = CachePredicoes(tamanho_cache)
+        self.model_path = artefato.LEGACY_PKL_PATH
+        self.versao = None
+        self.metadados = None
+        self._meta_mtime = None
+        self._ultima_verificacao = time.monotonic()
+        self._reload_lock = threading.Lock()
         self.model = self._load_model()
 
     def _load_model(self):
+        meta = artefato.ler_metadados()
+        if meta:
+            self._meta_mtime = self._mtime_metadados()
+            self.metadados, self.versao = meta, meta['versao']
+            return self._preparar(artefato.carregar_modelo(meta))
+        # Compatibilidade: modelos antigos gravados com pickle
         if os.path.exists(self.model_path):
             with open(self.model_path, 'rb') as f:
-                return pickle.load(f)
+                self.versao = "legacy"
+                return self._preparar(pickle.load(f))
         return None
 
+    @staticmethod
+    def _preparar(model):
+        # A entrada é sempre montada como array na ordem de FEATURES,
+        # então a checagem de nomes de coluna do sklearn só custaria tempo (e warnings)
+        if hasattr(model, 'feature_names_in_'):
+            del model.feature_names_in_
+        return model
+
+    @staticmethod
+    def _mtime_metadados():
+        try:
+            return os.stat(artefato.META_PATH).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def verificar_atualizacao(self, forcar=False):
+        """
+        Hot reload: se o trainer publicou uma versão nova, carrega e troca o modelo.
+        Predições em andamento terminam com o modelo antigo. Retorna True se trocou.
+        """
+        agora = time.monotonic()
+        if not forcar and agora - self._ultima_verificacao < self.INTERVALO_VERIFICACAO_S:
+            return False
+        self._ultima_verificacao = agora
+
+        mtime = self._mtime_metadados()
+        if mtime is None or mtime == self._meta_mtime:
+            return False
+
+        # Só uma thread carrega; as demais seguem com o modelo atual sem esperar
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            meta = artefato.ler_metadados()
+            self._meta_mtime = mtime
+            if not meta or meta['versao'] == self.versao:
+                return False
+            novo = self._preparar(artefato.carregar_modelo(meta))
+            # Troca de referência é atômica: quem já leu self.model continua com o antigo
+            self.model = novo
+            self.metadados, self.versao = meta, meta['versao']
+            # A versão faz parte da chave; limpar só libera a memória das entradas velhas
+            self.cache.limpar()
+            print(f"🔄 Modelo atualizado para a versão {self.versao}")
+            return True
+        except Exception as e:
+            print(f"[ERRO AO RECARREGAR MODELO] {e}")
+            return False
+        finally:
+            self._reload_lock.release()
+
+    @staticmethod
+    def _matriz(dados):
+        """DataFrame (com as colunas de FEATURES) ou array (n, 2) -> ndarray float (n, 2)."""
+        if hasattr(dados, 'columns'):
+            dados = dados[FEATURES].to_numpy()
+        return np.asarray(dados, dtype=float).reshape(-1, len(FEATURES))
+
+    @medido("FlexPredictor.predict")
     def predict(self, tempo_permanencia, tempo_interacao):
         """Retorna a classificação (str) e a probabilidade (float)."""
-        if not self.model:
+        self.verificar_atualizacao()
+        versao = self.versao
+        model = self.model
+        if not model:
             return "Modelo Não Treinado", 0.0
-        
-        # Cria dataframe com mesmos nomes de colunas do treino
-        input_data = pd.DataFrame({
-            'tempo_permanencia': [tempo_permanencia],
-            'tempo_interacao': [tempo_interacao]
-        })
-        
+
+        try:
+            tempo_permanencia = round(float(tempo_permanencia), CASAS_DECIMAIS)
+            tempo_interacao = round(float(tempo_interacao), CASAS_DECIMAIS)
+            chave = (versao, tempo_permanencia, tempo_interacao)
+            em_cache = self.cache.obter(chave)
+            if em_cache is not None:
+                return em_cache
+
+            # Caminho rápido: uma linha, sem pandas, uma única passada na floresta
+            input_data = np.array([[tempo_permanencia, tempo_interacao]], dtype=float)
+            with trecho("FlexPredictor.predict_proba"):
+                proba = model.predict_proba(input_data)[0]
+            idx = proba.argmax()
+            # Classe escolhida e sua probabilidade (confiança)
+            resultado = (model.classes_[idx], float(proba[idx]))
+            self.cache.guardar(chave, resultado)
+            return resultado
+        except Exception as e:
+            return "Erro ML", 0.0
+
+    def estatisticas_cache(self):
+        """Hits/misses do cache de predições (para conferir o ganho sob replay)."""
+        return self.cache.estatisticas()
+
+    @medido("FlexPredictor.predict_batch")
+    def predict_batch(self, dados):
+        """
+        Classifica várias linhas de uma vez (DataFrame ou array n x 2).
+        Retorna (labels, confiancas) como ndarrays, a partir de um único predict_proba.
+        """
+        self.verificar_atualizacao()
+        model = self.model
+        X = self._matriz(dados)
+        n = len(X)
+        if not model:
+            return np.full(n, "Modelo Não Treinado", dtype=object), np.zeros(n)
+        if n == 0:
+            return np.empty(0, dtype=object), np.empty(0)
+
         try:
-            prediction = self.model.predict(input_data)[0]
-            # Probabilidade da classe escolhida (confiança)
-            proba = self.model.predict_proba(input_data).max()
-            return prediction, proba
+            # Entradas repetidas são a regra: a floresta só vê as combinações distintas
+            unicos, inverso = np.unique(np.round(X, CASAS_DECIMAIS), axis=0, return_inverse=True)
+            proba = model.predict_proba(unicos)
+            idx = proba.argmax(axis=1)
+            # Mesmo critério do predict() do sklearn: classe de maior probabilidade
+            labels, confiancas = model.classes_[idx], proba[np.arange(len(unicos)), idx]
+            inverso = inverso.reshape(-1)
+            return labels[inverso], confiancas[inverso]
         except Exception as e:
-            return "Erro ML", 0.0
\ No newline at end of file
+            return np.full(n, "Erro ML", dtype=object), np.zeros(n)
@@ -0,0 +1,191 @@
+# Arquivo: src/ml_engine/selecao.py
+"""
+Seleção de modelo em paralelo: busca de hiperparâmetros com validação cruzada,
+um candidato por processo, usando todos os núcleos.
+
+O vencedor não é só o mais preciso: o predictor roda dentro do loop do dashboard,
+então ganha o candidato mais rápido cuja acurácia fica dentro da tolerância do melhor.
+A latência de todos os candidatos é medida no processo principal, em série, com o pool
+já encerrado: medida dentro dos workers, ela refletiria a disputa por núcleo com os
+outros candidatos. A tabela final mostra a troca acurácia x latência da grade inteira.
+
+    python src/ml_engine/selecao.py --folds 5 --tolerancia 0.005
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.ml_engine.trainer import carregar_amostra, estratificacao
+from src.ml_engine.artefato import salvar_artefato
+
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, classification_report
+
+FEATURES = ['tempo_permanencia', 'tempo_interacao']
+TARGET = 'tipo_interacao'
+
+GRADE = {
+    "n_estimators": [25, 50, 100, 200],
+    "max_depth": [None, 8, 16],
+    "min_samples_leaf": [1, 5, 20],
+}
+
+# Dados de treino de cada processo (enviados uma vez, no initializer)
+_DADOS = {}
+
+
+def _iniciar_worker(X, y, pesos, folds):
+    _DADOS.update(X=X, y=y, pesos=pesos, folds=folds)
+
+
+def _mediana_s(funcao, repeticoes, aquecimento):
+    for _ in range(aquecimento):
+        funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return float(np.median(tempos))
+
+
+def _latencia_predicao_ms(clf, X, repeticoes=50, aquecimento=5):
+    """Mediana de um predict_proba de 1 linha (o caso do dashboard) e custo por linha em lote."""
+    linha = X[:1]
+    lote = X[:1000]
+    latencia_1 = _mediana_s(lambda: clf.predict_proba(linha), repeticoes, aquecimento)
+    # Lote é mais caro: menos repetições bastam para a mediana estabilizar
+    latencia_lote = _mediana_s(lambda: clf.predict_proba(lote), max(5, repeticoes // 10), 1)
+    return latencia_1 * 1000, latencia_lote / len(lote) * 1000
+
+
+def _avaliar_candidato(params):
+    """Roda no processo filho: só a CV do candidato (latência fica para o processo principal)."""
+    X, y, pesos, folds = _DADOS['X'], _DADOS['y'], _DADOS['pesos'], _DADOS['folds']
+    inicio = time.perf_counter()
+    acuracias = []
+    for treino, teste in StratifiedKFold(n_splits=folds, shuffle=True, random_state=42).split(X, y):
+        clf = RandomForestClassifier(random_state=42, **params)
+        clf.fit(X[treino], y[treino], sample_weight=pesos[treino])
+        acuracias.append(accuracy_score(y[teste], clf.predict(X[teste]), sample_weight=pesos[teste]))
+    tempo_cv = time.perf_counter() - inicio
+    return {
+        "params": params,
+        "acuracia_cv": float(np.mean(acuracias)),
+        "desvio_cv": float(np.std(acuracias)),
+        "tempo_cv_s": tempo_cv,
+        "latencia_1_linha_ms": None,
+        "latencia_por_linha_lote_ms": None,
+    }
+
+
+def finalistas(resultados, tolerancia=0.005):
+    """Candidatos a até `tolerancia` da melhor acurácia de CV."""
+    melhor = max(r['acuracia_cv'] for r in resultados)
+    return [r for r in resultados if r['acuracia_cv'] >= melhor - tolerancia]
+
+
+def medir_candidatos(resultados, X, y, pesos, manter=()):
+    """
+    Treina cada candidato no treino inteiro (o modelo que seria publicado) e mede a
+    latência em série, sem outro processo disputando o núcleo. Só os modelos de
+    `manter` (os finalistas) ficam em memória. Retorna {índice: modelo}.
+    """
+    modelos = {}
+    for i, r in enumerate(resultados):
+        sys.stdout.write(f"\rMedidos: {i + 1}/{len(resultados)}")
+        sys.stdout.flush()
+        clf = RandomForestClassifier(random_state=42, **r['params'])
+        clf.fit(X, y, sample_weight=pesos)
+        r['latencia_1_linha_ms'], r['latencia_por_linha_lote_ms'] = _latencia_predicao_ms(clf, X)
+        if any(r is f for f in manter):
+            modelos[i] = clf
+    print()
+    return modelos
+
+
+def escolher_vencedor(resultados, tolerancia=0.005):
+    """Entre os finalistas (já medidos por medir_candidatos), o de menor latência de 1 linha."""
+    return min(finalistas(resultados, tolerancia), key=lambda r: (r['latencia_1_linha_ms'], -r['acuracia_cv']))
+
+
+def selecionar_modelo(folds=5, tolerancia=0.005, workers=None, tamanho_bloco=20000, amostra_por_classe=50000):
+    print("🔎 Iniciando seleção de modelo (busca em grade + validação cruzada)...")
+    workers = workers or os.cpu_count()
+
+    X, y, pesos, total = carregar_amostra(FEATURES, TARGET, tamanho_bloco, amostra_por_classe)
+    if total < 50:
+        print("⚠️ Dados insuficientes! Rode o simulador por mais tempo antes de treinar.")
+        return
+
+    # Holdout fora da busca, para a nota final do vencedor
+    X_train, X_test, y_train, y_test, w_train, w_test = train_test_split(
+        X, y, pesos, test_size=0.3, random_state=42, stratify=estratificacao(y)
+    )
+
+    candidatos = [dict(zip(GRADE, valores)) for valores in itertools.product(*GRADE.values())]
+    print(f"⚙️ {len(candidatos)} candidatos x {folds} folds em {workers} processos")
+
+    inicio = time.perf_counter()
+    resultados = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker,
+                             initargs=(X_train, y_train, w_train, folds)) as pool:
+        futuros = [pool.submit(_avaliar_candidato, params) for params in candidatos]
+        for futuro in as_completed(futuros):
+            resultados.append(futuro.result())
+            sys.stdout.write(f"\rAvaliados: {len(resultados)}/{len(candidatos)}")
+            sys.stdout.flush()
+    tempo_total = time.perf_counter() - inicio
+    print(f"\n⏱️ Busca concluída em {tempo_total:.1f}s (wall-clock)")
+
+    # Pool encerrado: a latência de cada candidato é medida sozinha na máquina
+    selecionados = finalistas(resultados, tolerancia)
+    print(f"⏱️ Medindo a latência dos {len(resultados)} candidatos no processo principal...")
+    modelos = medir_candidatos(resultados, X_train, y_train, w_train, manter=selecionados)
+
+    print(f"\n{'n_estimators':>12} {'max_depth':>9} {'min_leaf':>8} | {'acc_cv':>7} {'±':>6} | {'cv (s)':>7} | {'1 linha (ms)':>12} {'lote (ms/linha)':>15}")
+    for r in sorted(resultados, key=lambda r: -r['acuracia_cv']):
+        p = r['params']
+        latencias = f"{r['latencia_1_linha_ms']:>12.3f} {r['latencia_por_linha_lote_ms']:>15.5f}"
+        print(f"{p['n_estimators']:>12} {str(p['max_depth']):>9} {p['min_samples_leaf']:>8} | "
+              f"{r['acuracia_cv']*100:>6.2f}% {r['desvio_cv']*100:>5.2f} | {r['tempo_cv_s']:>7.2f} | {latencias}")
+
+    vencedor = escolher_vencedor(selecionados, tolerancia)
+    print(f"\n🏆 Vencedor: {vencedor['params']} "
+          f"(acc {vencedor['acuracia_cv']*100:.2f}%, {vencedor['latencia_1_linha_ms']:.3f} ms/predição)")
+
+    # Modelo final: o vencedor já treinado no conjunto de treino inteiro (na medição)
+    clf = next(modelos[i] for i, r in enumerate(resultados) if r is vencedor)
+    predictions = clf.predict(X_test)
+    acc = accuracy_score(y_test, predictions, sample_weight=w_test)
+    print(f"✅ Acurácia no holdout: {acc*100:.2f}%")
+    print("\nRelatório de Classificação:")
+    print(classification_report(y_test, predictions))
+
+    meta = salvar_artefato(clf, FEATURES, total, extras={
+        "acuracia": round(acc, 4),
+        "modo": "selecao",
+        "hiperparametros": {k: v for k, v in vencedor['params'].items()},
+        "latencia_1_linha_ms": round(vencedor['latencia_1_linha_ms'], 4),
+        "tempo_busca_s": round(tempo_total, 2),
+    })
+    print(f"💾 Modelo v{meta['versao']} salvo em: data/models/{meta['arquivo']}")
+    return vencedor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Busca de hiperparâmetros em paralelo")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--tolerancia", type=float, default=0.005, help="perda de acurácia aceita em troca de latência")
+    parser.add_argument("--workers", type=int, default=None, help="processos (padrão: todos os núcleos)")
+    parser.add_argument("--bloco", type=int, default=20000)
+    parser.add_argument("--amostra-por-classe", type=int, default=50000)
+    args = parser.parse_args()
+    selecionar_modelo(args.folds, args.tolerancia, args.workers, args.bloco, args.amostra_por_classe)
@@ -1,18 +1,22 @@
 # Arquivo: src/ml_engine/trainer.py
 import pandas as pd
-import pickle
+import numpy as np
+import argparse
 import os
 import sys
 
 # Hack para importar módulos irmãos
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from src.database.connector import DBConnector
+from src.ml_engine.artefato import salvar_artefato
 
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, classification_report
+# sklearn é importado dentro das funções de treino: quem só usa carregar_amostra
+# (seleção, benchmark) ou importa o módulo não paga pelo import na partida
 
 def train_model():
+    from sklearn.model_selection import train_test_split
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, classification_report
     print("🤖 Iniciando treinamento do modelo de IA...")
     
     # 1. Carregar dados do Banco
@@ -51,13 +55,142 @@ def train_model():
     print("\nRelatório de Classificação:")
     print(classification_report(y_test, predictions))
 
-    # 6. Salva o "Cérebro" na pasta data/models
-    model_path = os.path.join(os.path.dirname(__file__), '../../data/models/interaction_classifier.pkl')
-    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    # 6. Publica o "Cérebro" em data/models (o dashboard recarrega sozinho)
+    meta = salvar_artefato(clf, features, len(df), extras={"acuracia": round(acc, 4)})
+    print(f"💾 Modelo v{meta['versao']} salvo em: data/models/{meta['arquivo']}")
+
+class ReservatorioEstratificado:
+    """
+    Amostra uniforme de tamanho fixo por classe (reservoir sampling, Algoritmo R
+    vetorizado por bloco). Memória constante, não importa o tamanho da tabela.
+    """
+    def __init__(self, por_classe=50000, seed=42):
+        self.por_classe = por_classe
+        self.rng = np.random.default_rng(seed)
+        self.amostras = {}  # classe -> ndarray (por_classe, n_features)
+        self.vistos = {}    # classe -> linhas vistas no total
+
+    def adicionar(self, X, y):
+        for classe in np.unique(y):
+            Xc = X[y == classe]
+            buffer = self.amostras.get(classe)
+            if buffer is None:
+                buffer = self.amostras[classe] = np.empty((self.por_classe, X.shape[1]))
+            vistos = self.vistos.get(classe, 0)
+
+            # 1. Enquanto há espaço, a linha entra direto
+            livres = max(0, self.por_classe - vistos)
+            entram = Xc[:livres]
+            buffer[vistos:vistos + len(entram)] = entram
+
+            # 2. Depois, a t-ésima linha substitui uma posição aleatória com probabilidade k/t
+            resto = Xc[len(entram):]
+            if len(resto):
+                t = vistos + len(entram) + np.arange(1, len(resto) + 1)
+                sorteadas = self.rng.random(len(resto)) < self.por_classe / t
+                buffer[self.rng.integers(0, self.por_classe, sorteadas.sum())] = resto[sorteadas]
+
+            self.vistos[classe] = vistos + len(Xc)
+
+    def amostra(self):
+        """
+        Retorna (X, y, pesos). O peso de cada linha é vistos/amostrados da sua classe,
+        para o modelo ver a proporção real das classes mesmo com o teto por classe.
+        """
+        partes_X, partes_y, partes_w = [], [], []
+        for classe, buffer in self.amostras.items():
+            n = min(self.por_classe, self.vistos[classe])
+            partes_X.append(buffer[:n])
+            partes_y.append(np.full(n, classe, dtype=object))
+            partes_w.append(np.full(n, self.vistos[classe] / n))
+        pesos = np.concatenate(partes_w)
+        return np.concatenate(partes_X), np.concatenate(partes_y), pesos / pesos.mean()
+
+def carregar_amostra(features, target, tamanho_bloco=20000, amostra_por_classe=50000):
+    """
+    Varre o arquivo Parquet e o banco bloco a bloco (keyset por id) alimentando um reservatório estratificado.
+    Pico de memória = 1 bloco + reservatório. Retorna (X, y, pesos, total_lido).
+    """
+    db = DBConnector()
+    reservatorio = ReservatorioEstratificado(por_classe=amostra_por_classe)
+    total = 0
+    for bloco in db.ler_em_blocos(tamanho_bloco, colunas=features + [target], incluir_arquivo=True):
+        X_bloco = bloco[features].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(dtype=float)
+        reservatorio.adicionar(X_bloco, bloco[target].to_numpy(dtype=object))
+        total += len(bloco)
+        sys.stdout.write(f"\rLidos: {total} registros")
+        sys.stdout.flush()
+    print()
+    if total == 0:
+        return np.empty((0, len(features))), np.empty(0, dtype=object), np.empty(0), 0
+    X, y, pesos = reservatorio.amostra()
+    print(f"📦 Amostra de treino: {len(y)} de {total} registros ({len(reservatorio.amostras)} classes)")
+    return X, y, pesos, total
+
+def estratificacao(y):
+    """
+    `stratify` do train_test_split: o próprio y, ou None quando alguma classe tem
+    menos de 2 linhas (o split estratificado levanta ValueError nesse caso).
+    """
+    contagens = pd.Series(y).value_counts()
+    if contagens.min() < 2:
+        raras = ", ".join(str(c) for c in contagens[contagens < 2].index)
+        print(f"⚠️ Classe(s) com menos de 2 registros ({raras}): divisão treino/teste sem estratificar.")
+        return None
+    return y
+
+def train_model_streaming(tamanho_bloco=20000, amostra_por_classe=50000):
+    """
+    Treino sobre o histórico completo sem carregá-lo de uma vez: a tabela é lida
+    em blocos (keyset por id) e alimenta um reservatório estratificado de tamanho fixo.
+    """
+    from sklearn.model_selection import train_test_split
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, classification_report
+    print("🤖 Iniciando treinamento em streaming (histórico completo)...")
+    
+    features = ['tempo_permanencia', 'tempo_interacao']
+    target = 'tipo_interacao'
     
-    with open(model_path, 'wb') as f:
-        pickle.dump(clf, f)
-    print(f"💾 Modelo salvo em: {model_path}")
+    # 1. Amostra de tamanho fixo do histórico inteiro
+    X, y, pesos, total = carregar_amostra(features, target, tamanho_bloco, amostra_por_classe)
+    
+    if total < 50:
+        print("⚠️ Dados insuficientes! Rode o simulador por mais tempo antes de treinar.")
+        return
+
+    # 2. Separa treino e teste (70/30), mantendo a proporção das classes
+    X_train, X_test, y_train, y_test, w_train, w_test = train_test_split(
+        X, y, pesos, test_size=0.3, random_state=42, stratify=estratificacao(y)
+    )
+
+    # 3. Treina com os pesos que devolvem a distribuição real das classes
+    clf = RandomForestClassifier(n_estimators=100, random_state=42)
+    clf.fit(X_train, y_train, sample_weight=w_train)
+
+    # 4. Avalia a performance
+    predictions = clf.predict(X_test)
+    acc = accuracy_score(y_test, predictions, sample_weight=w_test)
+    print(f"✅ Modelo treinado com Acurácia de: {acc*100:.2f}%")
+    print("\nRelatório de Classificação:")
+    print(classification_report(y_test, predictions))
+
+    # 5. Publica o "Cérebro" em data/models (o dashboard recarrega sozinho)
+    meta = salvar_artefato(clf, features, total, extras={
+        "acuracia": round(acc, 4),
+        "modo": "streaming",
+        "n_amostra": int(len(y)),
+    })
+    print(f"💾 Modelo v{meta['versao']} salvo em: data/models/{meta['arquivo']}")
 
 if __name__ == "__main__":
-    train_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Treina o classificador de interações")
+    parser.add_argument("--streaming", action="store_true", help="usa o histórico completo, em blocos")
+    parser.add_argument("--bloco", type=int, default=20000, help="linhas por bloco lido do banco")
+    parser.add_argument("--amostra-por-classe", type=int, default=50000, help="teto do reservatório por classe")
+    args = parser.parse_args()
+    
+    if args.streaming:
+        train_model_streaming(tamanho_bloco=args.bloco, amostra_por_classe=args.amostra_por_classe)
+    else:
+        train_model()
\ No newline at end of file
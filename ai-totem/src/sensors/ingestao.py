@@ -0,0 +1,207 @@
+# Arquivo: src/sensors/ingestao.py
+"""
+Serviço de ingestão assíncrono: muitos totens produzindo ao mesmo tempo,
+uma fila limitada (backpressure) e um único escritor que grava em lotes.
+
+    python src/sensors/ingestao.py --totens 300 --intervalo 2 --duracao 60
+"""
+import argparse
+import asyncio
+import random
+import signal
+import sys
+import os
+import time
+from collections import deque
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from config.settings import INGESTAO_FILA_MAX, INGESTAO_LOTE, INGESTAO_FLUSH_S
+from src.database.connector import DBConnector
+from src.sensors.simulador import gerar_dados_complexos
+
+# Marca de fim de fila: tudo que entrou antes dele é gravado
+_FIM = object()
+
+
+def _percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return 0.0
+    idx = min(len(valores_ordenados) - 1, int(round(p / 100 * (len(valores_ordenados) - 1))))
+    return valores_ordenados[idx]
+
+
+class MetricasIngestao:
+    """Contadores do pipeline: fila, lotes e latência ponta a ponta (produção -> commit)."""
+
+    def __init__(self, amostras=100_000):
+        self.inicio = time.perf_counter()
+        self.produzidos = 0
+        self.gravados = 0
+        self.rejeitados = 0
+        self.lotes = 0
+        self.maior_lote = 0
+        self.profundidade_max = 0
+        self.espera_backpressure_s = 0.0
+        # Janela das latências mais recentes (segundos)
+        self.latencias = deque(maxlen=amostras)
+
+    def resumo(self, profundidade_atual=0):
+        duracao = time.perf_counter() - self.inicio
+        lat = sorted(self.latencias)
+        return {
+            "duracao_s": round(duracao, 2),
+            "produzidos": self.produzidos,
+            "gravados": self.gravados,
+            "rejeitados": self.rejeitados,
+            "taxa_gravacao_s": round(self.gravados / duracao, 1) if duracao else 0.0,
+            "fila_atual": profundidade_atual,
+            "fila_max": self.profundidade_max,
+            "lotes": self.lotes,
+            "lote_medio": round(self.gravados / self.lotes, 1) if self.lotes else 0.0,
+            "lote_max": self.maior_lote,
+            "espera_backpressure_s": round(self.espera_backpressure_s, 3),
+            "latencia_p50_ms": round(_percentil(lat, 50) * 1000, 1),
+            "latencia_p95_ms": round(_percentil(lat, 95) * 1000, 1),
+            "latencia_max_ms": round(lat[-1] * 1000, 1) if lat else 0.0,
+        }
+
+
+class ServicoIngestao:
+    def __init__(self, db, n_totens=100, intervalo_s=2.0, tamanho_fila=INGESTAO_FILA_MAX,
+                 tamanho_lote=INGESTAO_LOTE, intervalo_flush_s=INGESTAO_FLUSH_S):
+        self.db = db
+        self.n_totens = n_totens
+        self.intervalo_s = intervalo_s
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_flush_s = intervalo_flush_s
+        self.fila = asyncio.Queue(maxsize=tamanho_fila)
+        self.metricas = MetricasIngestao()
+        self._parar = asyncio.Event()
+
+    def parar(self):
+        """Encerramento limpo: produtores param, o escritor esvazia a fila."""
+        self._parar.set()
+
+    async def _produtor(self, id_sensor):
+        # Defasagem inicial para os totens não dispararem todos no mesmo instante
+        await self._esperar(random.uniform(0, self.intervalo_s))
+        while not self._parar.is_set():
+            dado = gerar_dados_complexos()
+            if dado:
+                dado['id_sensor'] = id_sensor
+                inicio = time.perf_counter()
+                # Fila cheia => o produtor espera (backpressure) em vez de acumular memória
+                await self.fila.put((inicio, dado))
+                self.metricas.espera_backpressure_s += time.perf_counter() - inicio
+                self.metricas.produzidos += 1
+                self.metricas.profundidade_max = max(self.metricas.profundidade_max, self.fila.qsize())
+            await self._esperar(self.intervalo_s)
+
+    async def _esperar(self, segundos):
+        """sleep que acorda na hora se o serviço for parado."""
+        try:
+            await asyncio.wait_for(self._parar.wait(), timeout=segundos)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _escritor(self):
+        loop = asyncio.get_running_loop()
+        lote = []
+        prazo = None
+        fim = False
+        while not fim:
+            timeout = None if not lote else max(0.0, prazo - loop.time())
+            try:
+                item = await asyncio.wait_for(self.fila.get(), timeout)
+            except asyncio.TimeoutError:
+                item = None
+
+            # Pega o que já estiver na fila sem esperar, até completar o lote
+            while item is not None:
+                if item is _FIM:
+                    fim = True
+                    break
+                if not lote:
+                    prazo = loop.time() + self.intervalo_flush_s
+                lote.append(item)
+                if len(lote) >= self.tamanho_lote or self.fila.empty():
+                    break
+                item = self.fila.get_nowait()
+
+            # Flush por tamanho, por tempo ou no encerramento
+            if lote and (fim or len(lote) >= self.tamanho_lote or loop.time() >= prazo):
+                await self._gravar(lote)
+                lote = []
+
+    async def _gravar(self, lote):
+        dados = [dado for _, dado in lote]
+        # O driver é bloqueante: roda numa thread para não travar os produtores
+        resultado = await asyncio.to_thread(self.db.salvar_lote, dados, len(dados))
+        # Rollups acompanham a ingestão (o catch-up só agrega o lote recém-gravado)
+        await asyncio.to_thread(self.db.atualizar_rollups)
+        agora = time.perf_counter()
+        m = self.metricas
+        m.gravados += resultado['inseridos']
+        m.rejeitados += len(resultado['rejeitados'])
+        m.lotes += 1
+        m.maior_lote = max(m.maior_lote, len(lote))
+        m.latencias.extend(agora - inicio for inicio, _ in lote)
+
+    async def _relatorio_periodico(self, intervalo_s):
+        while not self._parar.is_set():
+            await self._esperar(intervalo_s)
+            r = self.metricas.resumo(self.fila.qsize())
+            print(f"📊 fila={r['fila_atual']} (max {r['fila_max']}) | gravados={r['gravados']} "
+                  f"({r['taxa_gravacao_s']}/s) | lote médio={r['lote_medio']} | "
+                  f"latência p50={r['latencia_p50_ms']}ms p95={r['latencia_p95_ms']}ms")
+
+    async def executar(self, duracao_s=None, intervalo_relatorio_s=5.0):
+        """Roda até parar() (ou `duracao_s`) e retorna o resumo final das métricas."""
+        escritor = asyncio.create_task(self._escritor())
+        relatorio = asyncio.create_task(self._relatorio_periodico(intervalo_relatorio_s))
+        produtores = [asyncio.create_task(self._produtor(f"totem_{i:03d}")) for i in range(self.n_totens)]
+
+        if duracao_s:
+            asyncio.get_running_loop().call_later(duracao_s, self.parar)
+        await self._parar.wait()
+
+        # Ordem do encerramento: produtores -> marca de fim -> escritor drena o resto
+        await asyncio.gather(*produtores)
+        await self.fila.put(_FIM)
+        await escritor
+        await relatorio
+        return self.metricas.resumo(self.fila.qsize())
+
+
+async def _main(args):
+    db = DBConnector()
+    db.init_db()
+    servico = ServicoIngestao(
+        db, n_totens=args.totens, intervalo_s=args.intervalo,
+        tamanho_fila=args.fila, tamanho_lote=args.lote, intervalo_flush_s=args.flush,
+    )
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGINT, servico.parar)
+    except (NotImplementedError, RuntimeError):
+        pass  # Windows: Ctrl+C cai no KeyboardInterrupt
+
+    print(f"--- 📡 Ingestão Assíncrona: {args.totens} totens | fila {args.fila} | lote {args.lote} ---")
+    resumo = await servico.executar(duracao_s=args.duracao)
+    print("\n✅ Ingestão encerrada sem perdas:")
+    for chave, valor in resumo.items():
+        print(f"   {chave}: {valor}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulação de muitos totens com escrita em lote")
+    parser.add_argument("--totens", type=int, default=100)
+    parser.add_argument("--intervalo", type=float, default=2.0, help="segundos entre leituras de cada totem")
+    parser.add_argument("--duracao", type=float, default=None, help="segundos (padrão: até Ctrl+C)")
+    parser.add_argument("--fila", type=int, default=INGESTAO_FILA_MAX)
+    parser.add_argument("--lote", type=int, default=INGESTAO_LOTE)
+    parser.add_argument("--flush", type=float, default=INGESTAO_FLUSH_S, help="flush máximo (s) de um lote parcial")
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        print("\nSimulação parada.")
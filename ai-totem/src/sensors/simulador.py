@@ -7,13 +7,22 @@ import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
+from config.settings import SIMULADOR_BATCH_SIZE
 from src.database.connector import DBConnector
-from src.core.schemas import InteracaoSchema # Importa o Validador
-from pydantic import ValidationError
+from src.core.chaves import novo_id_evento
+
+# O validador (pydantic) e o NumPy entram na primeira chamada que os usa:
+# importar o módulo (ingestão, seeder) não paga por eles na partida
+
+SENSORES = ["totem_entrada", "totem_praca", "quiosque_food"]
+# Início dos timestamps de um lote com seed e sem `inicio`: fixo, para a mesma
+# seed dar os mesmos timestamps (e os mesmos hashes de deduplicação) em qualquer dia
+INICIO_SEMENTE = datetime.datetime(2024, 1, 1)
+ACOES = ["ver_mapa", "cardapio", "promo_dia", "chamar_ajuda", "scan_qr"]
 
 def gerar_dados_complexos():
-    sensores = ["totem_entrada", "totem_praca", "quiosque_food"]
-    acoes = ["ver_mapa", "cardapio", "promo_dia", "chamar_ajuda", "scan_qr"]
+    sensores = SENSORES
+    acoes = ACOES
     
     sensor = random.choice(sensores)
     tempo_permanencia = round(random.uniform(3.0, 90.0), 2)
@@ -47,12 +56,16 @@ def gerar_dados_complexos():
         "tipo_interacao": tipo,
         "acao_usuario": acao_usuario,
         "tempo_resposta_ms": tempo_resposta_ms,
-        "status_sistema": status_sistema
+        "status_sistema": status_sistema,
+        # Identidade da sessão: duas sessões iguais no mesmo segundo não colidem
+        "id_evento": novo_id_evento(),
     }
 
     # --- A MÁGICA DA VALIDAÇÃO ---
     # Transformamos o dict bruto no Schema Validado.
     # Se houver erro, ele lança exceção e não retorna dado sujo.
+    from src.core.schemas import InteracaoSchema  # Importa o Validador
+    from pydantic import ValidationError
     try:
         dado_limpo = InteracaoSchema(**raw_data)
         # Retorna o dicionário limpo e padronizado pelo Pydantic
@@ -61,11 +74,93 @@ def gerar_dados_complexos():
         print(f"❌ DADO RECUSADO PELO VALIDADOR: {e}")
         return None
 
+def gerar_lote(n, seed=None, inicio=None, intervalo_s=0.0, validar=True):
+    """
+    Versão vetorizada (NumPy) do gerar_dados_complexos: N registros de uma vez,
+    com as mesmas distribuições e regras de classificação.
+    Retorna colunas {campo: np.ndarray}, prontas para DBConnector.salvar_lote
+    e para pd.DataFrame (trainer). Mesma seed => mesmos dados.
+    `inicio`/`intervalo_s` espalham os timestamps (padrão: todos "agora", ou
+    INICIO_SEMENTE quando há seed, para o lote ser reprodutível).
+    Cada registro leva um id_evento (128 bits do mesmo gerador): a mesma seed
+    repete os ids, então regravar um lote é reconhecido como reenvio.
+    """
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    sensores = np.array(SENSORES, dtype=object)
+    acoes = np.array(ACOES, dtype=object)
+
+    sensor = sensores[rng.integers(0, len(SENSORES), n)]
+    tempo_permanencia = np.round(rng.uniform(3.0, 90.0, n), 2)
+
+    # Lógica de Interação (2 em 3 interagem, como random.choice([True, False, True]))
+    interagiu = rng.integers(0, 3, n) != 1
+    fator = rng.uniform(0.2, 0.8, n)
+    tempo_interacao = np.where(interagiu, np.round(tempo_permanencia * fator, 2), 0.0)
+    acao_usuario = np.where(interagiu, acoes[rng.integers(0, len(ACOES), n)], "Nenhuma")
+
+    praca = sensor == "totem_praca"
+    latencia = np.where(praca, rng.integers(20, 2501, n), rng.integers(20, 501, n))
+    tempo_resposta_ms = np.where(interagiu, latencia, 0)
+    status_sistema = np.where(interagiu, np.where(rng.random(n) > 0.05, "SUCESSO", "ERRO_TIMEOUT"), "N/A").astype(object)
+
+    tipo = np.select(
+        [~interagiu, tempo_interacao > 30, tempo_interacao > 10],
+        ["Ocioso", "Engajado", "Normal"],
+        default="Explorador",
+    ).astype(object)
+
+    # Timestamps: datetime64 com resolução de segundos, formatando cada segundo distinto uma vez
+    if inicio is None:
+        inicio = INICIO_SEMENTE if seed is not None else datetime.datetime.now()
+    inicio = np.datetime64(inicio, 's')
+    instantes = inicio + (np.arange(n) * intervalo_s).astype('timedelta64[s]')
+    unicos, inverso = np.unique(instantes, return_inverse=True)
+    textos = np.char.replace(np.datetime_as_string(unicos, unit='s'), 'T', ' ').astype(object)
+    timestamp = textos[inverso.reshape(-1)]
+
+    # 16 bytes aleatórios por registro, em hex (32 chars, como o uuid4().hex)
+    id_evento = np.frombuffer(rng.bytes(16 * n).hex().encode('ascii'), dtype='S32').astype(str).astype(object)
+
+    colunas = {
+        "timestamp": timestamp,
+        "id_sensor": sensor,
+        "tempo_permanencia": tempo_permanencia,
+        "tempo_interacao": tempo_interacao,
+        "tipo_interacao": tipo,
+        "acao_usuario": acao_usuario.astype(object),
+        "tempo_resposta_ms": tempo_resposta_ms,
+        "status_sistema": status_sistema,
+        "id_evento": id_evento,
+    }
+    if not validar:
+        return colunas
+
+    # Mesmo contrato do caminho registro a registro, aplicado em bloco
+    from src.core.schemas import validar_lote
+    validos, rejeitados = validar_lote(colunas, como_colunas=True)
+    for rejeitado in rejeitados:
+        print(f"❌ DADO RECUSADO PELO VALIDADOR: {rejeitado['erros']}")
+    return {campo: np.asarray(valores, dtype=colunas[campo].dtype) for campo, valores in validos.items()}
+
+def _descarregar(db, buffer):
+    """Envia o buffer acumulado ao banco em uma única transação e reporta o que foi gravado."""
+    if not buffer:
+        return None
+    resultado = db.salvar_lote(buffer, tamanho_lote=len(buffer))
+    for rejeitado in resultado['rejeitados']:
+        print(f"❌ REGISTRO REJEITADO PELO BANCO: {rejeitado['erro']}")
+    print(f"💾 Lote de {len(buffer)}: {resultado['inseridos']} salvos, "
+          f"{resultado['duplicados']} duplicados, {len(resultado['rejeitados'])} rejeitados")
+    buffer.clear()
+    return resultado
+
 if __name__ == "__main__":
     db = DBConnector()
     db.init_db()
     
-    print(f"--- 📡 Simulador Enterprise (Validado) Iniciado ---")
+    print(f"--- 📡 Simulador Enterprise (Validado) Iniciado | Lote: {SIMULADOR_BATCH_SIZE} ---")
+    buffer = []
     
     try:
         while True:
@@ -73,13 +168,18 @@ if __name__ == "__main__":
             
             if dado_validado:
                 # O banco só recebe se passou pelo Pydantic
-                db.salvar_interacao(dado_validado)
-                
+                buffer.append(dado_validado)
+                # Ainda no buffer: "salvo" só é dito por lote, com a contagem do banco
                 if dado_validado['tempo_interacao'] > 0:
-                    print(f"✅ [{dado_validado['id_sensor']}] Validado & Salvo: {dado_validado['acao_usuario']}")
+                    print(f"✅ [{dado_validado['id_sensor']}] Validado (no buffer): {dado_validado['acao_usuario']}")
                 else:
-                    print(f"💤 [{dado_validado['id_sensor']}] Ocioso (Validado)")
+                    print(f"💤 [{dado_validado['id_sensor']}] Ocioso (Validado, no buffer)")
+
+                if len(buffer) >= SIMULADOR_BATCH_SIZE:
+                    _descarregar(db, buffer)
             
             time.sleep(2)
     except KeyboardInterrupt:
-        print("\nSimulação parada.")
\ No newline at end of file
+        # Não perde o que ainda estava no buffer
+        _descarregar(db, buffer)
+        print("\nSimulação parada.")
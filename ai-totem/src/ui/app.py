@@ -2,14 +2,20 @@
 import streamlit as st
 import pandas as pd
 import time
+import datetime
 import sys
 import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
+from config.settings import PAINEL_REFRESH_MAX_S
+import src.database.connector as connector
 from src.database.connector import DBConnector
+from src.database.notificacao import Ouvinte
 from src.ml_engine.predictor import FlexPredictor
+from src.ui.cache_painel import CachePainel
 import src.ui.charts as charts
+from src.core import instrumentacao
 
 st.set_page_config(page_title="FlexMedia Enterprise", layout="wide", page_icon="🏢")
 
@@ -20,6 +26,34 @@ def load_ai():
 
 ai_brain = load_ai()
 
+@st.cache_resource
+def cache_compartilhado():
+    # Um por processo: todas as sessões olhando a mesma visão dividem o cálculo
+    return CachePainel()
+
+cache_painel = cache_compartilhado()
+
+@st.cache_resource
+def preparar_banco(driver):
+    # Migrações de schema (WAL, índices) rodam uma vez por processo
+    DBConnector(driver=driver).init_db()
+    return True
+
+@st.cache_resource
+def ouvinte_banco():
+    # Uma thread por processo ouve os avisos de quem grava; as sessões esperam nela
+    return Ouvinte(connector.DB_SQLITE_PATH)
+
+# Oracle: os escritores não estão nesta máquina, então segue a sondagem a cada 2s
+INTERVALO_ORACLE_S = 2
+
+def aguardar_novidades(ouvinte, sequencia_vista):
+    """Dorme até chegarem linhas depois de `sequencia_vista` (rajadas viram um refresh só)."""
+    if ouvinte is None:
+        time.sleep(INTERVALO_ORACLE_S)
+    else:
+        ouvinte.esperar(sequencia_vista, timeout=PAINEL_REFRESH_MAX_S)
+
 # --- SIDEBAR (INPUTS) ---
 with st.sidebar:
     st.image("https://cdn-icons-png.flaticon.com/512/3094/3094843.png", width=80)
@@ -27,55 +61,76 @@ with st.sidebar:
     st.markdown("---")
     
     driver_opt = st.radio("Fonte de Dados", ["SQLite (Local)", "Oracle Cloud"])
-    limit_view = st.slider("Janela de Dados", 50, 1000, 200)
+    limit_view = st.slider("Janela de Dados", 50, 5000, 200)
     
     st.markdown("### 📍 Filtros")
 
 # Inicialização DB
 driver_code = "sqlite" if "SQLite" in driver_opt else "oracle"
 db = DBConnector(driver=driver_code)
-
-# Pre-load da lista de totens
+ouvinte = ouvinte_banco() if driver_code == "sqlite" else None
 try:
-    df_init = db.ler_dados(limit=500)
-    lista_totens = ["Todos"] + sorted(df_init['id_sensor'].unique().tolist()) if not df_init.empty else ["Todos"]
-except:
-    lista_totens = ["Todos"]
+    preparar_banco(driver_code)
+except Exception as e:
+    st.error(f"Falha ao preparar o banco: {e}")
+
+# Lista de totens direto do índice (id_sensor, id), sem carregar linhas
+lista_totens = ["Todos"] + db.listar_sensores()
+
+# Recortes de tempo (em horas); None = histórico inteiro
+PERIODOS = {"Tudo": None, "Última hora": 1, "Últimas 24h": 24, "Últimos 7 dias": 24 * 7}
 
 with st.sidebar:
     filtro_totem = st.selectbox("Selecione o Totem:", lista_totens)
+    filtro_periodo = st.selectbox("Período:", list(PERIODOS))
     st.info("Pressione 'R' para recarregar se novos totens surgirem.")
 
+# Filtros aplicados no SQL (binds), não no DataFrame já carregado
+filtros = {}
+if filtro_totem != "Todos":
+    filtros["id_sensor"] = filtro_totem
+
+def inicio_periodo():
+    # Recalculado a cada refresh: "última hora" anda junto com o relógio
+    horas = PERIODOS[filtro_periodo]
+    return datetime.datetime.now() - datetime.timedelta(hours=horas) if horas else None
+
 # --- MAIN PAGE ---
 st.title("🏢 Dashboard Integrado de Inteligência")
 st.markdown(f"Monitoramento em tempo real • Driver: **{driver_opt}**")
 
 placeholder = st.empty()
 
-while True:
-    # 1. Coleta
-    df = db.ler_dados(limit=limit_view)
-    total_db = db.contar_total()
+# Visão compartilhada no cache (driver + tamanho + filtros)
+chave_visao = (driver_code, limit_view, filtro_totem, filtro_periodo)
 
-    # 2. Filtro
-    df_filtered = df.copy()
-    if filtro_totem != "Todos":
-        df_filtered = df[df['id_sensor'] == filtro_totem]
+versao_vista = None
+while True:
+    # Tudo que for medido até o fim do refresh entra nesta rodada
+    rodada = instrumentacao.iniciar_rodada()
+    # Lida antes da coleta: o que for gravado durante o refresh acorda a próxima espera
+    sequencia_vista = ouvinte.sequencia if ouvinte else None
+
+    # 1. Coleta: se o max(id) do recorte não mudou (aviso de outro totem), é só essa sondagem
+    dados = cache_painel.obter(db, chave_visao, limit_view, filtros, ai_brain, inicio=inicio_periodo())
+    if dados['versao'] == versao_vista:
+        instrumentacao.encerrar_rodada(rodada)
+        aguardar_novidades(ouvinte, sequencia_vista)
+        continue
+    versao_vista = dados['versao']
+
+    # 2. Janela (filtrada no banco e já tratada) e agregados, prontos no cache
+    df_filtered = dados['df']
+    agregados = dados['agregados']
 
     with placeholder.container():
         if not df_filtered.empty:
-            # Tratamento
-            cols_num = ['tempo_permanencia', 'tempo_interacao', 'tempo_resposta_ms']
-            for c in cols_num:
-                if c in df_filtered.columns:
-                    df_filtered[c] = pd.to_numeric(df_filtered[c], errors='coerce').fillna(0)
-
             # --- BLOCO 1: KPIs & IA (Sempre visíveis) ---
-            charts.render_kpis(df_filtered, len(df_filtered))
+            charts.render_kpis(df_filtered, len(df_filtered), kpis=agregados['kpis'], latencia=agregados['latencia'])
             
             # IA validando o último registro
             ultimo_dado = df_filtered.iloc[0]
-            pred, proba = ai_brain.predict(ultimo_dado['tempo_permanencia'], ultimo_dado['tempo_interacao'])
+            pred, proba = dados['predicao']
             charts.render_ml_insights(ultimo_dado, pred, proba)
 
             st.divider()
@@ -89,23 +144,38 @@ while True:
 
             with tab_cliente:
                 # AQUI voltaram os gráficos de dispersão e tempo!
-                charts.render_analise_comportamental(df_filtered)
+                charts.render_analise_comportamental(df_filtered, media_por_perfil=agregados['media_por_perfil'])
             
             with tab_biz:
                 # Aqui ficam as tendências e ranking
-                charts.render_analise_temporal_ranking(df_filtered)
+                charts.render_analise_temporal_ranking(
+                    df_filtered,
+                    engajados_por_dia=agregados['engajados_por_dia'],
+                    ranking=agregados['engajados_por_sensor'],
+                    serie=agregados['serie_horaria'],
+                )
                 
             with tab_tech:
                 # Aqui ficam latência e comandos
-                charts.render_analise_tecnica(df_filtered)
+                charts.render_analise_tecnica(df_filtered, acoes=agregados['acoes'], latencia=dados['latencia'])
+                charts.render_performance(st.session_state.get("ultima_rodada"), instrumentacao.REGISTRO)
+                cache = cache_painel.estatisticas()
+                st.caption(f"Cache do painel: {cache['visoes']} visões • {cache['recalculos']} recálculos • "
+                           f"{cache['taxa_acerto']*100:.0f}% de acertos entre as sessões")
+                if ouvinte:
+                    modo = "UDP + arquivo de sequência" if ouvinte.empurrado else "arquivo de sequência"
+                    st.caption(f"Atualização por aviso ({modo}) • {ouvinte.acordadas} avisos recebidos")
+                else:
+                    st.caption(f"Atualização por sondagem a cada {INTERVALO_ORACLE_S}s (Oracle)")
 
             # --- BLOCO 3: Dados ---
             charts.render_tabela(df_filtered)
 
         else:
-            if filtro_totem != "Todos" and not df.empty:
-                st.warning(f"Sem dados para o filtro: {filtro_totem}")
+            if filtros or PERIODOS[filtro_periodo]:
+                st.warning(f"Sem dados para o filtro: {filtro_totem} • {filtro_periodo}")
             else:
                 st.info("Aguardando fluxo de dados...")
-    
-    time.sleep(2)
\ No newline at end of file
+
+    st.session_state["ultima_rodada"] = instrumentacao.encerrar_rodada(rodada)
+    aguardar_novidades(ouvinte, sequencia_vista)
\ No newline at end of file
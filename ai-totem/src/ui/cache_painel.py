@@ -0,0 +1,114 @@
+# Arquivo: src/ui/cache_painel.py
+"""
+Cache compartilhado do dashboard, guiado por mudança.
+
+Cada "visão" (driver + filtros + tamanho da janela) tem uma única janela
+incremental e o último resultado calculado, marcado com o maior id visto,
+o início do período (arredondado ao minuto, então anda com o relógio) e a
+versão do modelo (um hot-reload do predictor refaz a predição).
+Todas as sessões do Streamlit que olham a mesma visão leem o mesmo resultado:
+enquanto o max(id) do recorte não muda, o refresh custa só essa sondagem.
+Quando muda, uma sessão recalcula (as outras esperam e reaproveitam).
+O app só chama obter() quando chega aviso de linhas novas (src/database/notificacao.py).
+"""
+import threading
+from collections import OrderedDict
+
+from src.ui.janela import JanelaDados
+from src.core.instrumentacao import medido
+
+
+class VisaoPainel:
+    """Janela + último resultado de uma combinação de filtros."""
+
+    def __init__(self, tamanho, filtros):
+        self.janela = JanelaDados(tamanho, **filtros)
+        self.filtros = filtros
+        self.versao = None
+        self.dados = None
+        self.lock = threading.Lock()
+
+
+class CachePainel:
+    def __init__(self, max_visoes=32):
+        self.max_visoes = max_visoes
+        self._visoes = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.recalculos = 0
+
+    def _visao(self, chave, tamanho, filtros):
+        with self._lock:
+            visao = self._visoes.get(chave)
+            if visao is None:
+                visao = self._visoes[chave] = VisaoPainel(tamanho, filtros)
+                # Visões sem ninguém olhando saem pelo fim (LRU)
+                if len(self._visoes) > self.max_visoes:
+                    self._visoes.popitem(last=False)
+            self._visoes.move_to_end(chave)
+            return visao
+
+    def obter(self, db, chave, tamanho, filtros, predictor, inicio=None):
+        """
+        Dados prontos para os gráficos da visão `chave`.
+        `inicio` é o começo do período, recalculado pelo app a cada refresh
+        (fica fora de `filtros`, que são fixos por visão).
+        Retorna dict com versao (max id, início, modelo), df, agregados, latencia, predicao.
+        """
+        visao = self._visao(chave, tamanho, filtros)
+        # Minuto cheio: as sessões da mesma visão caem no mesmo início e dividem o resultado
+        if inicio is not None:
+            inicio = inicio.replace(second=0, microsecond=0)
+        # A única ida ao banco quando nada mudou (o início muda uma vez por minuto)
+        versao = (db.max_id(inicio=inicio, **filtros), inicio, getattr(predictor, "versao", None))
+        if visao.versao == versao and visao.dados is not None:
+            self._contar(hit=True)
+            return visao.dados
+
+        with visao.lock:
+            # Outra sessão pode ter recalculado enquanto esperávamos o lock
+            if visao.versao == versao and visao.dados is not None:
+                self._contar(hit=True)
+                return visao.dados
+            visao.dados = self._calcular(db, visao, predictor, versao, inicio)
+            visao.versao = versao
+            self._contar(hit=False)
+            return visao.dados
+
+    def _contar(self, hit):
+        # As sessões do Streamlit rodam em threads: += sem lock perde incrementos
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.recalculos += 1
+
+    @staticmethod
+    @medido("CachePainel._calcular")
+    def _calcular(db, visao, predictor, versao, inicio):
+        visao.janela.atualizar(db, inicio)
+        # Soma nos rollups só as linhas novas; KPIs e contagens leem de lá
+        db.atualizar_rollups()
+        agregados = db.agregados_painel(visao.filtros.get("id_sensor"), inicio)
+
+        # Já chega tipado do banco (DTYPES): nada a converter. Cópia por versão
+        # porque a janela é substituída no próximo atualizar e as sessões só leem.
+        df = visao.janela.df.copy()
+
+        dados = {"versao": versao, "df": df, "agregados": agregados, "latencia": None, "predicao": None}
+        if not df.empty:
+            dados["latencia"] = df[df['tempo_resposta_ms'] > 0].reset_index()
+            ultimo = df.iloc[0]
+            dados["predicao"] = predictor.predict(ultimo['tempo_permanencia'], ultimo['tempo_interacao'])
+        return dados
+
+    def estatisticas(self):
+        with self._lock:
+            hits, recalculos, visoes = self.hits, self.recalculos, len(self._visoes)
+        total = hits + recalculos
+        return {
+            "visoes": visoes,
+            "hits": hits,
+            "recalculos": recalculos,
+            "taxa_acerto": hits / total if total else 0.0,
+        }
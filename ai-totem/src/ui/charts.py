@@ -3,33 +3,54 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 
-def render_kpis(df, total_registros):
-    """Renderiza a linha principal de indicadores."""
-    # Tratamento de segurança
-    for col in ['tempo_permanencia', 'tempo_interacao', 'tempo_resposta_ms']:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+from src.core.instrumentacao import medido, trecho
 
-    # Filtrando apenas quem interagiu
-    interacoes = df[df['tempo_interacao'] > 0]
-    engajados = df[df['tipo_interacao'] == 'Engajado']
+@medido("charts.render_kpis")
+def render_kpis(df, total_registros, kpis=None, latencia=None):
+    """
+    Renderiza a linha principal de indicadores.
+    Se `kpis` (DBConnector.kpis) e `latencia` (DBConnector.percentis_latencia)
+    vierem, usa os números calculados no banco sobre todo o histórico;
+    senão calcula sobre a janela `df`.
+    """
+    if kpis is None:
+        # Colunas numéricas já chegam tipadas do DBConnector (DTYPES)
+        engajados = df[df['tipo_interacao'] == 'Engajado']
+        kpis = {
+            "total": total_registros,
+            # Taxa de Engajamento Real (Engajados / Total)
+            "taxa_engajamento": (len(engajados) / len(df)) * 100 if len(df) > 0 else 0,
+            # Tempo Médio (Presença vs Uso)
+            "media_permanencia": df['tempo_permanencia'].mean() if not df.empty else 0,
+        }
+    if latencia is None:
+        # Percentis exatos da janela (só sessões com resposta medida)
+        medidas = df[df['tempo_resposta_ms'] > 0] if not df.empty else df
+        quantis = medidas['tempo_resposta_ms'].quantile([0.5, 0.95, 0.99]) if not medidas.empty else None
+        latencia = {
+            "p50": quantis[0.5] if quantis is not None else None,
+            "p95": quantis[0.95] if quantis is not None else None,
+            "p99": quantis[0.99] if quantis is not None else None,
+            "medidas": len(medidas),
+            "taxa_timeout": (medidas['status_sistema'] == 'ERRO_TIMEOUT').mean() * 100 if not medidas.empty else 0.0,
+        }
     
     k1, k2, k3, k4 = st.columns(4)
-    k1.metric("Total Sessões", total_registros)
+    k1.metric("Total Sessões", kpis['total'])
+    k2.metric("Taxa de Engajamento", f"{kpis['taxa_engajamento']:.1f}%")
+    k3.metric("Tempo Médio (Presença)", f"{kpis['media_permanencia']:.1f}s")
     
-    # Taxa de Engajamento Real (Engajados / Total)
-    taxa_engajamento = (len(engajados) / len(df)) * 100 if len(df) > 0 else 0
-    k2.metric("Taxa de Engajamento", f"{taxa_engajamento:.1f}%")
-    
-    # Tempo Médio (Presença vs Uso)
-    media_perm = df['tempo_permanencia'].mean() if not df.empty else 0
-    k3.metric("Tempo Médio (Presença)", f"{media_perm:.1f}s")
-    
-    # UX Score (Latência)
-    latencia = df['tempo_resposta_ms'].mean() if not df.empty else 0
-    status_ux = "Lento 🐢" if latencia > 1000 else "Fluido ⚡"
-    k4.metric("Performance (Latência)", f"{latencia:.0f}ms", delta=status_ux, delta_color="inverse")
+    # UX Score (Latência): a cauda (p95) é o que o visitante sente, não a média
+    if latencia['p95'] is None:
+        k4.metric("Performance (Latência p95)", "—")
+        return
+    status_ux = "Lento 🐢" if latencia['p95'] > 1000 else "Fluido ⚡"
+    k4.metric("Performance (Latência p95)", f"{latencia['p95']:.0f}ms", delta=status_ux, delta_color="inverse")
+    st.caption(f"Latência p50 **{latencia['p50']:.0f}ms** • p95 **{latencia['p95']:.0f}ms** • "
+               f"p99 **{latencia['p99']:.0f}ms** • timeouts **{latencia['taxa_timeout']:.1f}%** "
+               f"({latencia['medidas']} sessões medidas)")
 
+@medido("charts.render_ml_insights")
 def render_ml_insights(ultima_interacao, predicao_ia, probabilidade):
     """Mostra o Cérebro da IA."""
     st.markdown("---")
@@ -55,7 +76,8 @@ def render_ml_insights(ultima_interacao, predicao_ia, probabilidade):
         else:
             st.warning("Atrair Atenção")
 
-def render_analise_comportamental(df):
+@medido("charts.render_analise_comportamental")
+def render_analise_comportamental(df, media_por_perfil=None):
     """(RECUPERADO) Gráficos V2: Dispersão e Tempos."""
     c1, c2 = st.columns(2)
     
@@ -76,23 +98,31 @@ def render_analise_comportamental(df):
     with c2:
         st.subheader("⏱️ Presença vs. Interação")
         st.caption("Média de tempo por perfil de usuário")
-        if not df.empty:
-            # Compara média de presença vs interação
+        # Compara média de presença vs interação (pré-agregada no banco, se disponível)
+        if media_por_perfil is not None:
+            chart_data = media_por_perfil
+        elif not df.empty:
             chart_data = df.groupby('tipo_interacao')[['tempo_permanencia', 'tempo_interacao']].mean()
+        else:
+            chart_data = None
+        if chart_data is not None and not chart_data.empty:
             st.bar_chart(chart_data, height=300)
 
-def render_analise_temporal_ranking(df):
-    """Gráficos V3: Tendências e Ranking."""
+@medido("charts.render_analise_temporal_ranking")
+def render_analise_temporal_ranking(df, engajados_por_dia=None, ranking=None, serie=None):
+    """Gráficos V3: Tendências e Ranking (contagens dos rollups do banco, se disponíveis)."""
     # Preparação
-    if 'timestamp' in df.columns:
-        df['data_hora'] = pd.to_datetime(df['timestamp'])
-        df['dia_semana'] = df['data_hora'].dt.day_name()
-        df['hora'] = df['data_hora'].dt.hour
+    if engajados_por_dia is None and 'timestamp' in df.columns:
+        # timestamp já é datetime64 (lido do ts_epoch): sem parse de texto
+        with trecho("charts.dt"):
+            df['dia_semana'] = df['timestamp'].dt.day_name()
+            df['hora'] = df['timestamp'].dt.hour
 
     c1, c2 = st.columns(2)
     with c1:
         st.subheader("📅 Tendência Semanal")
-        engajados_por_dia = df[df['tipo_interacao'] == 'Engajado']['dia_semana'].value_counts()
+        if engajados_por_dia is None:
+            engajados_por_dia = df[df['tipo_interacao'] == 'Engajado']['dia_semana'].value_counts()
         if not engajados_por_dia.empty:
             st.bar_chart(engajados_por_dia, height=250)
         else:
@@ -100,28 +130,57 @@ def render_analise_temporal_ranking(df):
             
     with c2:
         st.subheader("🏆 Top Totens (Engajamento)")
-        ranking = df[df['tipo_interacao'] == 'Engajado']['id_sensor'].value_counts()
+        if ranking is None:
+            ranking = df[df['tipo_interacao'] == 'Engajado']['id_sensor'].value_counts()
         if not ranking.empty:
             st.bar_chart(ranking, height=250, color="#FF4B4B") # Cor destaque
         else:
             st.info("Sem engajamento para rankear.")
 
-def render_analise_tecnica(df):
+    # Série por hora vinda do rollup: 7 dias custam o mesmo que 1 hora
+    if serie is not None and not serie.empty:
+        st.subheader("📈 Sessões por Hora (últimos 7 dias)")
+        st.line_chart(serie, height=250)
+
+@medido("charts.render_analise_tecnica")
+def render_analise_tecnica(df, acoes=None, latencia=None):
     """Gráficos de Performance e Comandos."""
     c1, c2 = st.columns(2)
     
     with c1:
         st.subheader("🔥 Mapa de Calor de Ações")
-        df_cmds = df[df['acao_usuario'] != 'Nenhuma']['acao_usuario'].value_counts()
+        df_cmds = acoes
+        if df_cmds is None:
+            df_cmds = df[df['acao_usuario'] != 'Nenhuma']['acao_usuario'].value_counts()
         if not df_cmds.empty:
             st.bar_chart(df_cmds, height=250)
             
     with c2:
         st.subheader("⚡ Monitor de Latência (ms)")
-        df_lat = df[df['tempo_resposta_ms'] > 0].reset_index()
+        df_lat = latencia if latencia is not None else df[df['tempo_resposta_ms'] > 0].reset_index()
         if not df_lat.empty:
             st.line_chart(df_lat, y='tempo_resposta_ms', height=250)
 
+def render_performance(rodada, registro):
+    """Painel de desempenho: quebra do último refresh e histórico do processo."""
+    st.subheader("⏱️ Onde o tempo foi gasto")
+    if rodada is None or not rodada.operacoes:
+        st.caption("A quebra aparece a partir do segundo refresh.")
+    else:
+        st.caption(f"Último refresh completo: {rodada.duracao_ms:.0f}ms")
+        # As operações se aninham (ex.: agregados_painel inclui kpis e as contagens)
+        df_rodada = pd.DataFrame(rodada.resumo()).set_index('operacao')
+        st.bar_chart(df_rodada['total_ms'], height=250, horizontal=True)
+        st.dataframe(df_rodada.round(2), use_container_width=True)
+
+    with st.expander("📈 Acumulado do processo (p95 por operação)"):
+        resumo = registro.resumo()
+        if resumo:
+            st.dataframe(pd.DataFrame(resumo).set_index('operacao').round(2), use_container_width=True)
+        # Texto no formato do Prometheus (o bloco de código tem botão de copiar)
+        st.code(registro.exportar_prometheus(), language="text")
+
+@medido("charts.render_tabela")
 def render_tabela(df):
     with st.expander("🔎 Auditoria dos Dados (Tabela Completa)"):
         st.dataframe(df, use_container_width=True)
\ No newline at end of file
@@ -0,0 +1,34 @@
+# Arquivo: src/ui/janela.py
+import pandas as pd
+
+class JanelaDados:
+    """
+    Janela em memória com as N interações mais recentes.
+    A cada refresh só o delta (id > último visto) vem do banco:
+    as linhas novas entram no topo e as mais antigas saem pelo fim.
+    `filtros` (id_sensor, tipo_interacao...) vão direto para o SQL,
+    então a janela tem sempre até N linhas do recorte, mesmo de um totem raro.
+    O período ("últimas 24h") anda com o relógio: `inicio` vem a cada
+    atualizar() e as linhas que ficaram antes dele saem da janela.
+    """
+    def __init__(self, tamanho, **filtros):
+        self.tamanho = tamanho
+        self.filtros = filtros
+        self.df = pd.DataFrame()
+        self.ultimo_id = 0
+
+    def atualizar(self, db, inicio=None):
+        """Anexa as linhas novas do banco (a partir de `inicio`, se houver). Retorna quantas chegaram."""
+        if inicio is not None and not self.df.empty:
+            self.df = self.df[self.df['timestamp'] >= pd.Timestamp(inicio)].reset_index(drop=True)
+        novos = db.ler_novos(desde_id=self.ultimo_id, limit=self.tamanho, inicio=inicio, **self.filtros)
+        if novos.empty:
+            return 0
+
+        if self.df.empty:
+            self.df = novos.head(self.tamanho).reset_index(drop=True)
+        else:
+            self.df = pd.concat([novos, self.df], ignore_index=True).head(self.tamanho)
+        # Marca d'água do banco (um id; no modo shardado, um por shard)
+        self.ultimo_id = db.avancar_marca(self.ultimo_id, novos)
+        return len(novos)
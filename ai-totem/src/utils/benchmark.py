@@ -0,0 +1,321 @@
+# Arquivo: src/utils/benchmark.py
+"""
+Suíte de benchmark dos caminhos quentes: ingestão, consultas, validação,
+inferência, treino e montagem dos gráficos (Streamlit substituído por um stub).
+
+Cada tamanho roda num banco SQLite temporário populado com dados sintéticos,
+e o resultado sai em JSON para comparar execuções:
+
+    python src/utils/benchmark.py --tamanhos 10000 100000 1000000
+    python src/utils/benchmark.py --comparar data/benchmarks/anterior.json --limite 0.2
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import numpy as np
+
+import src.database.connector as connector
+from config import settings
+from src.database.connector import DBConnector
+from src.core.schemas import InteracaoSchema, validar_lote
+from src.sensors.simulador import gerar_lote
+from src.ml_engine import artefato
+
+BENCH_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "benchmarks"
+
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000]
+# Mesmos extremos do slider "Janela de Dados" do dashboard
+JANELAS = [50, 200, 1000, 5000]
+# Dados com timestamps espalhados (1 por segundo) a partir de um instante fixo:
+# mesma seed => mesmos registros em toda execução
+INICIO_DADOS = datetime.datetime(2024, 1, 1)
+
+
+class _StreamlitFalso:
+    """Aceita qualquer chamada do Streamlit sem desenhar nada (só sobra o custo do pandas)."""
+
+    def __getattr__(self, nome):
+        return self._nada
+
+    def _nada(self, *args, **kwargs):
+        return self
+
+    def columns(self, spec, **kwargs):
+        n = spec if isinstance(spec, int) else len(spec)
+        return [self] * n
+
+    def tabs(self, nomes, **kwargs):
+        return [self] * len(nomes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _medir(fn, repeticoes=5, itens=None, preparar=None):
+    """
+    Roda `fn` `repeticoes` vezes e devolve as estatísticas em ms.
+    `preparar` (fora do cronômetro) gera o argumento de cada execução;
+    `itens` (operações por execução) acrescenta a vazão em ops/s.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        arg = preparar() if preparar else None
+        inicio = time.perf_counter()
+        fn(arg) if preparar else fn()
+        tempos.append(time.perf_counter() - inicio)
+    tempos.sort()
+    resultado = {
+        "repeticoes": repeticoes,
+        "min_ms": round(tempos[0] * 1000, 4),
+        "mediana_ms": round(statistics.median(tempos) * 1000, 4),
+        "p95_ms": round(tempos[min(len(tempos) - 1, int(0.95 * len(tempos)))] * 1000, 4),
+        "media_ms": round(statistics.fmean(tempos) * 1000, 4),
+    }
+    if itens:
+        resultado["itens"] = itens
+        resultado["ops_s"] = round(itens / statistics.median(tempos), 1)
+    return resultado
+
+
+@contextlib.contextmanager
+def _ambiente_isolado():
+    """
+    Banco e diretório de modelos temporários: o benchmark nunca toca nos dados reais.
+    Sem aviso UDP: um dashboard aberto na máquina não recalcula a cada lote do benchmark.
+    """
+    pasta = Path(tempfile.mkdtemp(prefix="flexmedia_bench_"))
+    originais = (connector.DB_SQLITE_PATH, artefato.MODELS_DIR, artefato.META_PATH, settings.NOTIFICACAO_PORTA)
+    connector.DB_SQLITE_PATH = pasta / "bench.db"
+    settings.NOTIFICACAO_PORTA = 0
+    artefato.MODELS_DIR = str(pasta / "models")
+    artefato.META_PATH = os.path.join(artefato.MODELS_DIR, "interaction_classifier.json")
+    _fechar_pools()
+    try:
+        yield pasta
+    finally:
+        _fechar_pools()
+        connector.DB_SQLITE_PATH, artefato.MODELS_DIR, artefato.META_PATH, settings.NOTIFICACAO_PORTA = originais
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+def _fechar_pools():
+    with connector._POOLS_LOCK:
+        for pool in connector._POOLS.values():
+            pool.close()
+        connector._POOLS.clear()
+
+
+def _registros(n, seed):
+    """Registros (dicts) no formato que o simulador entrega ao banco."""
+    colunas = gerar_lote(n, seed=seed, inicio=INICIO_DADOS, intervalo_s=1.0, validar=False)
+    campos = list(colunas)
+    return [dict(zip(campos, linha)) for linha in zip(*(v.tolist() for v in colunas.values()))]
+
+
+def bench_ingestao(db, n):
+    print(f"   📥 Ingestão em massa de {n} registros...")
+    resultado = {}
+
+    # Geração separada da gravação, para o número refletir só o banco
+    inicio = time.perf_counter()
+    colunas = gerar_lote(n, seed=42, inicio=INICIO_DADOS, intervalo_s=1.0)
+    resultado["gerar_lote"] = {"itens": n, "total_ms": round((time.perf_counter() - inicio) * 1000, 2)}
+
+    inicio = time.perf_counter()
+    gravados = db.salvar_lote(colunas)
+    duracao = time.perf_counter() - inicio
+    resultado["salvar_lote"] = {
+        "itens": n,
+        "inseridos": gravados["inseridos"],
+        "total_ms": round(duracao * 1000, 2),
+        "ops_s": round(n / duracao, 1),
+    }
+
+    # Catch-up dos rollups sobre todo o histórico recém-gravado
+    inicio = time.perf_counter()
+    db.atualizar_rollups()
+    resultado["atualizar_rollups"] = {"itens": n, "total_ms": round((time.perf_counter() - inicio) * 1000, 2)}
+
+    # Inserção unitária (o caminho do simulador com SIMULADOR_BATCH_SIZE=1)
+    avulsos = iter(_registros(200, seed=7))
+    resultado["salvar_interacao"] = _medir(lambda r: db.salvar_interacao(r), 200, itens=1,
+                                           preparar=lambda: next(avulsos))
+    return resultado
+
+
+def bench_consultas(db):
+    print("   🔎 Consultas...")
+    resultado = {"contar_total": _medir(db.contar_total, 20)}
+    for janela in JANELAS:
+        resultado[f"ler_dados_{janela}"] = _medir(lambda: db.ler_dados(limit=janela), 10, itens=janela)
+        resultado[f"ler_novos_{janela}"] = _medir(lambda: db.ler_novos(0, limit=janela), 10, itens=janela)
+    resultado["agregados_painel"] = _medir(db.agregados_painel, 5)
+    resultado["agregados_painel_totem"] = _medir(lambda: db.agregados_painel("totem_praca"), 5)
+    resultado["percentis_latencia"] = _medir(db.percentis_latencia, 10)
+    return resultado
+
+
+def bench_validacao():
+    print("   ✅ Validação...")
+    registros = _registros(10_000, seed=3)
+    return {
+        "InteracaoSchema": _medir(lambda: [InteracaoSchema(**r) for r in registros], 5, itens=len(registros)),
+        "validar_lote": _medir(lambda: validar_lote(registros), 5, itens=len(registros)),
+    }
+
+
+def bench_ml(db):
+    print("   🧠 Treino e inferência...")
+    from src.ml_engine.trainer import train_model
+    from src.ml_engine.predictor import FlexPredictor
+
+    resultado = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado["train_model"] = _medir(train_model, 3)
+
+    predictor = FlexPredictor()
+    rng = np.random.default_rng(11)
+    entradas = np.round(rng.uniform(0, 60, size=(2000, 2)), 2)
+    distintas = iter(entradas.tolist())
+
+    # Frio: entradas inéditas (passa pela floresta); quente: mesma entrada (cache)
+    resultado["predict_frio"] = _medir(lambda e: predictor.predict(*e), 1000, itens=1, preparar=lambda: next(distintas))
+    resultado["predict_cache"] = _medir(lambda: predictor.predict(12.5, 3.25), 1000, itens=1)
+
+    janela = db.ler_dados(limit=max(JANELAS))
+    resultado["predict_batch_janela"] = _medir(lambda: predictor.predict_batch(janela), 10, itens=len(janela))
+    resultado["cache"] = predictor.estatisticas_cache()
+    return resultado
+
+
+def bench_graficos(db):
+    print("   📊 Gráficos (Streamlit em stub)...")
+    import src.ui.charts as charts
+    st_original = charts.st
+    charts.st = _StreamlitFalso()
+    try:
+        agregados = db.agregados_painel()
+        resultado = {}
+        for janela in JANELAS:
+            df = db.ler_dados(limit=janela)
+            ultimo = df.iloc[0]
+            copia = lambda: df.copy()
+            # Os render_* alteram o DataFrame recebido; cada execução ganha uma cópia nova
+            casos = {
+                "render_kpis": lambda d: charts.render_kpis(d, len(d)),
+                "render_kpis_agregado": lambda d: charts.render_kpis(d, len(d), kpis=agregados['kpis'], latencia=agregados['latencia']),
+                "render_ml_insights": lambda d: charts.render_ml_insights(ultimo, "Engajado", 0.9),
+                "render_analise_comportamental": lambda d: charts.render_analise_comportamental(d),
+                "render_analise_comportamental_agregado": lambda d: charts.render_analise_comportamental(
+                    d, media_por_perfil=agregados['media_por_perfil']),
+                "render_analise_temporal_ranking": lambda d: charts.render_analise_temporal_ranking(d),
+                "render_analise_temporal_ranking_agregado": lambda d: charts.render_analise_temporal_ranking(
+                    d, engajados_por_dia=agregados['engajados_por_dia'], ranking=agregados['engajados_por_sensor']),
+                "render_analise_tecnica": lambda d: charts.render_analise_tecnica(d),
+                "render_analise_tecnica_agregado": lambda d: charts.render_analise_tecnica(d, acoes=agregados['acoes']),
+                "render_tabela": lambda d: charts.render_tabela(d),
+            }
+            for nome, fn in casos.items():
+                resultado[f"{nome}_{janela}"] = _medir(fn, 10, itens=len(df), preparar=copia)
+        return resultado
+    finally:
+        charts.st = st_original
+
+
+def executar(tamanhos=TAMANHOS_PADRAO, incluir_ml=True):
+    """Roda a suíte para cada tamanho e devolve o relatório (dict serializável em JSON)."""
+    relatorio = {
+        "meta": {
+            "executado_em": datetime.datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "processador": platform.processor() or platform.machine(),
+            "nucleos": os.cpu_count(),
+            "driver": "sqlite",
+        },
+        "resultados": {},
+    }
+    for n in tamanhos:
+        print(f"\n🏁 Benchmark com {n} registros")
+        with _ambiente_isolado():
+            db = DBConnector(driver="sqlite")
+            with contextlib.redirect_stdout(io.StringIO()):
+                db.init_db()
+            secoes = {"ingestao": bench_ingestao(db, n), "consultas": bench_consultas(db)}
+            secoes["validacao"] = bench_validacao()
+            if incluir_ml:
+                secoes["ml"] = bench_ml(db)
+            secoes["graficos"] = bench_graficos(db)
+            secoes["pool"] = db.estatisticas_pool()
+        relatorio["resultados"][str(n)] = secoes
+    return relatorio
+
+
+def _tempos(relatorio):
+    """Achata o relatório em {"tamanho/secao/caso": mediana_ms} (ou total_ms)."""
+    planos = {}
+    for n, secoes in relatorio["resultados"].items():
+        for secao, casos in secoes.items():
+            for caso, valores in casos.items():
+                if isinstance(valores, dict):
+                    tempo = valores.get("mediana_ms", valores.get("total_ms"))
+                    if tempo is not None:
+                        planos[f"{n}/{secao}/{caso}"] = tempo
+    return planos
+
+
+def comparar(atual, base, limite=0.2):
+    """Lista os casos que ficaram mais de `limite` (fração) mais lentos que a base."""
+    tempos_base = _tempos(base)
+    regressoes = []
+    for chave, tempo in _tempos(atual).items():
+        anterior = tempos_base.get(chave)
+        if anterior and tempo > anterior * (1 + limite):
+            regressoes.append({"caso": chave, "base_ms": anterior, "atual_ms": tempo,
+                               "variacao": round(tempo / anterior - 1, 3)})
+    return sorted(regressoes, key=lambda r: -r["variacao"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dos caminhos quentes (SQLite)")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS_PADRAO)
+    parser.add_argument("--saida", default=None, help="arquivo JSON (padrão: data/benchmarks/bench-<data>.json)")
+    parser.add_argument("--sem-ml", action="store_true", help="pula treino e inferência")
+    parser.add_argument("--comparar", default=None, help="JSON de uma execução anterior")
+    parser.add_argument("--limite", type=float, default=0.2, help="piora tolerada antes de acusar regressão")
+    args = parser.parse_args()
+
+    relatorio = executar(args.tamanhos, incluir_ml=not args.sem_ml)
+
+    saida = Path(args.saida) if args.saida else BENCH_DIR / f"bench-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2, default=str)
+    print(f"\n💾 Resultados salvos em: {saida}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            base = json.load(f)
+        regressoes = comparar(relatorio, base, args.limite)
+        if regressoes:
+            print(f"🐢 {len(regressoes)} regressões acima de {args.limite*100:.0f}%:")
+            for r in regressoes:
+                print(f"   {r['caso']}: {r['base_ms']}ms -> {r['atual_ms']}ms (+{r['variacao']*100:.0f}%)")
+            sys.exit(1)
+        print("⚡ Nenhuma regressão em relação à base.")
@@ -0,0 +1,105 @@
+# Arquivo: src/utils/orcamento_importacao.py
+"""
+Orçamento de importação dos pontos de entrada da ingestão.
+
+Cada módulo é importado num interpretador novo (import a frio, como numa
+execução real do simulador ou do seeder). A checagem falha quando:
+  - o import passa do orçamento (IMPORT_BUDGET_MS no .env, ou --limite-ms);
+  - uma dependência pesada que o caminho não usa (pandas, NumPy, pydantic,
+    oracledb, sklearn...) é carregada na partida.
+
+    python src/utils/orcamento_importacao.py              # código de saída 1 se estourar
+    python src/utils/orcamento_importacao.py --detalhe    # maiores imports (python -X importtime)
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from config.settings import BASE_DIR, IMPORT_BUDGET_MS
+
+# Pontos de entrada do caminho de ingestão
+ENTRADAS = ["src.sensors.simulador", "src.utils.seeder", "src.sensors.ingestao", "src.database.connector"]
+
+# Só podem ser carregados sob demanda (leitura, validação/geração em lote, Oracle,
+# treino, arquivo, dashboard)
+PROIBIDOS = ["pandas", "numpy", "pydantic", "oracledb", "sklearn", "joblib", "pyarrow", "streamlit", "altair"]
+
+# Roda no interpretador filho: mede só o import do módulo (sem a partida do Python)
+_MEDIR = """
+import json, sys, time
+inicio = time.perf_counter()
+__import__(sys.argv[1])
+ms = (time.perf_counter() - inicio) * 1000
+carregados = sorted({m.split('.')[0] for m in sys.modules} & set(sys.argv[2:]))
+print(json.dumps({"ms": ms, "carregados": carregados}))
+"""
+
+
+def medir(modulo, repeticoes=3):
+    """Menor tempo (ms) de import a frio de `modulo` e os proibidos que ele carregou."""
+    melhor = None
+    for _ in range(repeticoes):
+        saida = subprocess.run(
+            [sys.executable, "-c", _MEDIR, modulo, *PROIBIDOS],
+            cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        # A última linha é a do medidor (o módulo pode imprimir algo ao ser importado)
+        resultado = json.loads(saida.stdout.strip().splitlines()[-1])
+        if melhor is None or resultado["ms"] < melhor["ms"]:
+            melhor = resultado
+    return melhor
+
+
+def detalhar(modulo, top=10):
+    """Os `top` imports mais caros (tempo acumulado) de `modulo`, via -X importtime."""
+    saida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True,
+    )
+    linhas = []
+    for linha in saida.stderr.splitlines()[1:]:
+        _, acumulado, nome = linha.split("|")
+        linhas.append((int(acumulado) / 1000, nome.rstrip()))
+    return sorted(linhas, reverse=True)[:top]
+
+
+def verificar(entradas=ENTRADAS, limite_ms=IMPORT_BUDGET_MS, repeticoes=3):
+    """Mede cada entrada; retorna (relatorio, lista de problemas)."""
+    relatorio, problemas = {}, []
+    for modulo in entradas:
+        resultado = medir(modulo, repeticoes)
+        relatorio[modulo] = resultado
+        if resultado["ms"] > limite_ms:
+            problemas.append(f"{modulo}: {resultado['ms']:.0f}ms (orçamento {limite_ms:.0f}ms)")
+        if resultado["carregados"]:
+            problemas.append(f"{modulo}: carrega na partida {', '.join(resultado['carregados'])}")
+    return relatorio, problemas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Checa o tempo de import a frio dos pontos de entrada")
+    parser.add_argument("modulos", nargs="*", default=ENTRADAS)
+    parser.add_argument("--limite-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--repeticoes", type=int, default=3, help="o menor tempo vale (descarta ruído)")
+    parser.add_argument("--detalhe", action="store_true", help="mostra os imports mais caros de cada módulo")
+    args = parser.parse_args()
+
+    print(f"⏱️ Import a frio (orçamento: {args.limite_ms:.0f}ms)")
+    relatorio, problemas = verificar(args.modulos, args.limite_ms, args.repeticoes)
+    for modulo, resultado in relatorio.items():
+        icone = "✅" if resultado["ms"] <= args.limite_ms and not resultado["carregados"] else "🐢"
+        print(f"   {icone} {modulo}: {resultado['ms']:.1f}ms")
+        if args.detalhe:
+            for ms, nome in detalhar(modulo):
+                print(f"        {ms:8.1f}ms {nome}")
+
+    if problemas:
+        print(f"❌ {len(problemas)} problema(s):")
+        for problema in problemas:
+            print(f"   {problema}")
+        sys.exit(1)
+    print("⚡ Todos os pontos de entrada dentro do orçamento.")
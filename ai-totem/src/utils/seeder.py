@@ -2,35 +2,52 @@
 import sys
 import os
 import time
+import datetime
 
 # Ajuste de path para importar módulos irmãos
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
+from config.settings import SEEDER_BATCH_SIZE, SEEDER_INTERVALO_S
 from src.database.connector import DBConnector
-from src.sensors.simulador import gerar_dados_complexos
+from src.sensors.simulador import gerar_lote
 
-def popular_banco(qtd_registros=300):
-    print(f"🌱 Iniciando Seeding de {qtd_registros} registros...")
+def popular_banco(qtd_registros=300, tamanho_lote=SEEDER_BATCH_SIZE, intervalo_s=SEEDER_INTERVALO_S):
+    print(f"🌱 Iniciando Seeding de {qtd_registros} registros (lotes de {tamanho_lote})...")
     
     db = DBConnector()
     db.init_db() # Garante que a tabela existe
     
     start_time = time.time()
+    inseridos = 0
+    duplicados = 0
+    rejeitados = 0
+    # Histórico espalhado até "agora", um registro a cada `intervalo_s`
+    comeco = datetime.datetime.now() - datetime.timedelta(seconds=qtd_registros * intervalo_s)
     
-    for i in range(qtd_registros):
-        # Gera o dado usando a lógica complexa (com latência, comandos, etc)
-        dado = gerar_dados_complexos()
+    for inicio in range(0, qtd_registros, tamanho_lote):
+        # Gera o lote inteiro de uma vez (NumPy), com a mesma lógica do simulador
+        fim = min(inicio + tamanho_lote, qtd_registros)
+        lote = gerar_lote(fim - inicio, inicio=comeco + datetime.timedelta(seconds=inicio * intervalo_s), intervalo_s=intervalo_s)
         
-        # Salva no banco
-        db.salvar_interacao(dado)
+        # Salva o lote inteiro em uma única transação
+        resultado = db.salvar_lote(lote, tamanho_lote=tamanho_lote)
+        inseridos += resultado['inseridos']
+        duplicados += resultado['duplicados']
+        rejeitados += len(resultado['rejeitados'])
         
         # Barra de progresso visual simples
-        if i % 10 == 0:
-            sys.stdout.write(f"\rProcessando: {i}/{qtd_registros} ({(i/qtd_registros)*100:.1f}%)")
-            sys.stdout.flush()
+        sys.stdout.write(f"\rProcessando: {fim}/{qtd_registros} ({(fim/qtd_registros)*100:.1f}%)")
+        sys.stdout.flush()
             
+    # Rollups (minuto/hora) do que acabou de entrar
+    db.atualizar_rollups()
+
     end_time = time.time()
-    print(f"\n✅ Concluído! {qtd_registros} registros inseridos em {end_time - start_time:.2f} segundos.")
+    print(f"\n✅ Concluído! {inseridos} registros inseridos em {end_time - start_time:.2f} segundos.")
+    if duplicados:
+        print(f"♻️ {duplicados} registros descartados pela deduplicação (mesmo id_evento e conteúdo de um já gravado).")
+    if rejeitados:
+        print(f"⚠️ {rejeitados} registros rejeitados pelo banco.")
     print(f"🎯 Banco alvo: {db.driver.upper()}")
 
 if __name__ == "__main__":
@@ -40,4 +57,4 @@ if __name__ == "__main__":
     except ValueError:
         qtd = 300
         
-    popular_banco(qtd)
\ No newline at end of file
+    popular_banco(qtd)
@@ -0,0 +1,26 @@
+# Arquivo: tests/conftest.py
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.database.connector as connector
+from config import settings
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    """DBConnector SQLite (sem shards) num arquivo novo, isolado do data/processed."""
+    monkeypatch.setattr(connector, "DB_SQLITE_PATH", tmp_path / "teste.db")
+    monkeypatch.setattr(settings, "SQLITE_SHARDS", 1)
+    # Sem UDP na porta real: um dashboard aberto não acorda com as gravações do teste
+    monkeypatch.setattr(settings, "NOTIFICACAO_PORTA", 0)
+    db = connector.DBConnector(driver="sqlite")
+    db.init_db()
+    yield db
+    # Fecha os pools dos arquivos do teste (o resto do processo segue com os seus)
+    with connector._POOLS_LOCK:
+        for chave in [c for c in connector._POOLS if c[1] and c[1].startswith(str(tmp_path))]:
+            connector._POOLS.pop(chave).close()
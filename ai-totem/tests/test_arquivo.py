@@ -0,0 +1,92 @@
+# Arquivo: tests/test_arquivo.py
+import datetime
+
+import pytest
+
+from src.database import arquivo, rollups
+from src.database.connector import TABLE_NAME, TABELA_ARQUIVADOS
+from src.sensors.simulador import gerar_lote
+
+pytestmark = pytest.mark.skipif(not arquivo.PARQUET_AVAILABLE, reason="pyarrow não instalado")
+
+ANTIGO = datetime.datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def banco_arquivo(banco, tmp_path, monkeypatch):
+    monkeypatch.setattr(arquivo, "ARQUIVO_DIR", tmp_path / "arquivo")
+    return banco
+
+
+def _sessoes_rollup(banco):
+    with banco.conexao() as conn:
+        rollups.atualizar(conn, "sqlite", TABLE_NAME)
+        return conn.execute(f"SELECT SUM(sessoes) FROM {rollups.GRANULARIDADES['hora'][0]}").fetchone()[0]
+
+
+def test_linha_arquivada_reenviada_e_descartada(banco_arquivo):
+    lote = gerar_lote(3000, seed=10, inicio=ANTIGO, intervalo_s=1.0)
+    banco_arquivo.salvar_lote(lote)
+    assert arquivo.arquivar(banco_arquivo, horizonte_dias=30)["arquivadas"] == 3000
+    assert banco_arquivo.contar_total() == 0
+
+    # O UNIQUE da tabela quente já não tem esses hashes: quem recusa é a tabela de arquivados
+    resultado = banco_arquivo.salvar_lote(lote)
+    assert resultado["inseridos"] == 0 and resultado["duplicados"] == 3000
+
+    assert arquivo.arquivar(banco_arquivo, horizonte_dias=30)["arquivadas"] == 0
+    assert arquivo.estatisticas()["linhas"] == 3000
+    assert _sessoes_rollup(banco_arquivo) == 3000
+
+
+def test_linhas_novas_seguem_entrando_depois_do_arquivamento(banco_arquivo):
+    banco_arquivo.salvar_lote(gerar_lote(1000, seed=11, inicio=ANTIGO, intervalo_s=1.0))
+    arquivo.arquivar(banco_arquivo, horizonte_dias=30)
+    resultado = banco_arquivo.salvar_lote(gerar_lote(1000, seed=12, inicio=ANTIGO, intervalo_s=1.0))
+    assert resultado["inseridos"] == 1000
+    assert _sessoes_rollup(banco_arquivo) == 2000
+
+
+def test_arquivo_anterior_a_tabela_de_hashes_e_registrado(banco_arquivo):
+    # Linhas sem id_evento (chave = conteúdo), arquivadas antes da migração v7
+    lote = gerar_lote(500, seed=13, inicio=ANTIGO, intervalo_s=1.0)
+    lote.pop("id_evento")
+    banco_arquivo.salvar_lote(lote)
+    arquivo.arquivar(banco_arquivo, horizonte_dias=30)
+    with banco_arquivo.conexao() as conn:
+        conn.execute(f"DELETE FROM {TABELA_ARQUIVADOS}")
+        conn.commit()
+
+    arquivo.arquivar(banco_arquivo, horizonte_dias=30)
+    with banco_arquivo.conexao() as conn:
+        assert conn.execute(f"SELECT COUNT(*) FROM {TABELA_ARQUIVADOS}").fetchone()[0] == 500
+    assert banco_arquivo.salvar_lote(lote)["duplicados"] == 500
+
+
+def test_leituras_da_tabela_quente_e_do_arquivo_tem_a_mesma_unidade(banco_arquivo):
+    banco_arquivo.salvar_lote(gerar_lote(200, seed=14, inicio=ANTIGO, intervalo_s=1.0))
+    arquivo.arquivar(banco_arquivo, horizonte_dias=30)
+    banco_arquivo.salvar_lote(gerar_lote(200, seed=15, inicio=datetime.datetime.now(), intervalo_s=1.0))
+
+    quente = banco_arquivo.ler_dados(limit=50)
+    assert quente['timestamp'].dtype == "datetime64[s]"
+    assert arquivo.ler(limit=50)['timestamp'].dtype == quente['timestamp'].dtype
+    assert banco_arquivo.ler_dados(limit=300, incluir_arquivo=True)['timestamp'].dtype == quente['timestamp'].dtype
+    blocos = list(banco_arquivo.ler_em_blocos(100, incluir_arquivo=True))
+    assert {str(b['timestamp'].dtype) for b in blocos} == {"datetime64[s]"}
+
+
+def test_linha_ainda_nao_somada_nos_rollups_fica_na_tabela_quente(banco_arquivo):
+    banco_arquivo.salvar_lote(gerar_lote(1000, seed=16, inicio=ANTIGO, intervalo_s=1.0))
+    banco_arquivo.atualizar_rollups()
+    # Mais linhas antigas, mas o catch-up está atrás delas (como o teto do Oracle)
+    banco_arquivo.salvar_lote(gerar_lote(500, seed=17, inicio=ANTIGO, intervalo_s=1.0))
+    banco_arquivo.atualizar_rollups = lambda: 0
+
+    assert arquivo.arquivar(banco_arquivo, horizonte_dias=30)["arquivadas"] == 1000
+    assert banco_arquivo.contar_total() == 500
+
+    # Catch-up em dia: o resto sai no arquivamento seguinte, e nada fica fora dos rollups
+    del banco_arquivo.atualizar_rollups
+    assert arquivo.arquivar(banco_arquivo, horizonte_dias=30)["arquivadas"] == 500
+    assert _sessoes_rollup(banco_arquivo) == 1500
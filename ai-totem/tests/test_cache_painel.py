@@ -0,0 +1,28 @@
+# Arquivo: tests/test_cache_painel.py
+import datetime
+
+from src.sensors.simulador import gerar_lote
+from src.ui.cache_painel import CachePainel
+
+INICIO = datetime.datetime(2024, 5, 1, 8)
+
+
+class PredictorFalso:
+    def __init__(self, versao):
+        self.versao = versao
+
+    def predict(self, tempo_permanencia, tempo_interacao):
+        return f"v{self.versao}"
+
+
+def test_modelo_recarregado_refaz_a_predicao(banco):
+    banco.salvar_lote(gerar_lote(100, seed=40, inicio=INICIO, intervalo_s=60))
+    cache, predictor = CachePainel(), PredictorFalso(1)
+
+    assert cache.obter(banco, "todos", 500, {}, predictor)["predicao"] == "v1"
+    assert cache.obter(banco, "todos", 500, {}, predictor)["predicao"] == "v1"
+
+    # Hot-reload: nenhuma linha nova, mas o modelo mudou
+    predictor.versao = 2
+    assert cache.obter(banco, "todos", 500, {}, predictor)["predicao"] == "v2"
+    assert cache.estatisticas()["hits"] == 1 and cache.estatisticas()["recalculos"] == 2
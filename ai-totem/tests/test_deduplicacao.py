@@ -0,0 +1,54 @@
+# Arquivo: tests/test_deduplicacao.py
+from src.core.schemas import hash_conteudo, validar_lote, CAMPOS_CHAVE
+from src.sensors.simulador import gerar_lote, gerar_dados_complexos
+
+
+def test_lote_de_sessoes_distintas_no_mesmo_segundo_grava_todas(banco):
+    # intervalo_s=0: todo o lote no mesmo segundo, muitas sessões "Ociosas" idênticas em conteúdo
+    n = 20_000
+    resultado = banco.salvar_lote(gerar_lote(n, seed=1), tamanho_lote=5000)
+    assert resultado == {"inseridos": n, "duplicados": 0, "rejeitados": []}
+    assert banco.contar_total() == n
+
+
+def test_reenvio_do_mesmo_lote_e_descartado(banco):
+    lote = gerar_lote(2000, seed=2)
+    banco.salvar_lote(lote)
+    resultado = banco.salvar_lote(lote)
+    assert resultado["inseridos"] == 0 and resultado["duplicados"] == 2000
+    assert banco.contar_total() == 2000
+
+
+def test_registros_avulsos_iguais_com_ids_diferentes_sao_gravados(banco):
+    registro = gerar_dados_complexos()
+    copia = dict(registro, id_evento=registro["id_evento"][::-1])
+    resultado = banco.salvar_lote([registro, copia, dict(registro)])
+    assert resultado["inseridos"] == 2 and resultado["duplicados"] == 1
+
+
+def test_sem_id_evento_a_chave_e_o_conteudo_de_antes(banco):
+    registro = gerar_dados_complexos()
+    registro.pop("id_evento")
+    valores = [registro[c] for c in CAMPOS_CHAVE]
+    # Mesmo hash de antes do id_evento (linhas antigas e backfill da migração v3)
+    assert hash_conteudo(*valores) == hash_conteudo(*valores, id_evento=None)
+    assert hash_conteudo(*valores) != hash_conteudo(*valores, id_evento="abc")
+    resultado = banco.salvar_lote([registro, dict(registro)])
+    assert resultado["inseridos"] == 1 and resultado["duplicados"] == 1
+
+
+def test_validar_lote_preserva_id_evento():
+    lote = gerar_lote(50, seed=3, validar=False)
+    validos, rejeitados = validar_lote(lote, como_colunas=True)
+    assert not rejeitados
+    assert list(validos["id_evento"]) == list(lote["id_evento"])
+    assert len(set(validos["id_evento"])) == 50
+
+
+def test_mesma_seed_sem_inicio_repete_timestamps_e_hashes():
+    # Sem `inicio`, a seed fixa o começo (INICIO_SEMENTE), não o relógio de quem gera
+    a, b = gerar_lote(100, seed=5, intervalo_s=30), gerar_lote(100, seed=5, intervalo_s=30)
+    assert a["timestamp"][0] == "2024-01-01 00:00:00"
+    assert list(a["timestamp"]) == list(b["timestamp"])
+    chaves = [[hash_conteudo(*(lote[c][i] for c in CAMPOS_CHAVE)) for i in range(100)] for lote in (a, b)]
+    assert chaves[0] == chaves[1]
@@ -0,0 +1,10 @@
+# Arquivo: tests/test_importacao.py
+import pytest
+
+from src.utils.orcamento_importacao import ENTRADAS, medir
+
+
+@pytest.mark.parametrize("modulo", ENTRADAS)
+def test_entradas_da_ingestao_nao_carregam_dependencias_pesadas(modulo):
+    # Só o que é carregado; o tempo (IMPORT_BUDGET_MS) depende da máquina e fica para o script
+    assert medir(modulo, repeticoes=1)["carregados"] == []
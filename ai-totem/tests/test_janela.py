@@ -0,0 +1,32 @@
+# Arquivo: tests/test_janela.py
+import datetime
+
+from src.sensors.simulador import gerar_lote
+from src.ui.janela import JanelaDados
+
+INICIO = datetime.datetime(2024, 5, 1, 8)
+
+
+def test_periodo_anda_com_o_relogio(banco):
+    # 2h de sessões, uma por minuto
+    banco.salvar_lote(gerar_lote(120, seed=20, inicio=INICIO, intervalo_s=60))
+    janela = JanelaDados(500)
+
+    janela.atualizar(banco, inicio=INICIO + datetime.timedelta(hours=1))
+    assert len(janela.df) == 60
+
+    # Nenhuma linha nova: só o início andou, e as linhas que ficaram antes dele saem
+    assert janela.atualizar(banco, inicio=INICIO + datetime.timedelta(hours=1, minutes=30)) == 0
+    assert len(janela.df) == 30
+    assert janela.df['timestamp'].min() >= INICIO + datetime.timedelta(hours=1, minutes=30)
+
+
+def test_linhas_novas_entram_com_o_periodo(banco):
+    banco.salvar_lote(gerar_lote(60, seed=21, inicio=INICIO, intervalo_s=60))
+    janela = JanelaDados(500)
+    janela.atualizar(banco, inicio=INICIO + datetime.timedelta(minutes=30))
+    banco.salvar_lote(gerar_lote(60, seed=22, inicio=INICIO + datetime.timedelta(hours=1), intervalo_s=60))
+
+    assert janela.atualizar(banco, inicio=INICIO + datetime.timedelta(hours=1)) == 60
+    assert len(janela.df) == 60
+    assert janela.df['id'].is_monotonic_decreasing
@@ -0,0 +1,123 @@
+# Arquivo: tests/test_rollups.py
+import datetime
+import threading
+
+from src.database import rollups
+from src.database.connector import TABLE_NAME
+from src.sensors.simulador import gerar_lote
+
+INICIO = datetime.datetime(2024, 5, 1, 8)
+
+
+def _tabelas(conn):
+    """Conteúdo de todos os rollups e sketches, ordenado (somas arredondadas: a ordem das parcelas muda)."""
+    tabelas = ([t for t, _, _ in rollups.GRANULARIDADES.values()] + [t for t, _ in rollups.SKETCHES.values()]
+               + [rollups.TABELA_ACOES])
+    return {
+        t: [tuple(round(v, 6) if isinstance(v, float) else v for v in linha)
+            for linha in conn.execute(f"SELECT * FROM {t} ORDER BY 1, 2, 3").fetchall()]
+        for t in tabelas
+    }
+
+
+def _totais(conn):
+    sessoes = conn.execute(f"SELECT SUM(sessoes) FROM {rollups.GRANULARIDADES['hora'][0]}").fetchone()[0]
+    medidas = conn.execute(f"SELECT SUM(contagem) FROM {rollups.SKETCHES['total'][0]}").fetchone()[0]
+    brutas = conn.execute(f"SELECT COUNT(*), SUM(tempo_resposta_ms > 0) FROM {TABLE_NAME}").fetchone()
+    return (sessoes, medidas), brutas
+
+
+def test_catch_up_incremental_igual_a_reconstrucao(banco):
+    with banco.conexao() as conn:
+        for rodada in range(4):
+            banco.salvar_lote(gerar_lote(1500, seed=rodada, inicio=INICIO + datetime.timedelta(hours=rodada), intervalo_s=7))
+            # Blocos pequenos: a marca d'água avança várias vezes por rodada
+            assert rollups.atualizar(conn, "sqlite", TABLE_NAME, bloco=400) == 1500
+        assert rollups.atualizar(conn, "sqlite", TABLE_NAME) == 0
+        incremental = _tabelas(conn)
+
+        rollups.reconstruir(conn)
+        assert rollups.atualizar(conn, "sqlite", TABLE_NAME) == 6000
+        assert _tabelas(conn) == incremental
+        assert _totais(conn)[0] == _totais(conn)[1]
+
+
+def test_catch_up_com_escritores_concorrentes_nao_perde_linhas(banco):
+    def escrever(seed):
+        for i in range(5):
+            banco.salvar_lote(gerar_lote(300, seed=seed * 10 + i, inicio=INICIO, intervalo_s=1), tamanho_lote=50)
+
+    escritores = [threading.Thread(target=escrever, args=(k,)) for k in range(3)]
+    for t in escritores:
+        t.start()
+    processadas = 0
+    with banco.conexao() as conn:
+        while any(t.is_alive() for t in escritores):
+            processadas += rollups.atualizar(conn, "sqlite", TABLE_NAME, bloco=100)
+        for t in escritores:
+            t.join()
+        processadas += rollups.atualizar(conn, "sqlite", TABLE_NAME)
+        assert processadas == 4500
+        (sessoes, medidas), (brutas, com_latencia) = _totais(conn)
+        assert (sessoes, medidas) == (brutas, com_latencia) == (4500, com_latencia)
+
+
+def test_teto_oracle_espera_commits_atrasados():
+    # ids 1..10 entregues; o 7 está numa transação que ainda não commitou em t=0
+    teto, candidato, em = rollups.teto_seguro(desde=0, candidato=None, candidato_em=None, maximo=10, agora=0, atraso=30)
+    assert (teto, candidato, em) == (0, 10, 0)
+
+    # Antes do atraso nada é somado (o catch-up pularia o 7)
+    teto, candidato, em = rollups.teto_seguro(0, candidato, em, maximo=12, agora=20, atraso=30)
+    assert (teto, candidato, em) == (0, 10, 0)
+
+    # Depois do atraso o candidato vira teto e o MAX(id) atual é o próximo candidato
+    teto, candidato, em = rollups.teto_seguro(0, candidato, em, maximo=15, agora=31, atraso=30)
+    assert (teto, candidato, em) == (10, 15, 31)
+
+    # Em dia e sem linhas novas: nenhum candidato pendente
+    assert rollups.teto_seguro(15, None, None, maximo=15, agora=90, atraso=30) == (15, None, None)
+
+
+def test_contagem_de_acoes_vem_do_rollup(banco):
+    banco.salvar_lote(gerar_lote(3000, seed=30, inicio=INICIO, intervalo_s=5))
+    banco.atualizar_rollups()
+    with banco.conexao() as conn:
+        brutas = dict(conn.execute(f"""
+            SELECT acao_usuario, COUNT(*) FROM {TABLE_NAME} WHERE acao_usuario <> 'Nenhuma' GROUP BY acao_usuario
+        """).fetchall())
+        plano = " ".join(str(linha) for linha in conn.execute(f"""
+            EXPLAIN QUERY PLAN SELECT acao_usuario, SUM(sessoes) FROM {rollups.TABELA_ACOES}
+            WHERE acao_usuario <> 'Nenhuma' GROUP BY acao_usuario
+        """))
+    assert banco.contagem_acoes().to_dict() == brutas
+    assert TABLE_NAME not in plano
+
+
+def test_migracao_soma_as_acoes_ja_cobertas_pelo_controle(banco):
+    lote = gerar_lote(1000, seed=31, inicio=INICIO, intervalo_s=5)
+    com_acao = int((lote["acao_usuario"] != "Nenhuma").sum())
+    banco.salvar_lote(lote)
+    banco.atualizar_rollups()
+    with banco.conexao() as conn:
+        # Banco como estava na v7: sem o rollup de comandos
+        conn.execute(f"DROP TABLE {rollups.TABELA_ACOES}")
+        conn.execute("PRAGMA user_version = 7")
+        conn.commit()
+    banco.init_db()
+    assert banco.contagem_acoes().sum() == com_acao
+
+
+def test_agregados_do_painel_respeitam_o_periodo(banco):
+    # Duas levas: 8h-9h e 13h-14h; o período do painel começa às 13h
+    banco.salvar_lote(gerar_lote(600, seed=32, inicio=INICIO, intervalo_s=5))
+    recente = gerar_lote(400, seed=33, inicio=INICIO + datetime.timedelta(hours=5), intervalo_s=5)
+    banco.salvar_lote(recente)
+    banco.atualizar_rollups()
+
+    agregados = banco.agregados_painel(inicio=INICIO + datetime.timedelta(hours=5))
+    assert agregados["kpis"]["total"] == 400
+    assert agregados["acoes"].sum() == int((recente["acao_usuario"] != "Nenhuma").sum())
+    assert agregados["engajados_por_sensor"].sum() == int((recente["tipo_interacao"] == "Engajado").sum())
+    assert agregados["engajados_por_dia"].sum() == agregados["engajados_por_sensor"].sum()
+    assert banco.kpis()["total"] == 1000
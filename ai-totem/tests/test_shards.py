@@ -0,0 +1,90 @@
+# Arquivo: tests/test_shards.py
+import datetime
+import time
+import zlib
+
+import pytest
+
+import src.database.connector as connector
+from config import settings
+from src.database.connector import MAX_SHARDS, TABLE_NAME, caminho_shard, shard_de
+from src.sensors.simulador import gerar_lote
+
+TOTAL = 4
+INICIO = datetime.datetime(2024, 5, 1, 8)
+
+
+@pytest.fixture
+def shards(tmp_path, monkeypatch):
+    """Conectores de cada shard (sem os processos escritores), num diretório isolado."""
+    monkeypatch.setattr(connector, "DB_SQLITE_PATH", tmp_path / "teste.db")
+    monkeypatch.setattr(settings, "SQLITE_SHARDS", TOTAL)
+    monkeypatch.setattr(settings, "NOTIFICACAO_PORTA", 0)
+    bancos = [connector.DBConnector(driver="sqlite", shard=k) for k in range(TOTAL)]
+    for banco in bancos:
+        banco.init_db()
+    yield bancos
+    with connector._POOLS_LOCK:
+        for chave in [c for c in connector._POOLS if c[1] and c[1].startswith(str(tmp_path))]:
+            connector._POOLS.pop(chave).close()
+
+
+def _ids(banco):
+    with banco.conexao() as conn:
+        return [linha[0] for linha in conn.execute(f"SELECT id FROM {TABLE_NAME} ORDER BY rowid")]
+
+
+def test_id_global_carrega_o_shard_e_o_instante(shards):
+    antes = time.time_ns() // 1000
+    for k, banco in enumerate(shards):
+        banco.salvar_lote(gerar_lote(300, seed=k, inicio=INICIO, intervalo_s=1.0))
+    depois = time.time_ns() // 1000
+
+    todos = []
+    for k, banco in enumerate(shards):
+        ids = _ids(banco)
+        assert len(ids) == 300
+        assert all(i % MAX_SHARDS == k for i in ids)
+        # µs da gravação * MAX_SHARDS + shard: o lote ocupa µs consecutivos a partir do instante
+        assert antes <= ids[0] // MAX_SHARDS <= depois
+        assert ids == sorted(ids) and len(set(ids)) == len(ids)
+        todos += ids
+    assert len(set(todos)) == len(todos)
+
+
+def test_ids_seguem_crescendo_com_o_relogio_atrasado(shards, monkeypatch):
+    banco = shards[1]
+    banco.salvar_lote(gerar_lote(100, seed=1, inicio=INICIO, intervalo_s=1.0))
+    ultimo = max(_ids(banco))
+
+    # Relógio voltou 1h (NTP, VM restaurada): o id parte do MAX(id), não do relógio
+    atrasado = time.time_ns() - 3600 * 10**9
+    monkeypatch.setattr(connector.time, "time_ns", lambda: atrasado)
+    banco.salvar_lote(gerar_lote(100, seed=2, inicio=INICIO, intervalo_s=1.0))
+    novos = [i for i in _ids(banco) if i > ultimo]
+    assert len(novos) == 100
+    assert novos[0] == ultimo + MAX_SHARDS
+    assert all(i % MAX_SHARDS == 1 for i in novos)
+
+
+def test_roteamento_e_nomes_estaveis(tmp_path):
+    # crc32 (não hash()): o mesmo totem cai no mesmo shard em qualquer processo
+    assert shard_de("totem_praca", TOTAL) == zlib.crc32(b"totem_praca") % TOTAL
+    assert shard_de(None, TOTAL) == 0
+    assert caminho_shard(tmp_path / "flexmedia.db", 3, TOTAL).name == "flexmedia-shard03de04.db"
+    assert caminho_shard(tmp_path / "flexmedia.db", 3, 8).name == "flexmedia-shard03de08.db"
+
+
+def test_leitura_shardada_junta_os_shards_por_id(shards):
+    from src.database.shards import ConectorShards
+    for banco in shards:
+        lote = gerar_lote(200, seed=banco.shard, inicio=INICIO, intervalo_s=1.0)
+        # Cada shard só recebe os seus totens, como no roteamento do ConectorShards
+        manter = [shard_de(s, TOTAL) == banco.shard for s in lote["id_sensor"]]
+        banco.salvar_lote({campo: valores[manter] for campo, valores in lote.items()})
+
+    db = ConectorShards()
+    df = db.ler_dados(limit=500)
+    assert df["id"].is_monotonic_decreasing
+    assert len(df) == min(500, db.contar_total())
+    assert db.max_id() == tuple(max(_ids(b), default=0) for b in shards)
@@ -0,0 +1,52 @@
+# Arquivo: tests/test_treino.py
+import numpy as np
+import pytest
+
+from src.ml_engine.trainer import estratificacao
+
+sklearn = pytest.importorskip("sklearn")
+from sklearn.model_selection import train_test_split
+
+
+def test_classe_com_um_registro_divide_sem_estratificar():
+    y = np.array(["Engajado"] * 40 + ["Curioso"] * 20 + ["Ocioso"], dtype=object)
+    X = np.arange(len(y), dtype=float).reshape(-1, 1)
+    assert estratificacao(y) is None
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42,
+                                                        stratify=estratificacao(y))
+    assert len(y_train) + len(y_test) == len(y)
+
+
+def test_classes_com_dois_ou_mais_registros_seguem_estratificadas():
+    y = np.array(["Engajado"] * 40 + ["Ocioso"] * 2, dtype=object)
+    assert estratificacao(y) is y
+
+
+def test_vencedor_e_o_finalista_mais_rapido():
+    from src.ml_engine.selecao import finalistas, escolher_vencedor
+    resultados = [
+        {"params": {"n": 1}, "acuracia_cv": 0.900, "latencia_1_linha_ms": None},
+        {"params": {"n": 2}, "acuracia_cv": 0.950, "latencia_1_linha_ms": None},
+        {"params": {"n": 3}, "acuracia_cv": 0.948, "latencia_1_linha_ms": None},
+    ]
+    selecionados = finalistas(resultados, tolerancia=0.005)
+    assert [r["params"]["n"] for r in selecionados] == [2, 3]
+    # Medidos por medir_candidatos (no processo principal, depois da busca)
+    selecionados[0]["latencia_1_linha_ms"], selecionados[1]["latencia_1_linha_ms"] = 3.0, 1.0
+    assert escolher_vencedor(selecionados, tolerancia=0.005)["params"] == {"n": 3}
+
+
+def test_todos_os_candidatos_sao_medidos_e_so_os_finalistas_ficam_em_memoria():
+    from src.ml_engine.selecao import finalistas, medir_candidatos
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 3))
+    y = np.where(X[:, 0] > 0, "Engajado", "Ocioso").astype(object)
+    resultados = [
+        {"params": {"n_estimators": 5, "max_depth": 2}, "acuracia_cv": 0.90},
+        {"params": {"n_estimators": 10, "max_depth": 4}, "acuracia_cv": 0.95},
+        {"params": {"n_estimators": 5, "max_depth": None}, "acuracia_cv": 0.949},
+    ]
+    selecionados = finalistas(resultados, tolerancia=0.005)
+    modelos = medir_candidatos(resultados, X, y, np.ones(len(y)), manter=selecionados)
+    assert all(r["latencia_1_linha_ms"] > 0 and r["latencia_por_linha_lote_ms"] > 0 for r in resultados)
+    assert sorted(modelos) == [1, 2]